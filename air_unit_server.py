@@ -7,13 +7,33 @@ import time
 import threading
 import logging
 import argparse
+import json
+import os
 import numpy as np
-from typing import Dict
+from collections import OrderedDict
+from concurrent.futures import Executor, ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
 from zeroconf import ServiceInfo, Zeroconf
 import zlib
 import cv2
 from network.fec import FECEncoder, FEC_AVAILABLE
-from network.h264_encoder import H264Encoder, H264_AVAILABLE
+from network.h264_encoder import H264Encoder, H264_AVAILABLE, packetize_access_unit, split_i420
+from network.protocol import (Protocol, ControlCommand, VIDEO_HEADER_TRACE, VIDEO_TRACE_FIRST_SEND,
+                              VIDEO_TRACE_FIRST_SEND_OFFSET, MSG_TYPE_VIDEO_FEEDBACK,
+                              MSG_TYPE_KEYFRAME_REQUEST, MSG_TYPE_LAYER_SELECT,
+                              MSG_TYPE_CONTROL_COMMAND, MSG_TYPE_PARAM_UPDATE,
+                              MSG_TYPE_PARAM_QUERY, MSG_TYPE_HEARTBEAT)
+from network.control_server import ControlServer
+from network.control_state import ControlStateReceiver
+from network.pipeline import StageQueue, StageStats
+from network.pacer import PacketPacer
+from network.congestion import CongestionController
+from network.retransmit_cache import RetransmitCache
+from network.image_enhancer import ImageEnhancer
+from network.jpeg_rate_control import JpegRateController
+from network.jpeg_tiles import MAX_STRIPES, encode_tiles, packetize_tiles
+from network.video_source import VideoSource, TestPatternSource, create_video_source, resize_i420
 
 
 logging.basicConfig(
@@ -31,6 +51,53 @@ DEFAULT_TARGET_BITRATE_KBPS = 2000
 DEFAULT_FPS = 30
 DEFAULT_JPEG_QUALITY = 80
 
+# 视频分片大小（JPEG 按字节切分）
+CHUNK_SIZE = 60000
+# H.264 分片大小：slice-max-size 与之匹配，按 NAL 边界切分，单包不超过以太网 MTU
+H264_CHUNK_SIZE = 1200
+# Reed-Solomon 码长上限（GF(256)）：data + parity 超过时本帧不加 FEC
+FEC_MAX_CHUNKS = 255
+# 固定 IDR 间隔（帧）
+KEYFRAME_INTERVAL = 30
+# 每帧分片摊开发送的帧间隔比例
+DEFAULT_PACING_SPREAD = 0.5
+# 拥塞控制码率下限；上限为操作员设定的 bitrate
+CC_MIN_BITRATE_KBPS = 300
+# 关键帧请求最小响应间隔（秒）；RTT 已知时取 max(该值, 1.5 × RTT)
+KEYFRAME_REQUEST_MIN_INTERVAL = 0.1
+# 订阅端超时：视频端口无任何消息（REGISTER/ACK/反馈）超过该时长即移除
+SUBSCRIBER_TIMEOUT = 5.0
+# 单个订阅端节拍器积压上限（按当前码率折算的秒数），超出即丢弃其积压，不拖累其他订阅端
+SUBSCRIBER_MAX_BACKLOG = 0.5
+# NACK 重传缓存字节预算（保留时长由 RTT 决定）
+RETRANSMIT_CACHE_BYTES = 4 * 1024 * 1024
+# 多分辨率层（simulcast）：(分辨率缩放, 占设定码率的比例)，层 0 为全分辨率
+SIMULCAST_LAYERS = [(1.0, 1.0), (0.5, 0.3), (0.25, 0.1)]
+# 条带化 JPEG 编码线程数（cv2.imencode 释放 GIL，条带可跨核并行）
+JPEG_TILE_WORKERS = max(1, min(8, os.cpu_count() or 1))
+# 测试卡输出帧复用池上限（覆盖编码队列 + 编码中的帧）
+TEST_CARD_POOL_SIZE = 6
+# 动态区域增强时的外扩像素（大于锐化与降噪的滤波半径）
+TEST_CARD_ENHANCE_MARGIN = 16
+# 增强的影响半径（锐化、降噪两级 5×5 滤波各 2 像素）：动态元素变化也会改变其外侧
+# 该宽度内像素的增强结果，输出帧需按外扩后的矩形更新
+TEST_CARD_FILTER_RADIUS = 4
+# 保留控制状态（seq 去重 / 冗余补齐）的客户端数，超出时淘汰最久未活动的
+MAX_CONTROL_CLIENTS = 16
+
+
+@dataclass
+class TestCardState:
+    """测试卡增量渲染状态（每种像素格式一份）"""
+    pix_fmt: str                          # bgr24 或 yuv420p（紧凑 I420）
+    base: np.ndarray                      # 未增强的基础帧
+    work: np.ndarray                      # 持久的未增强工作帧（仅采集线程使用）
+    work_rects: List[tuple] = field(default_factory=list)
+    enhanced_base: Optional[np.ndarray] = None
+    enhance_key: Optional[tuple] = None
+    free: List[tuple] = field(default_factory=list)                         # [(frame, rects)]
+    outstanding: OrderedDict = field(default_factory=OrderedDict)           # 已交出未归还
+
 
 class AdaptiveEncoder:
     """自适应 JPEG 编码器 — 根据目标码率动态调整质量"""
@@ -46,18 +113,18 @@ class AdaptiveEncoder:
         # 目标每帧字节数
         self.target_frame_bytes = (target_bitrate_kbps * 1000 // 8) // fps
 
-        # 指数移动平均跟踪实际帧大小
-        self._ema_size = float(self.target_frame_bytes)
-        self._ema_alpha = 0.3  # 响应速度
+        # 模型码控：拟合 ln(帧大小) 与质量的线性关系，一步求解命中目标帧大小的质量
+        self._rate = JpegRateController(self.target_frame_bytes, initial_quality,
+                                        self.quality_min, self.quality_max)
 
-        # 画面增强参数
-        self.brightness = 0    # -100~100
-        self.contrast = 0      # -100~100（百分比偏移）
-        self.sharpness = 0     # 0~100
-        self.denoise = 0       # 0~100
+        # 画面增强（亮度/对比度/gamma/锐化/降噪）
+        self.enhancer = ImageEnhancer()
 
-        # 缓存基础彩条帧（静态部分不重复生成）
+        # 缓存基础彩条帧（静态部分不重复生成）；按像素格式维护增量渲染状态
         self._base_frame = self._generate_base_frame()
+        self._card_states: Dict[str, TestCardState] = {}
+        self._card_lock = threading.Lock()
+        self._yuv_colors: Dict[tuple, tuple] = {}
 
     @staticmethod
     def _generate_base_frame() -> np.ndarray:
@@ -114,83 +181,333 @@ class AdaptiveEncoder:
         return frame
 
     def generate_dynamic_frame(self, frame_id: int) -> np.ndarray:
-        """生成带动态元素的测试帧（raw BGR）"""
-        frame = self._base_frame.copy()
+        """测试帧（raw BGR，已应用画面增强），增量渲染；用完后可 release_frame() 归还复用"""
+        return self._render_incremental(self._card_state("bgr24"), frame_id)
+
+    def generate_dynamic_frame_yuv(self, frame_id: int) -> np.ndarray:
+        """测试帧（紧凑 I420，已应用画面增强），动态元素直接画在 Y/U/V 平面上，无颜色转换"""
+        return self._render_incremental(self._card_state("yuv420p"), frame_id)
+
+    def release_frame(self, frame: np.ndarray):
+        """归还 generate_dynamic_frame* 返回的帧（编码完成后），其他数组忽略"""
+        with self._card_lock:
+            for state in self._card_states.values():
+                entry = state.outstanding.pop(id(frame), None)
+                if entry is not None:
+                    state.free.append(entry)
+                    return
+
+    def _card_state(self, pix_fmt: str) -> "TestCardState":
+        state = self._card_states.get(pix_fmt)
+        if state is None:
+            base = self._base_frame
+            if pix_fmt == "yuv420p":
+                base = cv2.cvtColor(base, cv2.COLOR_BGR2YUV_I420)
+            state = self._card_states[pix_fmt] = TestCardState(pix_fmt, base, base.copy())
+        return state
+
+    def _render_incremental(self, state: "TestCardState", frame_id: int) -> np.ndarray:
+        """
+        增量渲染一帧测试卡
+
+        1. 持久的未增强工作帧：上一帧的动态区域从基础帧恢复，再绘制本帧动态元素
+        2. 输出帧取自复用池：该帧上次的动态区域从增强后的基础帧恢复，
+           本帧动态区域从工作帧增强后写入（增强参数不变时基础帧只增强一次）
+        """
+        yuv = state.pix_fmt == "yuv420p"
+        key = self.enhancer.key()
+        with self._card_lock:
+            if key != state.enhance_key:
+                # 增强参数变化：重建增强基础帧，池中旧帧全部作废
+                enhanced = state.base.copy()
+                state.enhanced_base = (self.apply_enhancements_yuv(enhanced, temporal=False) if yuv
+                                       else self.apply_enhancements(enhanced, temporal=False))
+                state.enhance_key = key
+                state.free.clear()
+                state.outstanding.clear()
+            enhanced_base = state.enhanced_base
+            if state.free:
+                out, out_rects = state.free.pop()
+            else:
+                out, out_rects = enhanced_base.copy(), []
+
+        for rect in state.work_rects:
+            self._copy_rect(state.work, state.base, rect, yuv)
+        planes = split_i420(state.work, VIDEO_WIDTH, VIDEO_HEIGHT) if yuv else [state.work]
+        rects = self._draw_dynamic(planes, yuv, frame_id)
+        state.work_rects = rects
+
+        for rect in out_rects:
+            self._copy_rect(out, enhanced_base, rect, yuv)
+        enhance = self.enhancer.active
+        if enhance:
+            rects = [self._grow_rect(rect, TEST_CARD_FILTER_RADIUS) for rect in rects]
+        for rect in rects:
+            if enhance:
+                self._enhance_rect(out, state.work, rect, yuv)
+            else:
+                self._copy_rect(out, state.work, rect, yuv)
+
+        with self._card_lock:
+            if state.enhance_key == key:
+                state.outstanding[id(out)] = (out, rects)
+                # 被丢弃（未归还）的帧不再跟踪，由 GC 回收
+                while len(state.outstanding) > TEST_CARD_POOL_SIZE:
+                    state.outstanding.popitem(last=False)
+        return out
+
+    @staticmethod
+    def _grow_rect(rect: tuple, pad: int) -> tuple:
+        """矩形四周外扩 pad 像素（pad 为偶数，保持 I420 对齐）并裁剪到画面范围"""
+        x0, y0, x1, y1 = rect
+        return (max(0, x0 - pad), max(0, y0 - pad),
+                min(VIDEO_WIDTH, x1 + pad), min(VIDEO_HEIGHT, y1 + pad))
+
+    @staticmethod
+    def _copy_rect(dst: np.ndarray, src: np.ndarray, rect: tuple, yuv: bool):
+        """复制矩形区域（I420 逐平面，色度坐标减半；矩形已对齐到偶数）"""
+        x0, y0, x1, y1 = rect
+        if not yuv:
+            dst[y0:y1, x0:x1] = src[y0:y1, x0:x1]
+            return
+        for i, (d, s) in enumerate(zip(split_i420(dst, VIDEO_WIDTH, VIDEO_HEIGHT),
+                                       split_i420(src, VIDEO_WIDTH, VIDEO_HEIGHT))):
+            k = 1 if i == 0 else 2
+            d[y0 // k:y1 // k, x0 // k:x1 // k] = s[y0 // k:y1 // k, x0 // k:x1 // k]
+
+    def _enhance_rect(self, dst: np.ndarray, src: np.ndarray, rect: tuple, yuv: bool):
+        """对矩形区域增强后写入 dst；外扩 TEST_CARD_ENHANCE_MARGIN 计算，锐化 / 降噪在边缘处与整帧结果一致"""
+        x0, y0, x1, y1 = rect
+        m = TEST_CARD_ENHANCE_MARGIN
+        px0, py0 = max(0, x0 - m), max(0, y0 - m)
+        px1, py1 = min(VIDEO_WIDTH, x1 + m), min(VIDEO_HEIGHT, y1 + m)
+        inner = (slice(y0 - py0, y1 - py0), slice(x0 - px0, x1 - px0))
+        if not yuv:
+            dst[y0:y1, x0:x1] = self.enhancer.apply(src[py0:py1, px0:px1])[inner]
+            return
+        # I420：只有亮度参与增强，色度直接复制
+        luma = split_i420(src, VIDEO_WIDTH, VIDEO_HEIGHT)[0]
+        dst[y0:y1, x0:x1] = self.enhancer.apply(luma[py0:py1, px0:px1])[inner]
+        for d, s in list(zip(split_i420(dst, VIDEO_WIDTH, VIDEO_HEIGHT),
+                             split_i420(src, VIDEO_WIDTH, VIDEO_HEIGHT)))[1:]:
+            d[y0 // 2:y1 // 2, x0 // 2:x1 // 2] = s[y0 // 2:y1 // 2, x0 // 2:x1 // 2]
+
+    def _draw_dynamic(self, planes: List[np.ndarray], yuv: bool, frame_id: int) -> List[tuple]:
+        """
+        绘制动态元素（时间戳、指针、移动棋盘格、滚动条）
+
+        planes 为 [BGR 帧] 或 I420 的 [Y, U, V]（色度平面坐标与尺寸减半）。
+        返回各元素的外接矩形 (x0, y0, x1, y1)（全分辨率坐标，对齐到偶数）。
+        """
         dyn_y = int(VIDEO_HEIGHT * 0.78)
+        font = cv2.FONT_HERSHEY_SIMPLEX
+        rects = []
 
-        timestamp = time.strftime("%H:%M:%S")
-        cv2.putText(frame, f"#{frame_id:06d}  {timestamp}", (20, dyn_y + 30),
-                    cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 200, 255), 1, cv2.LINE_AA)
+        text = f"#{frame_id:06d}  {time.strftime('%H:%M:%S')}"
+        (text_w, text_h), baseline = cv2.getTextSize(text, font, 0.7, 1)
+        # 抗锯齿与色度平面的缩放字形会略微超出 getTextSize 范围，四周各留 4 像素
+        rects.append((16, dyn_y + 30 - text_h - 4, 20 + text_w + 4, dyn_y + 30 + baseline + 4))
 
         pointer_cx = VIDEO_WIDTH - 80
         pointer_cy = dyn_y + 50
-        angle = (frame_id * 12) % 360
-        rad = np.radians(angle)
+        rad = np.radians((frame_id * 12) % 360)
         px = int(pointer_cx + 35 * np.cos(rad))
         py = int(pointer_cy + 35 * np.sin(rad))
-        cv2.circle(frame, (pointer_cx, pointer_cy), 38, (100, 100, 100), 1)
-        cv2.line(frame, (pointer_cx, pointer_cy), (px, py), (0, 255, 0), 2)
+        rects.append((pointer_cx - 40, pointer_cy - 40, pointer_cx + 41, pointer_cy + 41))
 
         checker_size = 8
         block_w, block_h = 120, 80
         block_x = int((VIDEO_WIDTH / 2 - block_w / 2) + 60 * np.sin(frame_id * 0.05))
         block_y = dyn_y + 10
-        # 生成棋盘格 pattern（numpy 向量化）
+        # 生成棋盘格 pattern（numpy 向量化），裁剪到画面范围
         bx_arr = np.arange(block_w)
         by_arr = np.arange(block_h)
         checker = ((bx_arr[None, :] // checker_size) + (by_arr[:, None] // checker_size)) % 2 == 0
-        # 裁剪到画面范围
-        x0 = max(0, block_x)
-        y0 = max(0, block_y)
-        x1 = min(VIDEO_WIDTH, block_x + block_w)
-        y1 = min(VIDEO_HEIGHT, block_y + block_h)
-        if x1 > x0 and y1 > y0:
-            roi = checker[y0 - block_y:y1 - block_y, x0 - block_x:x1 - block_x]
-            frame[y0:y1, x0:x1][roi] = (255, 255, 255)
+        x0, y0 = max(0, block_x), max(0, block_y)
+        x1, y1 = min(VIDEO_WIDTH, block_x + block_w), min(VIDEO_HEIGHT, block_y + block_h)
+        roi = checker[y0 - block_y:y1 - block_y, x0 - block_x:x1 - block_x]
+        rects.append((x0, y0, x1, y1))
 
         scroll_y = VIDEO_HEIGHT - 6
         bar_x = (frame_id * 6) % VIDEO_WIDTH
         bar_end = min(bar_x + 160, VIDEO_WIDTH)
-        frame[scroll_y:VIDEO_HEIGHT, bar_x:bar_end] = (0, 200, 255)
-
-        return self._apply_enhancements(frame)
-
-    def _apply_enhancements(self, frame: np.ndarray) -> np.ndarray:
-        if self.brightness != 0 or self.contrast != 0:
-            alpha = 1.0 + self.contrast / 100.0
-            beta = float(self.brightness)
-            frame = cv2.convertScaleAbs(frame, alpha=alpha, beta=beta)
-        if self.sharpness > 0:
-            strength = self.sharpness / 100.0
-            blurred = cv2.GaussianBlur(frame, (0, 0), 3)
-            frame = cv2.addWeighted(frame, 1.0 + strength, blurred, -strength, 0)
-        if self.denoise > 0:
-            h_val = max(1, int(self.denoise * 0.1))
-            frame = cv2.fastNlMeansDenoisingColored(frame, None, h_val, h_val, 7, 21)
+        rects.append((bar_x, scroll_y, bar_end, VIDEO_HEIGHT))
+
+        orange, gray = (0, 200, 255), (100, 100, 100)
+        green, white = (0, 255, 0), (255, 255, 255)
+        if yuv:
+            orange, gray = self._yuv_color(orange), self._yuv_color(gray)
+            green, white = self._yuv_color(green), self._yuv_color(white)
+        for i, plane in enumerate(planes):
+            k = 1 if i == 0 else 2
+            pick = (lambda color: color[i]) if yuv else (lambda color: color)
+            cv2.putText(plane, text, (20 // k, (dyn_y + 30) // k), font, 0.7 / k,
+                        pick(orange), 1, cv2.LINE_AA)
+            cv2.circle(plane, (pointer_cx // k, pointer_cy // k), 38 // k, pick(gray), 1)
+            cv2.line(plane, (pointer_cx // k, pointer_cy // k), (px // k, py // k), pick(green),
+                     max(1, 2 // k))
+            if roi.size:
+                mask = roi[::k, ::k]
+                region = plane[y0 // k:y0 // k + mask.shape[0], x0 // k:x0 // k + mask.shape[1]]
+                region[mask[:region.shape[0], :region.shape[1]]] = pick(white)
+            plane[scroll_y // k:, bar_x // k:bar_end // k] = pick(orange)
+
+        # 对齐到偶数（I420 色度半分辨率）并裁剪到画面范围
+        return [(max(0, rx0 & ~1), max(0, ry0 & ~1),
+                 min(VIDEO_WIDTH, (rx1 + 1) & ~1), min(VIDEO_HEIGHT, (ry1 + 1) & ~1))
+                for rx0, ry0, rx1, ry1 in rects]
+
+    def _yuv_color(self, bgr: tuple) -> tuple:
+        """BGR 颜色 → (Y, U, V)，与 cv2 BGR2YUV_I420 转换一致"""
+        color = self._yuv_colors.get(bgr)
+        if color is None:
+            pixel = np.full((2, 2, 3), bgr, dtype=np.uint8)
+            yuv = cv2.cvtColor(pixel, cv2.COLOR_BGR2YUV_I420).ravel()
+            color = self._yuv_colors[bgr] = (int(yuv[0]), int(yuv[4]), int(yuv[5]))
+        return color
+
+    def apply_enhancements(self, frame: np.ndarray, temporal: bool = True) -> np.ndarray:
+        """画面增强（所有视频源的原始画面共用），temporal=True 表示连续视频中的整帧"""
+        return self.enhancer.apply(frame, temporal)
+
+    def apply_enhancements_yuv(self, frame: np.ndarray, temporal: bool = True) -> np.ndarray:
+        """画面增强作用于紧凑 I420 的 Y 平面（原地修改，色度不变）"""
+        if self.enhancer.active:
+            luma = frame[:frame.shape[0] * 2 // 3]
+            luma[:] = self.enhancer.apply(luma, temporal)
         return frame
 
     def encode(self, frame_id: int) -> bytes:
         """编码一帧 — 生成动态帧 + JPEG 自适应编码"""
         frame = self.generate_dynamic_frame(frame_id)
+        encoded = self.encode_frame(frame)
+        self.release_frame(frame)
+        return encoded
 
-        _, jpeg_data = cv2.imencode('.jpg', frame,
-                                     [cv2.IMWRITE_JPEG_QUALITY, self.quality])
-        encoded = jpeg_data.tobytes()
-
-        self._ema_size = self._ema_alpha * len(encoded) + (1 - self._ema_alpha) * self._ema_size
-        self._adjust_quality()
-
+    def encode_frame(self, frame: np.ndarray, stripes: int = 1,
+                     executor: Optional[Executor] = None) -> bytes:
+        """JPEG 自适应编码一帧已生成的画面；stripes > 1 时按水平条带独立编码（可并行）"""
+        if stripes > 1:
+            encoded = encode_tiles(frame, stripes, self.quality, executor)
+        else:
+            _, jpeg_data = cv2.imencode('.jpg', frame,
+                                         [cv2.IMWRITE_JPEG_QUALITY, self.quality])
+            encoded = jpeg_data.tobytes()
+
+        self.quality = self._rate.update(self.quality, len(encoded))
         return encoded
 
-    def _adjust_quality(self):
-        """根据实际帧大小 vs 目标帧大小调整 JPEG 质量"""
-        ratio = self._ema_size / self.target_frame_bytes
-        if ratio > 1.1:
-            # 超出目标 10%，降质量
-            self.quality = max(self.quality_min, self.quality - 2)
-        elif ratio < 0.8:
-            # 低于目标 20%，提质量
-            self.quality = min(self.quality_max, self.quality + 1)
+    def set_target_bitrate(self, target_bitrate_kbps: int, fps: Optional[int] = None):
+        """运行中更新目标码率 / 帧率（保留质量、码控模型与增强参数）"""
+        if fps is not None:
+            self.fps = fps
+        self.target_bitrate_kbps = target_bitrate_kbps
+        self.target_frame_bytes = max(1, (target_bitrate_kbps * 1000 // 8) // self.fps)
+        self._rate.set_target(self.target_frame_bytes)
+
+
+@dataclass
+class VideoFrameJob:
+    """在流水线各阶段之间传递的一帧"""
+    capture_index: int                     # 采集序号（驱动测试画面动画）
+    capture_t: float                       # 采集时刻（perf_counter）
+    raw_frame: Optional[np.ndarray] = None
+    frame_id: int = 0                      # 线上帧号，编码阶段分配（保证连续，接收端据此统计丢帧）
+    frame_data: bytes = b""
+    codec_flag: int = 0                    # 0 JPEG / 1 H.264 / 2 条带化 JPEG
+    layer: int = 0                         # simulcast 层号
+    pix_fmt: str = "bgr24"                 # raw_frame 格式：bgr24 或紧凑 I420（yuv420p）
+    keyframe: bool = False                 # 可从本帧开始解码（切层点）
+    enhance_ms: Dict[str, float] = field(default_factory=dict)  # 画面增强各算子耗时
+    encode_done_t: float = 0.0
+    packetize_done_t: float = 0.0
+    data_chunks: int = 0
+    packets: List[bytes] = field(default_factory=list)
+
+
+class SimulcastLayer:
+    """一路分辨率/码率层 — 独立编码器与码率目标，线上帧号与其他层共享（切层时帧号连续）"""
+
+    def __init__(self, index: int, scale: float, bitrate_share: float,
+                 jpeg_encoder: AdaptiveEncoder):
+        self.index = index
+        # 编码器要求偶数宽高
+        self.width = max(2, int(VIDEO_WIDTH * scale) // 2 * 2)
+        self.height = max(2, int(VIDEO_HEIGHT * scale) // 2 * 2)
+        self.bitrate_share = bitrate_share
+        self.jpeg_encoder = jpeg_encoder
+        self.h264_encoder: Optional[H264Encoder] = None
+        self.bitrate_kbps = jpeg_encoder.target_bitrate_kbps
+
+        self.active = False               # 上一帧是否编码了该层（无订阅端的层不编码）
+        self.frames_since_keyframe = 0
+        # 关键帧请求（PLI）：反馈线程置位，编码线程消费
+        self.keyframe_requested = False
+        # 切层需要真正的 IDR（帧内刷新模式下强制 I 帧只开始新的刷新周期，需重开编码器）
+        self.idr_requested = False
+        self.last_keyframe_forced = 0.0
+        self.frames_encoded = 0
+
+    def summary(self) -> str:
+        h264_encoder = self.h264_encoder
+        if h264_encoder:
+            codec = (f"h264 {h264_encoder.last_encode_ms:.1f}ms "
+                     f"(cpu {h264_encoder.last_encode_cpu_ms:.1f}ms)")
+        else:
+            codec = f"jpeg Q{self.jpeg_encoder.quality}"
+        return (f"L{self.index} {self.width}x{self.height} {codec} "
+                f"target={self.bitrate_kbps} kbps frames={self.frames_encoded}"
+                f"{'' if self.active else ' (idle)'}")
+
+
+class VideoSubscriber:
+    """视频订阅端（按地址区分）— 独立的节拍器、拥塞控制、NACK 与统计
+
+    所有订阅端共享同一次编码与分片结果，每个订阅端只增加发送开销。
+    """
+
+    def __init__(self, addr: tuple, send_fn, bitrate_kbps: int, fps: int,
+                 spread_fraction: float, min_kbps: int, max_kbps: int):
+        self.addr = addr
+        self.pacer = PacketPacer(lambda pkt, a: send_fn(self, pkt, a), bitrate_kbps, fps,
+                                 spread_fraction=spread_fraction)
+        self.congestion = CongestionController(bitrate_kbps, min_kbps, max_kbps)
+        self.joined = time.time()
+        self.last_seen = self.joined
+
+        # 订阅的层；切层请求在目标层的关键帧处生效（switch_frame_id 由编码线程设定）
+        self.layer = 0
+        self.pending_layer: Optional[int] = None
+        self.switch_frame_id: Optional[int] = None
+
+        # 最近一帧首个分片的实际发送时刻（写入 first_send_t，节拍器线程读写）
+        self.first_send_frame_id = -1
+        self.first_send_t = 0.0
+
+        # 统计
+        self.frames_sent = 0
+        self.frames_acked = 0
+        self.frames_dropped = 0       # 积压超限被丢弃的帧
+        self.nacks_received = 0
+        self.keyframe_requests = 0
+        self.layer_switches = 0
+
+    def summary(self) -> str:
+        cc = self.congestion.get_stats()
+        rtt = cc['cc_rtt_ms']
+        received = cc['cc_received_kbps']
+        return (f"{self.addr[0]}:{self.addr[1]} L{self.layer} "
+                f"sent={self.frames_sent} acked={self.frames_acked} dropped={self.frames_dropped} "
+                f"nack={self.nacks_received} rtx={self.pacer.retransmits_sent} "
+                f"pli={self.keyframe_requests} "
+                f"pacer={self.pacer.queued_bytes}B(max {self.pacer.max_queue_bytes}B, "
+                f"{self.pacer.send_errors} err) | "
+                f"cc target={cc['cc_target_kbps']:.0f} "
+                f"(delay={cc['cc_delay_kbps']:.0f}, loss={cc['cc_loss_kbps']:.0f}) "
+                f"recv={received if received is not None else 0:.0f} kbps "
+                f"loss={cc['cc_loss'] * 100:.1f}% "
+                f"rtt={rtt if rtt is not None else 0:.1f}ms "
+                f"state={cc['cc_state']}")
 
 
 BIT_TO_KEY = {
@@ -233,16 +550,33 @@ class AirUnitServer:
         # 自适应编码器
         self.encoder = AdaptiveEncoder(target_bitrate_kbps, fps, jpeg_quality)
 
+        # 视频源：默认合成测试卡，可替换为文件 / 图片序列 / V4L2（main 中按 --source 设置）
+        self.source: VideoSource = TestPatternSource(self.encoder.generate_dynamic_frame,
+                                                     VIDEO_WIDTH, VIDEO_HEIGHT,
+                                                     self.encoder.generate_dynamic_frame_yuv,
+                                                     enhanced=True)
+
         self.zeroconf = None
         self.service_info = None
-        self.control_socket = None
+        # 控制面（控制指令 / 心跳 / 参数），asyncio 事件循环线程中按消息类型分发
+        self._control = ControlServer({
+            MSG_TYPE_CONTROL_COMMAND: self._handle_control_command,
+            MSG_TYPE_HEARTBEAT: self._handle_heartbeat,
+            MSG_TYPE_PARAM_UPDATE: self._handle_param_update,
+            MSG_TYPE_PARAM_QUERY: self._handle_param_query,
+        }, on_message=self._on_client_message)
+        # 各客户端控制指令状态 {addr: ControlStateReceiver}（仅控制面事件循环线程访问）
+        self._control_states: OrderedDict = OrderedDict()
         self.video_socket = None
 
-        # 客户端信息
+        # 控制端客户端信息
         self.client_ip = None
-        self.client_video_addr = None
         self.last_client_time = 0  # 最后收到客户端消息的时间
 
+        # 视频订阅端 {addr: VideoSubscriber}：反馈线程增删，发送线程遍历
+        self._subscribers: Dict[tuple, VideoSubscriber] = {}
+        self._subscribers_lock = threading.Lock()
+
         # 参数存储
         self._params = {
             'resolution': '1920x1080',
@@ -251,26 +585,46 @@ class AirUnitServer:
             'encoder': 'h264',
             'fec_enabled': False,
             'fec_redundancy': 0.2,
+            'pacing_spread': DEFAULT_PACING_SPREAD,
+            'congestion_control': True,
+            'intra_refresh': False,
+            'simulcast_layers': 1,
+            'jpeg_tiles': 1,          # JPEG 水平条带数，1 = 整帧编码
             'brightness': 0,
             'contrast': 0,
+            'gamma': 100,
             'sharpness': 0,
             'denoise': 0,
         }
 
-        # 帧缓存（用于 NACK 重传）
-        self._frame_cache: Dict[int, Dict[int, bytes]] = {}  # {frame_id: {chunk_idx: packet}}
-        self._frame_cache_max = 10
+        # NACK 重传缓存 {(layer, frame_id): packets}（发送线程写、视频反馈线程读）
+        # 保留时长随各订阅端最大 RTT 调整
+        self._retransmit_cache = RetransmitCache(RETRANSMIT_CACHE_BYTES)
+
+        # 视频流水线：采集 → 编码 → 分片/FEC → 发送，阶段间以有界队列连接
+        # 原始帧可丢（只保留最新画面）；编码后的帧不可丢（保持参考链），满时阻塞形成背压
+        self._encode_queue = StageQueue(maxsize=2, drop_oldest=True)
+        self._packetize_queue = StageQueue(maxsize=2)
+        self._send_queue = StageQueue(maxsize=2)
+        # 条带化 JPEG 的编码线程池（首次使用时创建）
+        self._tile_pool: Optional[ThreadPoolExecutor] = None
+        self._stage_stats = {name: StageStats(name)
+                             for name in ("capture", "encode", "packetize", "send", "total")}
+        self._frames_encoded = 0
+        self._bytes_sent_window = 0
+
+        # 关键帧请求（PLI）统计；请求状态按层保存
+        self.keyframe_requests_received = 0
+        self.keyframe_requests_limited = 0
 
         # FEC 编码器
         self._fec_encoder = FECEncoder(self._params['fec_redundancy']) if FEC_AVAILABLE else None
 
-        # H.264 编码器（按需初始化）
-        self._h264_encoder = None
-        if self._params.get('encoder') == 'h264' and H264_AVAILABLE:
-            self._h264_encoder = H264Encoder(
-                VIDEO_WIDTH, VIDEO_HEIGHT, fps,
-                bitrate=target_bitrate_kbps * 1000
-            )
+        # 编码层：层 0 为全分辨率，simulcast_layers > 1 时追加低分辨率层
+        # 各层目标码率：开启拥塞控制时取该层订阅端估计值的最小值（不超过设定值 × 层比例）
+        self._layers: List[SimulcastLayer] = []
+        self._layer_info_seq = 0
+        self._build_layers()
 
         # 实时输入显示
         self.show_input = False
@@ -292,8 +646,12 @@ class AirUnitServer:
         self._start_udp_servers()
 
         self.is_running = True
-        threading.Thread(target=self._control_receiver_thread, daemon=True).start()
-        threading.Thread(target=self._video_sender_thread, daemon=True).start()
+        self._control.start("0.0.0.0", self.control_port)
+        threading.Thread(target=self._video_feedback_thread, daemon=True).start()
+        threading.Thread(target=self._capture_thread, daemon=True).start()
+        threading.Thread(target=self._encode_thread, daemon=True).start()
+        threading.Thread(target=self._packetize_thread, daemon=True).start()
+        threading.Thread(target=self._send_thread, daemon=True).start()
         threading.Thread(target=self._watchdog_thread, daemon=True).start()
 
         logger.info("Air Unit Server started successfully")
@@ -302,10 +660,14 @@ class AirUnitServer:
     def stop(self):
         """停止"""
         self.is_running = False
+        for sub in self._subscriber_list():
+            sub.pacer.stop()
+        self.source.close()
+        if self._tile_pool:
+            self._tile_pool.shutdown(wait=False)
         if self.zeroconf:
             self.zeroconf.close()
-        if self.control_socket:
-            self.control_socket.close()
+        self._control.stop()
         if self.video_socket:
             self.video_socket.close()
         logger.info("Air Unit Server stopped")
@@ -336,93 +698,65 @@ class AirUnitServer:
 
     def _start_udp_servers(self):
         """启动 UDP 服务器"""
-        self.control_socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
-        self.control_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
-        self.control_socket.bind(("0.0.0.0", self.control_port))
-        self.control_socket.settimeout(1.0)
-
         self.video_socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
         self.video_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
         self.video_socket.bind(("0.0.0.0", self.video_port))
         self.video_socket.settimeout(1.0)
 
-    def _control_receiver_thread(self):
-        """控制指令接收线程"""
-        logger.info("Control receiver thread started")
-        while self.is_running:
-            try:
-                data, addr = self.control_socket.recvfrom(4096)
-                if len(data) < 13:
-                    continue
-
-                magic, version, msg_type, reserved, seq = struct.unpack("=HBBBI", data[:9])
-                if magic != 0xABCD:
-                    continue
-
-                # CRC 校验
-                crc_received = struct.unpack("=I", data[-4:])[0]
-                crc_calculated = zlib.crc32(data[:-4]) & 0xffffffff
-                if crc_received != crc_calculated:
-                    continue
-
-                # 记录客户端 IP（只在 IP 变化时打印）
-                new_ip = addr[0]
-                if self.client_ip != new_ip:
-                    logger.info(f"Client connected: {new_ip}")
-                    self.client_ip = new_ip
-                self.last_client_time = time.time()
-
-                if msg_type == 0x01:  # 控制指令（键盘位图 + 鼠标数据）
-                    self.control_commands_received += 1
-                    kb_state = data[17:27] if len(data) >= 37 else data[17:-4] if len(data) >= 31 else b''
-                    mouse_dx = mouse_dy = mouse_buttons = scroll_delta = 0
-                    if len(data) >= 37:
-                        import struct as _s
-                        mouse_dx, mouse_dy, mouse_buttons, scroll_delta = _s.unpack('=hhBb', data[27:33])
-                    if self.show_input and kb_state:
-                        keys = decode_keyboard_bitmap(kb_state)
-                        mouse_info = f" mouse=({mouse_dx},{mouse_dy}) btn={mouse_buttons:#04x} scroll={scroll_delta}"
-                        if keys:
-                            print(f"\r  Keys: {' + '.join(keys):<40}{mouse_info}", end="", flush=True)
-                        else:
-                            print(f"\r  Keys: {'(none)':<40}{mouse_info}", end="", flush=True)
-                    elif self.control_commands_received % 500 == 1:
-                        pressed = sum(bin(b).count('1') for b in kb_state) if kb_state else 0
-                        logger.info(f"Control #{self.control_commands_received}: "
-                                    f"kb={kb_state.hex() if kb_state else 'empty'} "
-                                    f"({pressed} keys) mouse=({mouse_dx},{mouse_dy}) btn={mouse_buttons:#04x}")
-                    self._send_ack(addr, seq)
-                elif msg_type == 0x04:  # 心跳
-                    self.heartbeats_received += 1
-                    self._send_ack(addr, seq)
-                elif msg_type == 0x02:  # 参数修改
-                    self._handle_param_update(data, addr, seq)
-                elif msg_type == 0x03:  # 参数查询
-                    self._handle_param_query(addr, seq)
+    def _on_client_message(self, addr: tuple):
+        """记录客户端 IP（只在 IP 变化时打印）"""
+        if self.client_ip != addr[0]:
+            logger.info(f"Client connected: {addr[0]}")
+            self.client_ip = addr[0]
+        self.last_client_time = time.time()
+
+    def _handle_control_command(self, addr: tuple, seq: int, t1: float,
+                                payload: Optional[bytes], rx_time: float):
+        """控制指令（键盘位图 + 鼠标数据），按 seq 去重，跳号时由包内冗余补齐"""
+        self.control_commands_received += 1
+        cmd = ControlCommand.from_bytes(payload or b'')
+        # 重复 / 迟到的包同样回 ACK（客户端据此停止重传），但不再应用
+        self._send_ack(addr, seq, rx_time)
+        if not self._control_state(addr).receive(seq, cmd):
+            return
 
-            except socket.timeout:
-                continue
-            except Exception as e:
-                if self.is_running:
-                    logger.error(f"Control receiver error: {e}")
-
-    def _send_ack(self, addr, seq):
-        """发送 ACK"""
-        t2 = time.perf_counter()
-        t3 = time.perf_counter()
-        header = struct.pack("=HBBBI", 0xABCD, 0x01, 0x05, 0, seq)
-        timestamps = struct.pack("=dd", t2, t3)
-        msg = header + timestamps
-        crc = zlib.crc32(msg) & 0xffffffff
-        self.control_socket.sendto(msg + struct.pack("=I", crc), addr)
+        kb_state = cmd.keyboard_state
+        if self.show_input:
+            keys = decode_keyboard_bitmap(kb_state)
+            mouse_info = (f" mouse=({cmd.mouse_dx},{cmd.mouse_dy}) btn={cmd.mouse_buttons:#04x} "
+                          f"scroll={cmd.scroll_delta}")
+            print(f"\r  Keys: {' + '.join(keys) if keys else '(none)':<40}{mouse_info}", end="", flush=True)
+        elif self.control_commands_received % 500 == 1:
+            pressed = sum(bin(b).count('1') for b in kb_state)
+            logger.info(f"Control #{self.control_commands_received}: "
+                        f"kb={kb_state.hex()} ({pressed} keys) "
+                        f"mouse=({cmd.mouse_dx},{cmd.mouse_dy}) btn={cmd.mouse_buttons:#04x}")
+
+    def _control_state(self, addr: tuple) -> ControlStateReceiver:
+        state = self._control_states.get(addr)
+        if state is None:
+            state = self._control_states[addr] = ControlStateReceiver()
+            while len(self._control_states) > MAX_CONTROL_CLIENTS:
+                self._control_states.popitem(last=False)
+        else:
+            self._control_states.move_to_end(addr)
+        return state
+
+    def _handle_heartbeat(self, addr: tuple, seq: int, t1: float,
+                          payload: Optional[bytes], rx_time: float):
+        self.heartbeats_received += 1
+        self._send_ack(addr, seq, rx_time)
+
+    def _send_ack(self, addr: tuple, seq: int, rx_time: float):
+        """发送 ACK（t2 = 收包时间，t3 = 发送时间）"""
+        self._control.send_ack(addr, seq, rx_time)
         self.acks_sent += 1
 
-    def _handle_param_update(self, data: bytes, addr: tuple, seq: int):
+    def _handle_param_update(self, addr: tuple, seq: int, t1: float,
+                             payload: Optional[bytes], rx_time: float):
         """处理参数修改请求 — 存储并应用到编码器"""
-        import json
         try:
-            payload_bytes = data[17:-4]
-            params = json.loads(payload_bytes.decode('utf-8'))
+            params = json.loads((payload or b'').decode('utf-8'))
             for key, value in params.items():
                 if key in self._params:
                     old = self._params[key]
@@ -431,7 +765,7 @@ class AirUnitServer:
                         logger.info(f"Param updated: {key} = {value}")
                         self._apply_param(key, value)
             self.param_updates_received += 1
-            self._send_ack(addr, seq)
+            self._send_ack(addr, seq, rx_time)
         except Exception as e:
             logger.error(f"Param update error: {e}")
 
@@ -439,36 +773,23 @@ class AirUnitServer:
         """Apply a single parameter change to the running encoder/pipeline."""
         if key == 'bitrate':
             bitrate = int(value)
-            new_enc = AdaptiveEncoder(bitrate, self.fps, self.encoder.quality)
-            new_enc.brightness, new_enc.contrast = self.encoder.brightness, self.encoder.contrast
-            new_enc.sharpness, new_enc.denoise = self.encoder.sharpness, self.encoder.denoise
-            self.encoder = new_enc
-            if self._h264_encoder:
-                self._h264_encoder = H264Encoder(
-                    VIDEO_WIDTH, VIDEO_HEIGHT, self.fps, bitrate=bitrate * 1000)
-            logger.info(f"Encoder rebuilt: bitrate={bitrate} kbps")
+            for sub in self._subscriber_list():
+                self._set_subscriber_bounds(sub)
+            for layer in self._layers:
+                self._set_layer_bitrate(layer, self._layer_max_kbps(layer), force=True)
+            logger.info(f"Encoder reconfigured: bitrate={bitrate} kbps")
 
         elif key == 'target_fps':
             self.fps = int(value)
-            new_enc = AdaptiveEncoder(self._params['bitrate'], self.fps, self.encoder.quality)
-            new_enc.brightness, new_enc.contrast = self.encoder.brightness, self.encoder.contrast
-            new_enc.sharpness, new_enc.denoise = self.encoder.sharpness, self.encoder.denoise
-            self.encoder = new_enc
-            if self._h264_encoder:
-                self._h264_encoder = H264Encoder(
-                    VIDEO_WIDTH, VIDEO_HEIGHT, self.fps,
-                    bitrate=self._params['bitrate'] * 1000)
-            logger.info(f"Encoder rebuilt: fps={self.fps}")
+            for layer in self._layers:
+                self._set_layer_bitrate(layer, layer.bitrate_kbps, force=True)
+            logger.info(f"Encoder reconfigured: fps={self.fps}")
 
         elif key == 'encoder':
-            codec = str(value)
-            if codec == 'h264' and H264_AVAILABLE:
-                self._h264_encoder = H264Encoder(
-                    VIDEO_WIDTH, VIDEO_HEIGHT, self.fps,
-                    bitrate=self._params['bitrate'] * 1000)
+            self._build_layers()
+            if self._layers[0].h264_encoder:
                 logger.info("Switched to H.264 encoder")
             else:
-                self._h264_encoder = None
                 logger.info("Switched to JPEG encoder")
 
         elif key == 'fec_enabled':
@@ -486,28 +807,84 @@ class AirUnitServer:
                 self._fec_encoder = FECEncoder(redundancy)
                 logger.info(f"FEC redundancy updated: {redundancy}")
 
-        elif key in ('brightness', 'contrast', 'sharpness', 'denoise'):
-            setattr(self.encoder, key, int(value))
+        elif key == 'intra_refresh':
+            # 刷新模式无法在线切换，重建编码器（首帧为 IDR）
+            self._build_layers()
+            logger.info(f"Intra refresh {'enabled' if value else 'disabled'}")
+
+        elif key == 'jpeg_tiles':
+            self._params['jpeg_tiles'] = max(1, min(MAX_STRIPES, int(value)))
+            logger.info(f"JPEG stripes: {self._params['jpeg_tiles']}")
+
+        elif key == 'simulcast_layers':
+            self._build_layers()
+            logger.info(f"Simulcast layers: {', '.join(layer.summary() for layer in self._layers)}")
+
+        elif key == 'congestion_control':
+            if not value:
+                for layer in self._layers:
+                    self._set_layer_bitrate(layer, self._layer_max_kbps(layer))
+            logger.info(f"Congestion control {'enabled' if value else 'disabled'}")
+
+        elif key == 'pacing_spread':
+            spread = min(1.0, max(0.05, float(value)))
+            self._params['pacing_spread'] = spread
+            for sub in self._subscriber_list():
+                sub.pacer.spread_fraction = spread
+            logger.info(f"Pacing spread updated: {spread:.2f}")
+
+        elif key in ('brightness', 'contrast', 'gamma', 'sharpness', 'denoise'):
+            setattr(self.encoder.enhancer, key, int(value))
             logger.info(f"Enhancement updated: {key}={value}")
 
-    def _handle_param_query(self, addr: tuple, seq: int):
-        """处理参数查询请求 - 回复当前参数"""
-        import json
-        try:
-            payload = json.dumps(self._params).encode('utf-8')
-            header = struct.pack("=HBBBI", 0xABCD, 0x01, 0x02, 0, seq)
-            t1 = struct.pack("=d", time.perf_counter())
-            msg = header + t1 + payload
-            crc = zlib.crc32(msg) & 0xffffffff
-            self.control_socket.sendto(msg + struct.pack("=I", crc), addr)
-            self._send_ack(addr, seq)
-        except Exception as e:
-            logger.error(f"Param query error: {e}")
-
-    def _handle_video_nack(self, data: bytes):
-        """处理视频 NACK - 重传请求的分片"""
-        if not self.client_video_addr:
-            return
+    def _build_layers(self):
+        """按 simulcast_layers / encoder / intra_refresh 参数重建各层（保留 JPEG 码控状态与当前码率）"""
+        count = min(len(SIMULCAST_LAYERS), max(1, int(self._params.get('simulcast_layers', 1))))
+        old = {layer.index: layer for layer in self._layers}
+        layers = []
+        for index, (scale, share) in enumerate(SIMULCAST_LAYERS[:count]):
+            if index in old:
+                jpeg_encoder = old[index].jpeg_encoder
+            elif index == 0:
+                jpeg_encoder = self.encoder
+            else:
+                jpeg_encoder = AdaptiveEncoder(max(1, int(self._params['bitrate'] * share)),
+                                               self.fps, self.encoder.quality)
+            layer = SimulcastLayer(index, scale, share, jpeg_encoder)
+            if self._params.get('encoder') == 'h264' and H264_AVAILABLE:
+                layer.h264_encoder = self._create_h264_encoder(layer)
+            layers.append(layer)
+        self._layers = layers
+
+        # 超出层数的订阅端回落到最低层
+        for sub in self._subscriber_list():
+            if sub.pending_layer is not None and sub.pending_layer >= count:
+                sub.pending_layer = sub.switch_frame_id = None
+            if sub.layer >= count:
+                sub.layer = count - 1
+                self._set_subscriber_bounds(sub)
+            self._send_layer_info(sub)
+
+    def _layer_max_kbps(self, layer: SimulcastLayer) -> int:
+        """层码率上限 = 操作员设定码率 × 层比例"""
+        return max(1, int(int(self._params['bitrate']) * layer.bitrate_share))
+
+    def _create_h264_encoder(self, layer: SimulcastLayer) -> H264Encoder:
+        return H264Encoder(layer.width, layer.height, self.fps,
+                           bitrate=layer.bitrate_kbps * 1000,
+                           keyframe_interval=KEYFRAME_INTERVAL,
+                           intra_refresh=bool(self._params.get('intra_refresh', False)),
+                           slice_max_size=H264_CHUNK_SIZE,
+                           max_bitrate=self._layer_max_kbps(layer) * 1000)
+
+    def _handle_param_query(self, addr: tuple, seq: int, t1: float,
+                            payload: Optional[bytes], rx_time: float):
+        """处理参数查询请求 - 回复当前参数（参数修改消息格式）"""
+        self._control.sendto(Protocol.build_param_update(seq, time.perf_counter(), self._params), addr)
+        self._send_ack(addr, seq, rx_time)
+
+    def _handle_video_nack(self, sub: VideoSubscriber, data: bytes):
+        """处理视频 NACK - 重传请求的分片（只发给请求的订阅端）"""
         try:
             # 解析 NACK: header(9) + num_chunks(2) + chunk_indices(2*N) + CRC(4)
             crc_received = struct.unpack("=I", data[-4:])[0]
@@ -521,163 +898,581 @@ class AirUnitServer:
                 idx = struct.unpack("=H", data[11 + i * 2:13 + i * 2])[0]
                 missing.append(idx)
             # 从缓存重传
-            if frame_id in self._frame_cache:
-                for chunk_idx in missing:
-                    if chunk_idx in self._frame_cache[frame_id]:
-                        pkt = self._frame_cache[frame_id][chunk_idx]
-                        self.video_socket.sendto(pkt, self.client_video_addr)
-                logger.debug(f"NACK retransmit: frame {frame_id}, {len(missing)} chunks")
+            packets = self._retransmit_cache.get((sub.layer, frame_id), missing)
+            sub.nacks_received += 1
+            if packets:
+                sub.pacer.enqueue_retransmit(packets, sub.addr)
+                logger.debug(f"NACK retransmit to {sub.addr[0]}: frame {frame_id}, "
+                             f"{len(packets)}/{len(missing)} chunks")
         except Exception as e:
             logger.error(f"NACK handle error: {e}")
 
+    def _handle_video_feedback(self, sub: VideoSubscriber, data: bytes):
+        """处理传输层反馈 — 更新该订阅端的拥塞控制器并重新计算编码目标码率"""
+        try:
+            _, report_t, arrivals = Protocol.parse_video_feedback(data)
+        except ValueError:
+            return
+        sub.congestion.on_feedback(report_t, arrivals)
+        self._update_encoder_target()
+        rtts = [other.congestion.rtt for other in self._subscriber_list()
+                if other.congestion.rtt is not None]
+        if rtts:
+            self._retransmit_cache.set_rtt(max(rtts))
+
+    def _update_encoder_target(self):
+        """每层一路编码服务该层所有订阅端：层目标码率取其订阅端估计值的最小值"""
+        if not self._params.get('congestion_control', True):
+            return
+        subscribers = self._subscriber_list()
+        for layer in self._layers:
+            targets = [sub.congestion.target_kbps for sub in subscribers if sub.layer == layer.index]
+            if targets:
+                self._set_layer_bitrate(layer, int(min(targets)))
+
+    def _handle_keyframe_request(self, sub: VideoSubscriber, data: bytes):
+        """处理关键帧请求 — 限频后通知编码线程强制 I 帧（共享编码，所有订阅端同时收到）"""
+        try:
+            _, last_frame_id = Protocol.parse_keyframe_request(data)
+        except ValueError:
+            return
+        self.keyframe_requests_received += 1
+        sub.keyframe_requests += 1
+        layers = self._layers
+        layer = layers[min(sub.layer, len(layers) - 1)]
+        # 同一次丢失在一个 RTT 内可能收到多次请求，只响应一次
+        rtt = sub.congestion.rtt
+        min_interval = max(KEYFRAME_REQUEST_MIN_INTERVAL, 1.5 * rtt if rtt else 0.0)
+        if time.perf_counter() - layer.last_keyframe_forced < min_interval:
+            self.keyframe_requests_limited += 1
+            return
+        layer.keyframe_requested = True
+        logger.debug(f"Keyframe requested by {sub.addr[0]} on L{layer.index} "
+                     f"(last frame {last_frame_id})")
+
+    def _handle_layer_select(self, sub: VideoSubscriber, data: bytes):
+        """处理层选择 — 记录目标层，编码线程在目标层插入 IDR，发送线程在该帧处切换"""
+        try:
+            _, index = Protocol.parse_layer_select(data)
+        except ValueError:
+            return
+        index = min(index, len(self._layers) - 1)
+        if index == sub.layer:
+            sub.pending_layer = sub.switch_frame_id = None
+        elif index != sub.pending_layer:
+            sub.switch_frame_id = None
+            sub.pending_layer = index
+            logger.info(f"Video client {sub.addr[0]}:{sub.addr[1]} requested layer "
+                        f"L{sub.layer} -> L{index}")
+        self._send_layer_info(sub)
+
+    def _send_layer_info(self, sub: VideoSubscriber):
+        """向订阅端通告可用层与其当前层"""
+        if not self.video_socket:
+            return
+        self._layer_info_seq += 1
+        info = [(layer.width, layer.height, layer.bitrate_kbps) for layer in self._layers]
+        try:
+            self.video_socket.sendto(
+                Protocol.build_layer_info(self._layer_info_seq, sub.layer, info), sub.addr)
+        except OSError as e:
+            logger.debug(f"Layer info send failed: {e}")
+
+    def _set_subscriber_bounds(self, sub: VideoSubscriber):
+        """订阅端拥塞控制上限 = 其所在层的码率上限"""
+        layers = self._layers
+        max_kbps = self._layer_max_kbps(layers[min(sub.layer, len(layers) - 1)])
+        sub.congestion.set_bounds(min(CC_MIN_BITRATE_KBPS, max_kbps), max_kbps)
+
+    def _set_layer_bitrate(self, layer: SimulcastLayer, kbps: int, force: bool = False):
+        """应用层目标码率/当前帧率到该层编码器与其订阅端的节拍器（非强制时变化 < 5% 忽略）"""
+        current = layer.bitrate_kbps
+        if not force and abs(kbps - current) < 0.05 * current:
+            return
+        layer.bitrate_kbps = kbps
+        layer.jpeg_encoder.set_target_bitrate(kbps, self.fps)
+        for sub in self._subscriber_list():
+            if sub.layer == layer.index:
+                sub.pacer.configure(kbps, self.fps)
+        # H.264 在层码率上限之下在线修改码率控制，不重开编码器、不插入 IDR
+        h264_encoder = layer.h264_encoder
+        if h264_encoder:
+            h264_encoder.reconfigure(bitrate=kbps * 1000, fps=self.fps,
+                                     max_bitrate=self._layer_max_kbps(layer) * 1000)
+        logger.debug(f"L{layer.index} target bitrate: {kbps} kbps")
+
     def _watchdog_thread(self):
-        """客户端断连检测"""
+        """客户端断连检测（控制端 + 视频订阅端）"""
         while self.is_running:
             time.sleep(2.0)
+            now = time.time()
             if self.client_ip and self.last_client_time > 0:
-                elapsed = time.time() - self.last_client_time
+                elapsed = now - self.last_client_time
                 if elapsed > 5.0:
                     logger.warning(f"Client {self.client_ip} disconnected (no data for {elapsed:.0f}s)")
                     self.client_ip = None
-                    self.client_video_addr = None
-
-    def _video_sender_thread(self):
-        """视频发送线程 - 自适应码率彩条测试画面"""
-        logger.info(f"Video sender started (target: {self.encoder.target_bitrate_kbps} kbps, "
-                     f"{self.fps} fps, Q{self.encoder.quality})")
-        frame_id = 0
-        bytes_sent_window = 0
-        window_start = time.time()
+            for sub in self._subscriber_list():
+                if now - sub.last_seen > SUBSCRIBER_TIMEOUT:
+                    self._remove_subscriber(sub.addr, f"no feedback for {now - sub.last_seen:.0f}s")
+                elif len(self._layers) > 1:
+                    # 层信息可能丢失，定期重发
+                    self._send_layer_info(sub)
+
+    # -------------------------------------------------------------------------
+    # 视频订阅端
+    # -------------------------------------------------------------------------
+
+    def _subscriber_list(self) -> List[VideoSubscriber]:
+        with self._subscribers_lock:
+            return list(self._subscribers.values())
+
+    def _register_subscriber(self, addr: tuple) -> VideoSubscriber:
+        """REGISTER：新增订阅端或刷新活跃时间"""
+        with self._subscribers_lock:
+            sub = self._subscribers.get(addr)
+            if sub is not None:
+                sub.last_seen = time.time()
+                return sub
+            # 新订阅端从层 0 开始，由地面端按窗口与链路选择层
+            layer = self._layers[0]
+            max_kbps = self._layer_max_kbps(layer)
+            sub = VideoSubscriber(addr, self._send_video_packet, layer.bitrate_kbps, self.fps,
+                                  self._params['pacing_spread'],
+                                  min(CC_MIN_BITRATE_KBPS, max_kbps), max_kbps)
+            self._subscribers[addr] = sub
+            count = len(self._subscribers)
+        sub.pacer.start()
+        # 新订阅端需要从关键帧开始解码
+        layer.keyframe_requested = True
+        self._send_layer_info(sub)
+        logger.info(f"Video client registered: {addr[0]}:{addr[1]} ({count} subscribers)")
+        return sub
+
+    def _remove_subscriber(self, addr: tuple, reason: str):
+        with self._subscribers_lock:
+            sub = self._subscribers.pop(addr, None)
+            count = len(self._subscribers)
+        if sub is None:
+            return
+        sub.pacer.stop()
+        logger.warning(f"Video client {addr[0]}:{addr[1]} removed: {reason} ({count} subscribers)")
+        self._update_encoder_target()
 
+    def _video_feedback_thread(self):
+        """视频端口接收线程 — REGISTER / VIDEO_ACK / VIDEO_NACK"""
         while self.is_running:
             try:
-                # drain 所有待处理包（REGISTER/ACK/NACK），避免积压
-                if self.client_video_addr:
-                    self.video_socket.settimeout(0.001)
-                else:
-                    self.video_socket.settimeout(1.0)
-                while True:
-                    try:
-                        data, addr = self.video_socket.recvfrom(1024)
-                        if data == b"REGISTER":
-                            if self.client_video_addr != addr:
-                                logger.info(f"Video client registered: {addr[0]}:{addr[1]}")
-                            self.client_video_addr = addr
-                        elif len(data) >= 9 and struct.unpack("=H", data[:2])[0] == 0xABCD:
-                            msg_type = data[3]
-                            if msg_type == 0x06:  # VIDEO_ACK
-                                self.video_frames_acked += 1
-                            elif msg_type == 0x07:  # VIDEO_NACK
-                                self._handle_video_nack(data)
-                    except socket.timeout:
-                        break
-
-                # 等待客户端注册
-                if not self.client_video_addr:
-                    continue
+                # 满载的 VIDEO_FEEDBACK 超过 1KB，按最大 UDP 数据报接收，避免截断后 CRC 失败
+                data, addr = self.video_socket.recvfrom(65535)
+            except socket.timeout:
+                continue
+            except OSError:
+                if self.is_running:
+                    time.sleep(0.1)
+                continue
+            try:
+                if data == b"REGISTER":
+                    self._register_subscriber(addr)
+                elif len(data) >= 9 and struct.unpack("=H", data[:2])[0] == 0xABCD:
+                    with self._subscribers_lock:
+                        sub = self._subscribers.get(addr)
+                    if sub is None:
+                        continue  # 未注册的地址（如已超时移除），等待其重新 REGISTER
+                    sub.last_seen = time.time()
+                    msg_type = data[3]
+                    if msg_type == 0x06:  # VIDEO_ACK
+                        self.video_frames_acked += 1
+                        sub.frames_acked += 1
+                    elif msg_type == 0x07:  # VIDEO_NACK
+                        self._handle_video_nack(sub, data)
+                    elif msg_type == MSG_TYPE_VIDEO_FEEDBACK:
+                        self._handle_video_feedback(sub, data)
+                    elif msg_type == MSG_TYPE_KEYFRAME_REQUEST:
+                        self._handle_keyframe_request(sub, data)
+                    elif msg_type == MSG_TYPE_LAYER_SELECT:
+                        self._handle_layer_select(sub, data)
+            except Exception as e:
+                if self.is_running:
+                    logger.error(f"Video feedback error: {e}")
 
-                # 如果客户端已断连（watchdog 确认超时），停止发送
-                if self.last_client_time > 0:
-                    elapsed = time.time() - self.last_client_time
-                    if elapsed > 5.0:
-                        logger.warning("Video: client timeout, clearing video addr")
-                        self.client_video_addr = None
-                        continue
+    def _capture_thread(self):
+        """采集阶段 — 从视频源读取帧放入编码队列（满时丢最旧，只保留最新画面）
 
-                frame_start = time.perf_counter()
-                frame_id += 1
+        非实时源（测试卡/文件/图片序列）按目标帧率绝对时间节拍读取，不随处理耗时漂移；
+        实时源（采集设备）由 read() 按设备节拍阻塞。
+        """
+        source = self.source
+        logger.info(f"Video pipeline started (source: {source.describe()}, "
+                    f"target: {self.encoder.target_bitrate_kbps} kbps, "
+                    f"{self.fps} fps, Q{self.encoder.quality})")
+        capture_index = 0
+        next_t = time.perf_counter()
 
-                # 编码：H.264 或 JPEG
-                if self._h264_encoder:
-                    raw_frame = self.encoder.generate_dynamic_frame(frame_id)
-                    force_key = (frame_id % 30 == 1)
-                    h264_packets = self._h264_encoder.encode(raw_frame, force_keyframe=force_key)
-                    if not h264_packets:
-                        continue
-                    frame_data = h264_packets[0]
-                    codec_flag = 1  # H.264
+        while self.is_running:
+            try:
+                # 没有订阅端时不编码；实时源继续读取并丢弃，避免恢复时读到设备缓冲中的旧帧
+                if not self._subscribers:
+                    if source.live:
+                        source.read()
+                    else:
+                        time.sleep(0.05)
+                    next_t = time.perf_counter()
+                    continue
+
+                if not source.live:
+                    interval = 1.0 / self.fps
+                    now = time.perf_counter()
+                    if now < next_t:
+                        time.sleep(next_t - now)
+                    # 落后超过一帧时重新对齐，避免追帧突发
+                    next_t = max(next_t + interval, time.perf_counter() - interval)
+
+                # 所有层都是 H.264 时直接取 I420（编码器无需 BGR → YUV 转换）
+                source.prefer_yuv = all(layer.h264_encoder for layer in self._layers)
+                capture_t = time.perf_counter()
+                frame = source.read()
+                if frame is None:
+                    if not source.live:
+                        time.sleep(0.01)
+                    continue
+                capture_index += 1
+                job = VideoFrameJob(capture_index, capture_t)
+                if source.passthrough:
+                    # 已编码的 H.264：跳过编码阶段
+                    job.frame_data = frame.data
+                    job.codec_flag = 1
+                    job.keyframe = frame.keyframe
+                elif frame.yuv is not None:
+                    raw_frame = frame.yuv
+                    if raw_frame.shape[1] != VIDEO_WIDTH or raw_frame.shape[0] != VIDEO_HEIGHT * 3 // 2:
+                        raw_frame = resize_i420(raw_frame, VIDEO_WIDTH, VIDEO_HEIGHT)
+                    job.raw_frame = (raw_frame if frame.enhanced
+                                     else self.encoder.apply_enhancements_yuv(raw_frame))
+                    job.pix_fmt = "yuv420p"
                 else:
-                    frame_data = self.encoder.encode(frame_id)
-                    codec_flag = 0  # JPEG
+                    raw_frame = frame.image
+                    if raw_frame.shape[1] != VIDEO_WIDTH or raw_frame.shape[0] != VIDEO_HEIGHT:
+                        raw_frame = cv2.resize(raw_frame, (VIDEO_WIDTH, VIDEO_HEIGHT),
+                                               interpolation=cv2.INTER_AREA)
+                    job.raw_frame = (raw_frame if frame.enhanced
+                                     else self.encoder.apply_enhancements(raw_frame))
+                job.enhance_ms = self.encoder.enhancer.take_costs()
+                self._stage_stats["capture"].record((time.perf_counter() - capture_t) * 1000.0)
+                self._encode_queue.put(job)
 
-                encode_time_ms = (time.perf_counter() - frame_start) * 1000.0
+            except Exception as e:
+                if self.is_running:
+                    logger.error(f"Video capture error: {e}")
 
-                # 分片发送
-                _t_fec_start = time.perf_counter()
-                CHUNK_SIZE = 60000
-                total_data_chunks = (len(frame_data) + CHUNK_SIZE - 1) // CHUNK_SIZE
-                data_chunks = []
-                for chunk_idx in range(total_data_chunks):
-                    offset = chunk_idx * CHUNK_SIZE
-                    data_chunks.append(frame_data[offset:offset + CHUNK_SIZE])
+    def _encode_thread(self):
+        """编码阶段 — 对有订阅端的每一层编码（H.264 或 JPEG），各层共享连续的线上帧号"""
+        while self.is_running:
+            job = self._encode_queue.get()
+            if job is None:
+                continue
+            try:
+                t0 = time.perf_counter()
+                if job.frame_data:
+                    # 直通源：只有层 0，无法响应关键帧请求（由源自身的 GOP 恢复）
+                    self._frames_encoded += 1
+                    job.frame_id = self._frames_encoded
+                    job.encode_done_t = time.perf_counter()
+                    while self.is_running and not self._packetize_queue.put(job):
+                        pass
+                    continue
+                layers = self._layers
+                frame_id = self._frames_encoded + 1
+                subscribers = self._subscriber_list()
+                wanted = set()
+                for sub in subscribers:
+                    wanted.add(sub.layer)
+                    pending = sub.pending_layer
+                    if pending is not None and pending < len(layers):
+                        wanted.add(pending)
+                        if sub.switch_frame_id is None:
+                            # 切层点：目标层本帧插入 IDR，发送线程自本帧起改发目标层
+                            layers[pending].idr_requested = True
+                            sub.switch_frame_id = frame_id
+
+                raw_frame = job.raw_frame
+                produced = False
+                for layer in layers:
+                    if layer.index not in wanted:
+                        layer.active = False
+                        continue
+                    if not layer.active:
+                        # 闲置层重新启用：之前的参考帧已不连续
+                        layer.active = True
+                        layer.keyframe_requested = True
+                    if layer.index > 0 and raw_frame.shape[1] != layer.width:
+                        # 逐级缩小（从上一层画面缩放，代价随层递减）
+                        if job.pix_fmt == "yuv420p":
+                            raw_frame = resize_i420(raw_frame, layer.width, layer.height)
+                        else:
+                            raw_frame = cv2.resize(raw_frame, (layer.width, layer.height),
+                                                   interpolation=cv2.INTER_AREA)
+                    layer_job = VideoFrameJob(job.capture_index, job.capture_t, layer=layer.index,
+                                              pix_fmt=job.pix_fmt, enhance_ms=job.enhance_ms)
+                    if not self._encode_layer(layer, raw_frame, layer_job):
+                        continue
+                    layer_job.frame_id = frame_id
+                    layer_job.encode_done_t = time.perf_counter()
+                    layer.frames_encoded += 1
+                    produced = True
+                    while self.is_running and not self._packetize_queue.put(layer_job):
+                        pass
+                # 编码器已拷贝输入，测试卡帧归还复用池
+                self.encoder.release_frame(job.raw_frame)
+                if produced:
+                    self._frames_encoded = frame_id
+                    self._stage_stats["encode"].record((time.perf_counter() - t0) * 1000.0)
+            except Exception as e:
+                if self.is_running:
+                    logger.error(f"Video encode error: {e}")
+
+    def _encode_layer(self, layer: SimulcastLayer, raw_frame: np.ndarray, job: VideoFrameJob) -> bool:
+        """编码一层画面写入 job，编码器无输出时返回 False"""
+        h264_encoder = layer.h264_encoder
+        yuv = job.pix_fmt == "yuv420p"
+        if not h264_encoder:
+            if yuv:
+                # 编码器刚切换为 JPEG 时队列中可能仍有 I420 帧
+                raw_frame = cv2.cvtColor(raw_frame, cv2.COLOR_YUV2BGR_I420)
+            stripes = int(self._params.get('jpeg_tiles', 1))
+            if stripes > 1:
+                if self._tile_pool is None:
+                    self._tile_pool = ThreadPoolExecutor(JPEG_TILE_WORKERS,
+                                                         thread_name_prefix="jpeg-tile")
+                job.frame_data = layer.jpeg_encoder.encode_frame(raw_frame, stripes, self._tile_pool)
+                job.codec_flag = 2  # 条带化 JPEG
+            else:
+                job.frame_data = layer.jpeg_encoder.encode_frame(raw_frame)
+                job.codec_flag = 0  # JPEG
+            job.keyframe = True
+            return True
+
+        if layer.idr_requested:
+            layer.idr_requested = False
+            layer.keyframe_requested = True
+            if h264_encoder.intra_refresh:
+                # 帧内刷新模式下强制 I 帧不产生 IDR，切层需要重开编码器（首帧为 IDR）
+                h264_encoder = layer.h264_encoder = self._create_h264_encoder(layer)
+        requested = layer.keyframe_requested
+        if requested:
+            # 接收端请求：IDR 模式下插入 IDR；帧内刷新模式下 x264 以新的刷新周期响应
+            layer.keyframe_requested = False
+            layer.last_keyframe_forced = time.perf_counter()
+        first_frame = h264_encoder.pts == 0
+        if h264_encoder.intra_refresh:
+            # 帧内刷新模式只有首帧为 IDR，之后靠刷新周期恢复
+            force_key = requested or first_frame
+        else:
+            force_key = (requested or first_frame or
+                         layer.frames_since_keyframe >= KEYFRAME_INTERVAL)
+        if yuv:
+            h264_packets = h264_encoder.encode_yuv(raw_frame, force_keyframe=force_key)
+        else:
+            h264_packets = h264_encoder.encode(raw_frame, force_keyframe=force_key)
+        # 码率超出上限时 reconfigure 会重开编码器，其首帧同样是 IDR
+        reopened = h264_encoder.last_reopened
+        layer.frames_since_keyframe = 1 if force_key or reopened else layer.frames_since_keyframe + 1
+        if not h264_packets:
+            return False
+        # 编码器可能一次输出多个 packet，全部发送
+        job.frame_data = b"".join(h264_packets)
+        job.codec_flag = 1  # H.264
+        job.keyframe = reopened or (force_key and not h264_encoder.intra_refresh)
+        return True
+
+    def _packetize_thread(self):
+        """分片 + FEC 阶段 — 生成带头的完整 UDP 包"""
+        while self.is_running:
+            job = self._packetize_queue.get()
+            if job is None:
+                continue
+            try:
+                t0 = time.perf_counter()
+                frame_data = job.frame_data
+                if job.codec_flag == 1:
+                    # H.264：分片对齐 NAL，丢失的分片只影响其中的 slice
+                    data_chunks = packetize_access_unit(frame_data, H264_CHUNK_SIZE)
+                elif job.codec_flag == 2:
+                    # 条带化 JPEG：每个条带单独成片，丢失只影响该条带
+                    data_chunks = packetize_tiles(frame_data, CHUNK_SIZE)
+                else:
+                    data_chunks = [frame_data[i:i + CHUNK_SIZE]
+                                   for i in range(0, len(frame_data), CHUNK_SIZE)]
+                total_data_chunks = len(data_chunks)
 
                 # FEC 编码
-                fec_enabled = self._params.get('fec_enabled', False)
-                if fec_enabled and self._fec_encoder:
-                    all_chunks = self._fec_encoder.encode(data_chunks)
+                fec_encoder = self._fec_encoder
+                if (self._params.get('fec_enabled', False) and fec_encoder and
+                        total_data_chunks * (1 + fec_encoder.redundancy) + 1 <= FEC_MAX_CHUNKS):
+                    all_chunks = fec_encoder.encode(data_chunks)
                 else:
                     all_chunks = data_chunks
                 total_chunks_with_fec = len(all_chunks)
-                fec_time_ms = (time.perf_counter() - _t_fec_start) * 1000.0
-
-                _t_send_start = time.perf_counter()
-                frame_packets = {}
-                try:
-                    for chunk_idx, chunk in enumerate(all_chunks):
-                        is_parity = 1 if chunk_idx >= total_data_chunks else 0
-                        # 头: [frame_id:4][total:2][idx:2][size:4][fec_flag:1][orig_chunks:2][codec:1][encode_ms:4]
-                        header = struct.pack("=IHHIBHBf",
-                                             frame_id, total_chunks_with_fec, chunk_idx,
-                                             len(chunk), is_parity, total_data_chunks, codec_flag,
-                                             encode_time_ms)
-                        pkt = header + chunk
-                        frame_packets[chunk_idx] = pkt
-                        self.video_socket.sendto(pkt, self.client_video_addr)
-                        bytes_sent_window += len(pkt)
-                    self.video_frames_sent += 1
-                    # 缓存帧用于 NACK 重传
-                    self._frame_cache[frame_id] = frame_packets
-                    if len(self._frame_cache) > self._frame_cache_max:
-                        oldest = min(self._frame_cache.keys())
-                        del self._frame_cache[oldest]
-                except Exception as e:
-                    logger.warning(f"Video send failed: {e}")
-                    self.client_video_addr = None
-                send_time_ms = (time.perf_counter() - _t_send_start) * 1000.0
-
-                total_frame_ms = (time.perf_counter() - frame_start) * 1000.0
-                if total_frame_ms > (1000.0 / self.fps) * 1.5:
-                    logger.warning(f"[SLOW SEND] {total_frame_ms:.1f}ms | "
-                                   f"encode={encode_time_ms:.1f} fec={fec_time_ms:.1f} "
-                                   f"send={send_time_ms:.1f} "
-                                   f"chunks={total_data_chunks}+{total_chunks_with_fec - total_data_chunks} "
-                                   f"size={len(frame_data)}")
-
-                # 码率统计（每 5 秒打印）
-                now = time.time()
-                win_elapsed = now - window_start
-                if win_elapsed >= 5.0:
-                    bitrate_kbps = (bytes_sent_window * 8) / (win_elapsed * 1000)
-                    logger.info(f"Video: {bitrate_kbps:.0f} kbps, Q{self.encoder.quality}, "
-                                f"{len(frame_data)} bytes/frame")
-                    bytes_sent_window = 0
-                    window_start = now
-
-                # 精确帧间隔控制
-                elapsed = time.perf_counter() - frame_start
-                sleep_time = max(0.001, (1.0 / self.fps) - elapsed)
-                time.sleep(sleep_time)
 
+                encode_time_ms = (job.encode_done_t - job.capture_t) * 1000.0
+                # 首包发送时刻在此阶段尚未知，先填分片时刻，实际发送时由 _send_video_packet 改写
+                first_send_t = time.perf_counter()
+                for chunk_idx, chunk in enumerate(all_chunks):
+                    is_parity = 1 if chunk_idx >= total_data_chunks else 0
+                    # 头: [frame_id:4][total:2][idx:2][size:4][fec_flag:1][orig_chunks:2][codec:1][encode_ms:4]
+                    #     [capture_t:8][encode_done_t:8][first_send_t:8]
+                    header = VIDEO_HEADER_TRACE.pack(
+                        job.frame_id, total_chunks_with_fec, chunk_idx,
+                        len(chunk), is_parity, total_data_chunks, job.codec_flag,
+                        encode_time_ms, job.capture_t, job.encode_done_t, first_send_t)
+                    job.packets.append(header + chunk)
+                job.data_chunks = total_data_chunks
+                job.packetize_done_t = time.perf_counter()
+                self._stage_stats["packetize"].record((job.packetize_done_t - t0) * 1000.0)
+
+                while self.is_running and not self._send_queue.put(job):
+                    pass
             except Exception as e:
                 if self.is_running:
-                    logger.error(f"Video sender error: {e}")
+                    logger.error(f"Video packetize error: {e}")
+
+    def _send_video_packet(self, sub: VideoSubscriber, pkt: bytes, addr):
+        """节拍器回调 — 实际写入 socket，并登记发送时刻供该订阅端的拥塞控制匹配反馈
+
+        当前帧的分片头写入该订阅端首个分片的实际发送时刻（分片为各订阅端共享，
+        改写在副本上）；旧帧的 NACK 重传保持原样。
+        """
+        frame_id, _, chunk_idx = struct.unpack_from("=IHH", pkt)
+        if frame_id > sub.first_send_frame_id:
+            sub.first_send_frame_id = frame_id
+            sub.first_send_t = time.perf_counter()
+        if frame_id == sub.first_send_frame_id:
+            pkt = bytearray(pkt)
+            VIDEO_TRACE_FIRST_SEND.pack_into(pkt, VIDEO_TRACE_FIRST_SEND_OFFSET, sub.first_send_t)
+        self.video_socket.sendto(pkt, addr)
+        sub.congestion.on_packet_sent(frame_id, chunk_idx, len(pkt), time.perf_counter())
+
+    def _send_thread(self):
+        """发送阶段 — 扇出到各订阅端的节拍器、缓存用于 NACK 重传、统计码率"""
+        window_start = time.time()
+
+        while self.is_running:
+            job = self._send_queue.get()
+            if job is None:
+                continue
+            subscribers = [sub for sub in self._subscriber_list() if self._subscriber_wants(sub, job)]
+            if not subscribers:
+                continue
+            t0 = time.perf_counter()
+            frame_bytes = sum(len(pkt) for pkt in job.packets)
+            layers = self._layers
+            layer_kbps = layers[job.layer].bitrate_kbps if job.layer < len(layers) else 0
+            backlog_limit = layer_kbps * 1000 / 8 * SUBSCRIBER_MAX_BACKLOG
+            for sub in subscribers:
+                # 慢订阅端：积压超限时丢弃其积压（接收端随后 NACK / 请求关键帧），其他订阅端不受影响
+                if sub.pacer.queued_bytes > backlog_limit:
+                    sub.pacer.flush()
+                    sub.frames_dropped += 1
+                sub.pacer.enqueue_frame(job.packets, sub.addr)
+                sub.frames_sent += 1
+            self._bytes_sent_window += frame_bytes * len(subscribers)
+            self.video_frames_sent += 1
+            # 缓存帧用于 NACK 重传
+            self._retransmit_cache.put((job.layer, job.frame_id), job.packets)
+
+            done_t = time.perf_counter()
+            send_time_ms = (done_t - t0) * 1000.0
+            total_frame_ms = (done_t - job.capture_t) * 1000.0
+            self._stage_stats["send"].record(send_time_ms)
+            self._stage_stats["total"].record(total_frame_ms)
+
+            if total_frame_ms > (1000.0 / self.fps) * 1.5:
+                fec_chunks = len(job.packets) - job.data_chunks
+                enhance = " ".join(f"{name}={ms:.1f}" for name, ms in job.enhance_ms.items())
+                logger.warning(f"[SLOW FRAME] {total_frame_ms:.1f}ms | "
+                               f"encode={(job.encode_done_t - job.capture_t) * 1000.0:.1f} "
+                               f"enhance=[{enhance or '-'}] "
+                               f"packetize={(job.packetize_done_t - job.encode_done_t) * 1000.0:.1f} "
+                               f"send={send_time_ms:.1f} "
+                               f"queues={self._pipeline_depths()} "
+                               f"chunks={job.data_chunks}+{fec_chunks} "
+                               f"size={len(job.frame_data)}")
+
+            # 码率 + 阶段统计（每 5 秒打印）
+            now = time.time()
+            win_elapsed = now - window_start
+            if win_elapsed >= 5.0:
+                bitrate_kbps = (self._bytes_sent_window * 8) / (win_elapsed * 1000)
+                logger.info(f"Video: {bitrate_kbps:.0f} kbps, Q{self.encoder.quality}, "
+                            f"{len(job.frame_data)} bytes/frame")
+                logger.info(f"Pipeline: {self._pipeline_summary()}")
+                logger.info(f"Retransmit cache: {self._retransmit_cache.summary()}")
+                for sub in subscribers:
+                    logger.info(f"Subscriber {sub.summary()}")
+                self._bytes_sent_window = 0
+                window_start = now
+
+    def _subscriber_wants(self, sub: VideoSubscriber, job: VideoFrameJob) -> bool:
+        """该层的这一帧是否发给订阅端；切层在切换帧处完成，之前发旧层、之后只发目标层"""
+        pending, switch_at = sub.pending_layer, sub.switch_frame_id
+        if pending is None or switch_at is None or job.frame_id < switch_at:
+            return job.layer == sub.layer
+        if job.layer != pending:
+            return False
+        if not job.keyframe:
+            # 目标层未在切换帧产生关键帧：由编码线程在下一帧重新安排（期间丢帧由 PLI 恢复）
+            sub.switch_frame_id = None
+            return False
+        self._commit_layer_switch(sub, pending)
+        return True
+
+    def _commit_layer_switch(self, sub: VideoSubscriber, index: int):
+        old = sub.layer
+        sub.layer = index
+        sub.pending_layer = sub.switch_frame_id = None
+        sub.layer_switches += 1
+        layer = self._layers[index]
+        self._set_subscriber_bounds(sub)
+        sub.pacer.configure(layer.bitrate_kbps, self.fps)
+        self._send_layer_info(sub)
+        logger.info(f"Video client {sub.addr[0]}:{sub.addr[1]} switched L{old} -> L{index} "
+                    f"({layer.width}x{layer.height})")
+
+    def _pipeline_depths(self) -> str:
+        """各阶段输入队列深度"""
+        return (f"{self._encode_queue.qsize()}/{self._packetize_queue.qsize()}/"
+                f"{self._send_queue.qsize()}")
+
+    def _pipeline_summary(self) -> str:
+        """各阶段平均/最大耗时 + 队列深度 + 丢帧数（读取后开始新统计窗口）"""
+        parts = []
+        for name, stats in self._stage_stats.items():
+            snap = stats.snapshot()
+            parts.append(f"{name}={snap['avg_ms']:.1f}/{snap['max_ms']:.1f}ms")
+        parts.append(f"queues={self._pipeline_depths()}")
+        parts.append(f"dropped={self._encode_queue.dropped}")
+        parts.append(f"subscribers={len(self._subscribers)}")
+        parts.append("target=" + "/".join(str(layer.bitrate_kbps) for layer in self._layers) + " kbps")
+        return " ".join(parts)
 
     def print_statistics(self):
         logger.info("=" * 50)
         logger.info(f"Control: {self.control_commands_received} cmds, "
                      f"HB: {self.heartbeats_received}, ACK: {self.acks_sent}, "
                      f"Params: {self.param_updates_received}, "
-                     f"Video: {self.video_frames_sent} sent / {self.video_frames_acked} acked")
+                     f"Video: {self.video_frames_sent} sent / {self.video_frames_acked} acked, "
+                     f"keyframe requests: {self.keyframe_requests_received} "
+                     f"({self.keyframe_requests_limited} rate-limited)")
+        states = list(self._control_states.values())
+        if states:
+            logger.info(f"Control redundancy: recovered={sum(st.recovered for st in states)} "
+                        f"lost={sum(st.lost for st in states)} "
+                        f"duplicates={sum(st.duplicates for st in states)}")
+        logger.info(f"Pipeline (avg/max): {self._pipeline_summary()}")
+        logger.info(f"Retransmit cache: {self._retransmit_cache.summary()}")
+        for layer in self._layers:
+            logger.info(f"Layer {layer.summary()}")
+        for sub in self._subscriber_list():
+            logger.info(f"Subscriber {sub.summary()}")
         if self.client_ip:
             logger.info(f"Client: {self.client_ip}")
         logger.info("=" * 50)
@@ -698,20 +1493,48 @@ def main():
     parser.add_argument("--codec", choices=["jpeg", "h264"], default="h264",
                         help="Video codec (default: h264)")
     parser.add_argument("--fec", action="store_true", help="Enable FEC")
+    parser.add_argument("--intra-refresh", action="store_true",
+                        help="Use H.264 periodic intra refresh instead of periodic IDR frames")
+    parser.add_argument("--source", default="test",
+                        help="Video source: test | file:<path> | images:<dir> | v4l2[:<device>] "
+                             "(default: test)")
+    parser.add_argument("--passthrough", action="store_true",
+                        help="Send H.264 from a file or V4L2 source without re-encoding")
+    parser.add_argument("--simulcast", type=int, default=1, choices=range(1, len(SIMULCAST_LAYERS) + 1),
+                        help="Number of resolution layers encoded at once (default: 1)")
+    parser.add_argument("--jpeg-tiles", type=int, default=1,
+                        help="Encode JPEG frames as N independent horizontal stripes in parallel "
+                             "(default: 1, whole frame)")
+    parser.add_argument("--pacing-spread", type=float, default=DEFAULT_PACING_SPREAD,
+                        help="Fraction of the frame interval each frame's packets are spread over "
+                             f"(default: {DEFAULT_PACING_SPREAD})")
     parser.add_argument("--show-input", action="store_true",
                         help="Real-time display of keyboard input data")
     args = parser.parse_args()
 
     if args.verbose:
         logging.getLogger().setLevel(logging.DEBUG)
+    if args.passthrough and not args.source.startswith(('file:', 'v4l2')):
+        parser.error("--passthrough requires a file or v4l2 source")
+    if args.passthrough and args.simulcast > 1:
+        parser.error("--passthrough cannot be combined with --simulcast")
 
     server = AirUnitServer(args.name, args.control_port, args.video_port,
                            args.bitrate, args.fps, args.quality)
     if args.codec == 'jpeg':
         server._params['encoder'] = 'jpeg'
-        server._h264_encoder = None
     if args.fec:
         server._params['fec_enabled'] = True
+    if args.intra_refresh:
+        server._params['intra_refresh'] = True
+    server._params['simulcast_layers'] = args.simulcast
+    server._params['jpeg_tiles'] = max(1, min(MAX_STRIPES, args.jpeg_tiles))
+    if args.codec == 'jpeg' or args.intra_refresh or args.simulcast > 1:
+        server._build_layers()
+    if args.source != 'test':
+        server.source = create_video_source(args.source, VIDEO_WIDTH, VIDEO_HEIGHT, args.fps,
+                                            passthrough=args.passthrough)
+    server._params['pacing_spread'] = args.pacing_spread
     if args.show_input:
         server.show_input = True
     server.start()
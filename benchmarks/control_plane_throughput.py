@@ -0,0 +1,195 @@
+#!/usr/bin/env python3
+"""控制面吞吐基准 - 原阻塞接收线程 vs asyncio ControlServer
+
+在本机起一个控制端口服务（两种实现各跑一遍），由若干客户端进程模拟大量客户端：
+每个客户端一个 UDP socket，按窗口发送控制指令（每 10 条夹一条心跳）并等待 ACK。
+
+  - legacy：原 AirUnitServer._control_receiver_thread（手工解析头 / CRC，ACK 四次 struct.pack 拼接）
+  - asyncio：network.control_server.ControlServer（Protocol 编解码 + 查表分发）
+
+输出：服务端处理速率（messages/s）、客户端收到 ACK 的比例、ACK 往返 p50 / p99
+
+用法：python benchmarks/control_plane_throughput.py [--clients 64 --procs 4 --duration 3 --window 8]
+"""
+
+import argparse
+import multiprocessing
+import os
+import socket
+import statistics
+import struct
+import sys
+import threading
+import time
+import zlib
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from network.control_server import ControlServer  # noqa: E402
+from network.protocol import (Protocol, ControlCommand, MSG_TYPE_CONTROL_COMMAND,  # noqa: E402
+                              MSG_TYPE_HEARTBEAT)
+
+
+class LegacyControlServer:
+    """原阻塞式控制接收线程（对照组），逻辑与改造前的 AirUnitServer 一致"""
+
+    def __init__(self):
+        self.messages_received = 0
+        self._running = False
+        self._sock = None
+
+    def start(self, host: str = "127.0.0.1", port: int = 0) -> tuple:
+        self._sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self._sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self._sock.bind((host, port))
+        self._sock.settimeout(1.0)
+        self._running = True
+        threading.Thread(target=self._run, daemon=True).start()
+        return self._sock.getsockname()
+
+    def stop(self):
+        self._running = False
+
+    def _run(self):
+        while self._running:
+            try:
+                data, addr = self._sock.recvfrom(4096)
+                if len(data) < 13:
+                    continue
+                magic, version, msg_type, reserved, seq = struct.unpack("=HBBBI", data[:9])
+                if magic != 0xABCD:
+                    continue
+                crc_received = struct.unpack("=I", data[-4:])[0]
+                crc_calculated = zlib.crc32(data[:-4]) & 0xffffffff
+                if crc_received != crc_calculated:
+                    continue
+                self.messages_received += 1
+                if msg_type == 0x01:
+                    kb_state = data[17:27] if len(data) >= 37 else b''
+                    if len(data) >= 37:
+                        struct.unpack('=hhBb', data[27:33])
+                    sum(bin(b).count('1') for b in kb_state)
+                    self._send_ack(addr, seq)
+                elif msg_type == 0x04:
+                    self._send_ack(addr, seq)
+            except socket.timeout:
+                continue
+            except OSError:
+                if self._running:
+                    raise
+
+    def _send_ack(self, addr, seq):
+        t2 = time.perf_counter()
+        t3 = time.perf_counter()
+        header = struct.pack("=HBBBI", 0xABCD, 0x01, 0x05, 0, seq)
+        timestamps = struct.pack("=dd", t2, t3)
+        msg = header + timestamps
+        crc = zlib.crc32(msg) & 0xffffffff
+        self._sock.sendto(msg + struct.pack("=I", crc), addr)
+
+
+def make_asyncio_server() -> ControlServer:
+    server = ControlServer()
+
+    def on_control(addr, seq, t1, payload, rx_time):
+        cmd = ControlCommand.from_bytes(payload or b'')
+        sum(bin(b).count('1') for b in cmd.keyboard_state)
+        server.send_ack(addr, seq, rx_time)
+
+    def on_heartbeat(addr, seq, t1, payload, rx_time):
+        server.send_ack(addr, seq, rx_time)
+
+    server.register(MSG_TYPE_CONTROL_COMMAND, on_control)
+    server.register(MSG_TYPE_HEARTBEAT, on_heartbeat)
+    return server
+
+
+def client_proc(addr: tuple, clients: int, window: int, duration: float, results):
+    """一个客户端进程：clients 个 socket 轮流按窗口发送，收齐（或超时）后进入下一轮"""
+    socks = []
+    for _ in range(clients):
+        sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        sock.bind(("127.0.0.1", 0))
+        sock.settimeout(0.05)
+        socks.append(sock)
+    keyboard = bytes(range(10))
+    sent = acked = 0
+    rtts = []
+    seq = 0
+    deadline = time.perf_counter() + duration
+    while time.perf_counter() < deadline:
+        send_times = {}
+        for sock in socks:
+            for _ in range(window):
+                seq += 1
+                t1 = time.perf_counter()
+                if seq % 10 == 0:
+                    message = Protocol.build_heartbeat(seq, t1)
+                else:
+                    message = Protocol.build_control_command(seq, t1, keyboard, seq % 7, -3, 1, 0)
+                sock.sendto(message, addr)
+                send_times[seq] = t1
+                sent += 1
+        for sock in socks:
+            for _ in range(window):
+                try:
+                    data = sock.recv(64)
+                except socket.timeout:
+                    break
+                ack_seq, _, _ = Protocol.parse_ack(data)
+                t1 = send_times.pop(ack_seq, None)
+                if t1 is not None:
+                    acked += 1
+                    rtts.append(time.perf_counter() - t1)
+    for sock in socks:
+        sock.close()
+    results.put((sent, acked, rtts[::10]))
+
+
+def run(kind: str, clients: int, procs: int, window: int, duration: float) -> dict:
+    server = LegacyControlServer() if kind == "legacy" else make_asyncio_server()
+    addr = server.start("127.0.0.1", 0)
+    results = multiprocessing.Queue()
+    per_proc = [clients // procs + (1 if i < clients % procs else 0) for i in range(procs)]
+    workers = [multiprocessing.Process(target=client_proc, args=(addr, n, window, duration, results))
+               for n in per_proc if n > 0]
+    start_count = server.messages_received
+    t0 = time.perf_counter()
+    for w in workers:
+        w.start()
+    outputs = [results.get() for _ in workers]
+    elapsed = time.perf_counter() - t0
+    for w in workers:
+        w.join()
+    handled = server.messages_received - start_count
+    server.stop()
+
+    sent = sum(o[0] for o in outputs)
+    acked = sum(o[1] for o in outputs)
+    rtts = sorted(r for o in outputs for r in o[2])
+    return {
+        "rate": handled / elapsed,
+        "acked": acked / sent * 100 if sent else 0.0,
+        "p50": statistics.median(rtts) * 1000 if rtts else 0.0,
+        "p99": rtts[int(len(rtts) * 0.99)] * 1000 if rtts else 0.0,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Control plane throughput benchmark")
+    parser.add_argument("--clients", type=int, nargs="+", default=[1, 16, 64, 256])
+    parser.add_argument("--procs", type=int, default=4, help="Client processes")
+    parser.add_argument("--window", type=int, default=8, help="Messages in flight per client")
+    parser.add_argument("--duration", type=float, default=3.0)
+    args = parser.parse_args()
+
+    print(f"{'server':<10}{'clients':>8}{'msg/s':>12}{'acked%':>9}{'p50 ms':>9}{'p99 ms':>9}")
+    for clients in args.clients:
+        for kind in ("legacy", "asyncio"):
+            r = run(kind, clients, min(args.procs, clients), args.window, args.duration)
+            print(f"{kind:<10}{clients:>8}{r['rate']:>12.0f}{r['acked']:>9.1f}"
+                  f"{r['p50']:>9.2f}{r['p99']:>9.2f}")
+
+
+if __name__ == "__main__":
+    main()
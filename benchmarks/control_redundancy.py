@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+"""控制指令丢包修复仿真 - 超时重传 vs 包内冗余
+
+按 TX 发送频率生成鼠标移动 / 点击输入，经带突发丢包的信道（Gilbert 模型）发给
+ControlStateReceiver，对比：
+  - retransmit：原超时重传（丢包 100 ms 后以同一 seq 重发，只带键盘状态、不带鼠标数据；
+    此时后续包已到达，按 seq 去重后重传包不再应用）
+  - redundancy N：每个包携带前 N 条指令的鼠标数据，下一个到达的包即补齐
+
+输出：鼠标位移丢失比例、点击丢失数、丢失指令的修复延迟（ms，均值 / 最大）、
+      未修复的丢失指令数、控制包大小
+
+用法：python benchmarks/control_redundancy.py [--loss 0.05 --burst 2 --seconds 60 --rate 50]
+"""
+
+import argparse
+import os
+import random
+import statistics
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from network.control_state import ControlStateReceiver  # noqa: E402
+from network.protocol import Protocol, ControlCommand  # noqa: E402
+
+RETRANSMIT_TIMEOUT = 0.1
+
+
+def make_inputs(count: int, seed: int) -> list:
+    """[(dx, dy, buttons)]：连续移动 + 每 ~0.5 秒一次 1~2 帧长的点击"""
+    rng = random.Random(seed)
+    inputs, hold = [], 0
+    for _ in range(count):
+        if hold == 0 and rng.random() < 0.04:
+            hold = rng.randint(1, 2)
+        buttons = 1 if hold else 0
+        hold = max(0, hold - 1)
+        inputs.append((rng.randint(-20, 20), rng.randint(-20, 20), buttons))
+    return inputs
+
+
+def make_channel(count: int, loss: float, burst: float, seed: int) -> list:
+    """Gilbert 信道：平均丢包率 loss，平均突发长度 burst，返回每个包是否丢失"""
+    rng = random.Random(seed)
+    p_exit = 1.0 / max(1.0, burst)
+    p_enter = loss * p_exit / max(1e-9, 1.0 - loss)
+    lost, bad = [], False
+    for _ in range(count):
+        bad = (rng.random() >= p_exit) if bad else (rng.random() < p_enter)
+        lost.append(bad)
+    return lost
+
+
+def run(redundancy: int, inputs: list, lost: list, rate: int) -> dict:
+    period = 1.0 / rate
+    receiver = ControlStateReceiver()
+    events = []   # (arrival_time, seq, message)
+    history = []
+    for i, (dx, dy, buttons) in enumerate(inputs):
+        seq = i + 1
+        message = Protocol.build_control_command(seq, 0.0, mouse_dx=dx, mouse_dy=dy,
+                                                 mouse_buttons=buttons,
+                                                 history=tuple(history[:redundancy]))
+        history.insert(0, (dx, dy, buttons, 0))
+        if not lost[i]:
+            events.append((i * period, seq, message))
+        elif redundancy == 0:
+            # 原超时重传：同一 seq，不带鼠标数据；重传也可能丢
+            retry = Protocol.build_control_command(seq, 0.0)
+            for attempt in range(1, 4):
+                if not lost[(i + attempt * 7) % len(lost)]:
+                    events.append((i * period + attempt * RETRANSMIT_TIMEOUT, seq, retry))
+                    break
+    events.sort()
+
+    applied_at = {}
+    for t, seq, message in events:
+        _, seq, _, payload = Protocol.parse_message(message)
+        cmd = ControlCommand.from_bytes(payload)
+        before = receiver.last_seq or 0
+        if receiver.receive(seq, cmd):
+            # 本包自身 + 冗余覆盖到的跳号指令
+            for s in range(max(before + 1, seq - len(cmd.history)), seq + 1):
+                applied_at.setdefault(s, t)
+
+    repair = [(applied_at[i + 1] - i * period) * 1000 for i in range(len(inputs))
+              if lost[i] and (i + 1) in applied_at]
+    true_x = sum(abs(dx) for dx, _, _ in inputs)
+    delivered = sum(abs(inputs[s - 1][0]) for s in applied_at
+                    if not (redundancy == 0 and lost[s - 1]))
+    clicks = sum(1 for i in range(len(inputs)) if inputs[i][2] and (i == 0 or not inputs[i - 1][2]))
+    return {
+        "mouse_lost": (1.0 - delivered / true_x) * 100,
+        "clicks_lost": clicks - receiver.input.button_presses,
+        "repair_mean": statistics.mean(repair) if repair else 0.0,
+        "repair_max": max(repair) if repair else 0.0,
+        "unrepaired": sum(1 for i in range(len(inputs)) if lost[i] and (i + 1) not in applied_at),
+        "size": len(Protocol.build_control_command(1, 0.0, history=((0, 0, 0, 0),) * redundancy)),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Control redundancy simulation")
+    parser.add_argument("--loss", type=float, default=0.05)
+    parser.add_argument("--burst", type=float, default=2.0, help="Mean loss burst length (packets)")
+    parser.add_argument("--seconds", type=int, default=60)
+    parser.add_argument("--rate", type=int, default=50, help="Control send rate (Hz)")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    count = args.seconds * args.rate
+    inputs = make_inputs(count, args.seed)
+    lost = make_channel(count, args.loss, args.burst, args.seed)
+    print(f"{count} commands @ {args.rate} Hz, loss {sum(lost) / count * 100:.1f}% "
+          f"(mean burst {args.burst:g})")
+    print(f"{'mode':<14}{'mouse lost%':>12}{'clicks lost':>12}{'repair ms':>11}{'(max)':>8}"
+          f"{'unrepaired':>12}{'bytes':>7}")
+    for redundancy in (0, 1, 3, 6):
+        r = run(redundancy, inputs, lost, args.rate)
+        name = "retransmit" if redundancy == 0 else f"redundancy {redundancy}"
+        print(f"{name:<14}{r['mouse_lost']:>12.2f}{r['clicks_lost']:>12}{r['repair_mean']:>11.1f}"
+              f"{r['repair_max']:>8.1f}{r['unrepaired']:>12}{r['size']:>7}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""测试卡渲染基准 - 整帧重绘 vs 增量（脏区域）渲染
+
+每种模式渲染 N 帧，输出平均 / P95 每帧耗时与可达帧率：
+  - full：原行为，整帧拷贝基础帧 + 重绘 + 整帧增强
+  - incremental：持久工作帧只恢复 / 重绘变化区域，增强只作用于脏区域
+    （基础帧按当前增强参数缓存），输出帧经 release_frame 复用
+max diff 为同一帧两种模式输出的最大像素差（应为 0，跨秒时间戳变化的帧不比较）
+
+用法：python benchmarks/dirty_region_render.py [--frames 300 --width 1920 --height 1080 --sharpness 50]
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import air_unit_server  # noqa: E402
+
+
+def run(mode: str, pix_fmt: str, frames: int, enhancements: dict) -> dict:
+    encoder = air_unit_server.AdaptiveEncoder()
+    for key, value in enhancements.items():
+        setattr(encoder.enhancer, key, value)
+    yuv = pix_fmt == "yuv420p"
+    state = encoder._card_state(pix_fmt)
+    times = []
+    for i in range(frames):
+        t0 = time.perf_counter()
+        if mode == "full":
+            frame = state.base.copy()
+            planes = (air_unit_server.split_i420(frame, air_unit_server.VIDEO_WIDTH,
+                                                 air_unit_server.VIDEO_HEIGHT) if yuv else [frame])
+            encoder._draw_dynamic(planes, yuv, i)
+            frame = encoder.apply_enhancements_yuv(frame) if yuv else encoder.apply_enhancements(frame)
+        else:
+            frame = (encoder.generate_dynamic_frame_yuv(i) if yuv
+                     else encoder.generate_dynamic_frame(i))
+            encoder.release_frame(frame)
+        times.append((time.perf_counter() - t0) * 1000.0)
+    times = times[5:]
+    mean = statistics.mean(times)
+    return {
+        "mean_ms": mean,
+        "p95_ms": sorted(times)[int(len(times) * 0.95) - 1],
+        "fps": 1000.0 / mean if mean else float("inf"),
+    }
+
+
+def max_diff(pix_fmt: str, frames: int, enhancements: dict) -> int:
+    """逐帧比较整帧重绘与增量渲染的输出"""
+    full, incremental = air_unit_server.AdaptiveEncoder(), air_unit_server.AdaptiveEncoder()
+    for encoder in (full, incremental):
+        for key, value in enhancements.items():
+            setattr(encoder.enhancer, key, value)
+    yuv = pix_fmt == "yuv420p"
+    state = full._card_state(pix_fmt)
+    worst = 0
+    for i in range(frames):
+        second = time.strftime('%H:%M:%S')
+        frame = state.base.copy()
+        planes = (air_unit_server.split_i420(frame, air_unit_server.VIDEO_WIDTH,
+                                             air_unit_server.VIDEO_HEIGHT) if yuv else [frame])
+        full._draw_dynamic(planes, yuv, i)
+        frame = (full.apply_enhancements_yuv(frame, temporal=False) if yuv
+                 else full.apply_enhancements(frame, temporal=False))
+        out = (incremental.generate_dynamic_frame_yuv(i) if yuv
+               else incremental.generate_dynamic_frame(i))
+        if time.strftime('%H:%M:%S') == second:
+            worst = max(worst, int(np.abs(frame.astype(np.int16) - out.astype(np.int16)).max()))
+        incremental.release_frame(out)
+    return worst
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Test card full vs incremental render benchmark")
+    parser.add_argument("--width", type=int, default=1920)
+    parser.add_argument("--height", type=int, default=1080)
+    parser.add_argument("--frames", type=int, default=300)
+    parser.add_argument("--brightness", type=int, default=0)
+    parser.add_argument("--contrast", type=int, default=0)
+    parser.add_argument("--gamma", type=int, default=100)
+    parser.add_argument("--sharpness", type=int, default=0)
+    parser.add_argument("--denoise", type=int, default=0)
+    args = parser.parse_args()
+
+    # 测试卡尺寸取自模块常量
+    air_unit_server.VIDEO_WIDTH = args.width
+    air_unit_server.VIDEO_HEIGHT = args.height
+    enhancements = {key: getattr(args, key)
+                    for key in ("brightness", "contrast", "gamma", "sharpness", "denoise")}
+
+    print(f"{args.width}x{args.height}, {args.frames} frames, "
+          + " ".join(f"{k}={v}" for k, v in enhancements.items()))
+    print(f"{'mode':<14}{'format':<10}{'mean ms':>10}{'P95 ms':>10}{'fps':>10}{'max diff':>10}")
+    for pix_fmt in ("bgr24", "yuv420p"):
+        for mode in ("full", "incremental"):
+            r = run(mode, pix_fmt, args.frames, enhancements)
+            diff = f"{max_diff(pix_fmt, 60, enhancements):>10}" if mode == "incremental" else ""
+            print(f"{mode:<14}{pix_fmt:<10}{r['mean_ms']:>10.2f}{r['p95_ms']:>10.2f}{r['fps']:>10.0f}"
+                  + diff)
+
+
+if __name__ == "__main__":
+    main()
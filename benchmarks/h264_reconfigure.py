@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""H.264 码率切换延迟基准 - 重建编码器 vs 在线 reconfigure
+
+对比两种切换方式，每次切换记录：
+  - switch_ms：切换调用本身耗时
+  - first_frame_ms：切换后第一帧编码耗时
+  - first_frame_bytes：切换后第一帧大小（重建会产生 IDR，帧大小突增）
+  - rate err：切换后 frames_between 帧的实际码率相对新目标的偏差（中位数，验证切换确实生效）
+  - reopens：reconfigure 超出打开时的 VBV 码率而重开编码器的次数
+
+用法：python benchmarks/h264_reconfigure.py [--width 1920 --height 1080 --switches 20]
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from network.h264_encoder import H264Encoder, H264_AVAILABLE  # noqa: E402
+
+
+def make_frames(width: int, height: int, count: int) -> list:
+    """带运动内容的测试帧（纯静态画面会让 P 帧过小，体现不出 IDR 代价）"""
+    rng = np.random.default_rng(0)
+    base = rng.integers(0, 255, (height, width, 3), dtype=np.uint8)
+    return [np.roll(base, i * 8, axis=1) for i in range(count)]
+
+
+def run(mode: str, width: int, height: int, fps: int, switches: int, frames_between: int) -> dict:
+    frames = make_frames(width, height, 16)
+    bitrates = [2_000_000, 1_200_000, 3_000_000, 800_000]
+    enc = H264Encoder(width, height, fps, bitrate=bitrates[0], max_bitrate=max(bitrates))
+    frame_idx = 0
+
+    def encode_next():
+        nonlocal frame_idx
+        data = enc.encode(frames[frame_idx % len(frames)], force_keyframe=(frame_idx == 0))
+        frame_idx += 1
+        return data
+
+    # 预热
+    for _ in range(frames_between):
+        encode_next()
+    steady = []
+    for _ in range(frames_between):
+        steady.append(sum(len(p) for p in encode_next()))
+
+    switch_ms, first_ms, first_bytes, rate_err = [], [], [], []
+    for i in range(switches):
+        bitrate = bitrates[(i + 1) % len(bitrates)]
+        t0 = time.perf_counter()
+        if mode == "rebuild":
+            enc = H264Encoder(width, height, fps, bitrate=bitrate, max_bitrate=max(bitrates))
+        else:
+            enc.reconfigure(bitrate=bitrate)
+        t1 = time.perf_counter()
+        packets = encode_next()
+        t2 = time.perf_counter()
+        switch_ms.append((t1 - t0) * 1000.0)
+        first_ms.append((t2 - t1) * 1000.0)
+        first_bytes.append(sum(len(p) for p in packets))
+        total = first_bytes[-1]
+        for _ in range(frames_between - 1):
+            total += sum(len(p) for p in encode_next())
+        rate_err.append(abs(total * 8 * fps / frames_between - bitrate) / bitrate * 100)
+
+    return {
+        "switch_ms": statistics.median(switch_ms),
+        "switch_max_ms": max(switch_ms),
+        "first_frame_ms": statistics.median(first_ms),
+        "first_frame_bytes": statistics.median(first_bytes),
+        "steady_frame_bytes": statistics.median(steady),
+        "rate_err": statistics.median(rate_err),
+        "reopens": enc.reopens,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="H.264 bitrate switch latency benchmark")
+    parser.add_argument("--width", type=int, default=1920)
+    parser.add_argument("--height", type=int, default=1080)
+    parser.add_argument("--fps", type=int, default=30)
+    parser.add_argument("--switches", type=int, default=20)
+    parser.add_argument("--frames-between", type=int, default=10)
+    args = parser.parse_args()
+
+    if not H264_AVAILABLE:
+        print("PyAV not installed, skipping")
+        return
+
+    print(f"{args.width}x{args.height}@{args.fps}fps, {args.switches} switches")
+    print(f"{'mode':<10}{'switch ms':>12}{'(max)':>10}{'1st frame ms':>15}"
+          f"{'1st frame B':>14}{'steady B':>12}{'rate err%':>11}{'reopens':>9}")
+    for mode in ("rebuild", "reconfigure"):
+        r = run(mode, args.width, args.height, args.fps, args.switches, args.frames_between)
+        print(f"{mode:<10}{r['switch_ms']:>12.2f}{r['switch_max_ms']:>10.2f}"
+              f"{r['first_frame_ms']:>15.2f}{r['first_frame_bytes']:>14.0f}"
+              f"{r['steady_frame_bytes']:>12.0f}{r['rate_err']:>11.1f}{r['reopens']:>9}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""H.264 输入格式基准 - BGR 转换 vs 直接写入 YUV420P / NV12
+
+三种输入路径各编码 N 帧，记录每帧：
+  - wall ms：encode 调用耗时
+  - cpu ms：进程 CPU 时间（含 x264 工作线程）
+  - call cpu ms：调用线程 CPU 时间（颜色转换、帧拷贝、packet 取出）
+
+  - bgr24：当前行为，encode(BGR)，每帧新建 VideoFrame 并做 BGR → YUV 转换
+  - yuv420p / nv12：encode_yuv(紧凑数组)，拷贝到复用的输入帧，无颜色转换
+
+用法：python benchmarks/h264_yuv_input.py [--frames 120 --sizes 1280x720,1920x1080]
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from network.h264_encoder import H264Encoder, H264_AVAILABLE  # noqa: E402
+
+
+def make_frames(width: int, height: int, count: int) -> list:
+    """随机底图水平滚动（BGR），保证每帧都有运动内容"""
+    rng = np.random.default_rng(0)
+    base = rng.integers(0, 255, (height, width, 3), dtype=np.uint8)
+    return [np.roll(base, i * 8, axis=1) for i in range(count)]
+
+
+def to_nv12(i420: np.ndarray, width: int, height: int) -> np.ndarray:
+    """紧凑 I420 → 紧凑 NV12（UV 交错）"""
+    out = i420.copy()
+    chroma = width * height // 4
+    flat = i420.reshape(-1)
+    uv = out.reshape(-1)[width * height:]
+    uv[0::2] = flat[width * height:width * height + chroma]
+    uv[1::2] = flat[width * height + chroma:]
+    return out
+
+
+def run(mode: str, frames: list, width: int, height: int, fps: int) -> dict:
+    import cv2
+    if mode == "bgr24":
+        inputs = frames
+    else:
+        inputs = [cv2.cvtColor(f, cv2.COLOR_BGR2YUV_I420) for f in frames]
+        if mode == "nv12":
+            inputs = [to_nv12(f, width, height) for f in inputs]
+    enc = H264Encoder(width, height, fps, bitrate=4_000_000,
+                      pix_fmt="nv12" if mode == "nv12" else "yuv420p")
+    encode = enc.encode if mode == "bgr24" else enc.encode_yuv
+
+    wall, cpu, call_cpu = [], [], []
+    total_bytes = 0
+    for i, frame in enumerate(inputs):
+        t0, c0 = time.perf_counter(), time.process_time()
+        packets = encode(frame, force_keyframe=(i == 0))
+        wall.append((time.perf_counter() - t0) * 1000.0)
+        cpu.append((time.process_time() - c0) * 1000.0)
+        call_cpu.append(enc.last_encode_cpu_ms)
+        total_bytes += sum(len(p) for p in packets)
+    enc.close()
+
+    # 跳过首帧 IDR 与 lookahead 填充
+    skip = min(10, len(wall) // 4)
+    return {
+        "wall_ms": statistics.mean(wall[skip:]),
+        "wall_p95_ms": sorted(wall[skip:])[int((len(wall) - skip) * 0.95) - 1],
+        "cpu_ms": statistics.mean(cpu[skip:]),
+        "call_cpu_ms": statistics.mean(call_cpu[skip:]),
+        "kbytes": total_bytes / 1024,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="H.264 BGR vs YUV input benchmark")
+    parser.add_argument("--sizes", default="1280x720,1920x1080")
+    parser.add_argument("--fps", type=int, default=30)
+    parser.add_argument("--frames", type=int, default=120)
+    args = parser.parse_args()
+
+    if not H264_AVAILABLE:
+        print("PyAV not installed, skipping")
+        return
+
+    for size in args.sizes.split(","):
+        width, height = (int(v) for v in size.split("x"))
+        frames = make_frames(width, height, args.frames)
+        print(f"{width}x{height}@{args.fps}fps, {args.frames} frames")
+        print(f"{'input':<10}{'wall ms':>10}{'(p95)':>8}{'cpu ms':>10}{'call cpu ms':>13}{'KB':>10}")
+        for mode in ("bgr24", "yuv420p", "nv12"):
+            r = run(mode, frames, width, height, args.fps)
+            print(f"{mode:<10}{r['wall_ms']:>10.2f}{r['wall_p95_ms']:>8.2f}{r['cpu_ms']:>10.2f}"
+                  f"{r['call_cpu_ms']:>13.2f}{r['kbytes']:>10.0f}")
+        print()
+
+
+if __name__ == "__main__":
+    main()
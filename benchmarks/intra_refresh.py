@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+"""帧内刷新 vs 周期 IDR 基准 - 帧大小波动与丢包恢复时间
+
+两种模式各编码 N 帧：
+  - idr：当前行为，每 30 帧强制 IDR
+  - intra-refresh：x264 周期帧内刷新，仅首帧 IDR
+
+输出：
+  - 帧大小均值 / 标准差 / 变异系数 / P99 / 最大值与均值之比
+  - 每帧分片数（60000B 分片）与 1200B MTU 下的最大突发包数
+  - 丢包恢复时间：在每个位置假设丢失一帧，按接收端规则（IDR，或恢复点 +
+    recovery_frame_cnt 帧）计算画面恢复所需帧数 / 毫秒
+
+用法：python benchmarks/intra_refresh.py [--frames 300 --width 1280 --height 720]
+"""
+
+import argparse
+import os
+import statistics
+import sys
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from network.h264_encoder import H264Encoder, H264_AVAILABLE  # noqa: E402
+from network.h264_decoder import scan_access_unit  # noqa: E402
+
+KEYFRAME_INTERVAL = 30
+CHUNK_SIZE = 60000
+MTU_PAYLOAD = 1200
+
+
+def make_frame(width: int, height: int, i: int) -> np.ndarray:
+    """平滑渐变背景 + 运动方块 + 少量噪声（接近真实画面的可压缩性）"""
+    x = np.linspace(0, 255, width, dtype=np.float32)
+    y = np.linspace(0, 255, height, dtype=np.float32)[:, None]
+    frame = np.empty((height, width, 3), dtype=np.uint8)
+    frame[..., 0] = ((x + i * 2) % 256).astype(np.uint8)
+    frame[..., 1] = ((y + i) % 256).astype(np.uint8)
+    frame[..., 2] = ((x[None, :] + y) / 2).astype(np.uint8)
+    bx = int((width - 200) * (0.5 + 0.5 * np.sin(i * 0.05)))
+    by = int((height - 200) * (0.5 + 0.5 * np.cos(i * 0.07)))
+    frame[by:by + 200, bx:bx + 200] = (255, 255, 255)
+    noise = np.random.default_rng(i).integers(0, 8, (height, width, 3), dtype=np.uint8)
+    return frame + noise
+
+
+def encode_sequence(mode: str, width: int, height: int, fps: int, frames: int) -> list:
+    enc = H264Encoder(width, height, fps, bitrate=2_000_000,
+                      keyframe_interval=KEYFRAME_INTERVAL,
+                      intra_refresh=(mode == "intra-refresh"))
+    out = []
+    for i in range(frames):
+        if mode == "intra-refresh":
+            force_key = (i == 0)
+        else:
+            force_key = (i % KEYFRAME_INTERVAL == 0)
+        out.append(b"".join(enc.encode(make_frame(width, height, i), force_keyframe=force_key)))
+    return out
+
+
+def recovery_frames(scans: list, lost: int) -> int:
+    """第 lost 帧丢失后，到画面完整所需的帧数（与 VideoReceiver 的恢复规则一致）"""
+    countdown = None
+    for j in range(lost + 1, len(scans)):
+        is_idr, recovery_cnt = scans[j]
+        if is_idr:
+            return j - lost
+        if recovery_cnt is not None and countdown is None:
+            countdown = recovery_cnt
+        elif countdown is not None:
+            countdown -= 1
+        if countdown is not None and countdown <= 0:
+            return j - lost
+    return -1
+
+
+def summarize(mode: str, encoded: list, fps: int, warmup: int) -> dict:
+    sizes = [len(f) for f in encoded[warmup:]]
+    scans = [scan_access_unit(f) for f in encoded]
+    mean = statistics.mean(sizes)
+    stdev = statistics.pstdev(sizes)
+    p99 = sorted(sizes)[int(len(sizes) * 0.99) - 1]
+    rec = [recovery_frames(scans, k) for k in range(warmup, len(encoded))]
+    rec = [r for r in rec if r > 0]
+    return {
+        "mode": mode,
+        "mean": mean,
+        "stdev": stdev,
+        "cv": stdev / mean if mean else 0.0,
+        "p99": p99,
+        "max_ratio": max(sizes) / mean if mean else 0.0,
+        "max_chunks": max((s + CHUNK_SIZE - 1) // CHUNK_SIZE for s in sizes),
+        "max_burst_pkts": max((s + MTU_PAYLOAD - 1) // MTU_PAYLOAD for s in sizes),
+        "recovery_mean_ms": statistics.mean(rec) * 1000 / fps if rec else float("nan"),
+        "recovery_max_ms": max(rec) * 1000 / fps if rec else float("nan"),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Intra refresh vs periodic IDR benchmark")
+    parser.add_argument("--width", type=int, default=1280)
+    parser.add_argument("--height", type=int, default=720)
+    parser.add_argument("--fps", type=int, default=30)
+    parser.add_argument("--frames", type=int, default=300)
+    args = parser.parse_args()
+
+    if not H264_AVAILABLE:
+        print("PyAV not installed, skipping")
+        return
+
+    # 跳过首个 IDR 与码控收敛阶段
+    warmup = KEYFRAME_INTERVAL
+    print(f"{args.width}x{args.height}@{args.fps}fps, {args.frames} frames")
+    print(f"{'mode':<15}{'mean B':>9}{'stdev':>9}{'CV':>6}{'P99 B':>9}{'max/mean':>10}"
+          f"{'chunks':>8}{'MTU pkts':>10}{'recover ms':>12}{'(max)':>8}")
+    for mode in ("idr", "intra-refresh"):
+        encoded = encode_sequence(mode, args.width, args.height, args.fps, args.frames)
+        r = summarize(mode, encoded, args.fps, warmup)
+        print(f"{r['mode']:<15}{r['mean']:>9.0f}{r['stdev']:>9.0f}{r['cv']:>6.2f}{r['p99']:>9}"
+              f"{r['max_ratio']:>10.1f}{r['max_chunks']:>8}{r['max_burst_pkts']:>10}"
+              f"{r['recovery_mean_ms']:>12.0f}{r['recovery_max_ms']:>8.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+"""JPEG 码控仿真基准 - 原 EMA 步进控制 vs 模型预测控制
+
+用合成的 帧大小-质量 关系仿真多次场景切换（每个场景复杂度与斜率不同，
+并带轻微曲率与逐帧噪声），两种控制器各跑一遍：
+  - ema：原 AdaptiveEncoder._adjust_quality，EMA 帧大小超出目标 10% 降 2 级、低于 80% 升 1 级
+  - model：JpegRateController，拟合 ln(size) = a + b × quality 一步求解
+
+输出：
+  - 收敛帧数：场景切换后帧大小连续 5 帧落入目标 ±15% 所需帧数（均值 / 最大，未收敛计为场景长度）
+  - 超调：场景切换后 1 秒内码率相对目标的最大超出比例，及全程超出目标 50% 的帧占比
+  - 全程平均码率 / 目标
+
+用法：python benchmarks/jpeg_rate_control.py [--scenes 40 --scene-frames 150 --bitrate 4000]
+"""
+
+import argparse
+import math
+import os
+import random
+import statistics
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from network.jpeg_rate_control import JpegRateController  # noqa: E402
+
+QUALITY_MIN, QUALITY_MAX = 15, 85
+TOLERANCE = 0.15
+SETTLE_FRAMES = 5
+
+
+class EmaController:
+    """原 AdaptiveEncoder 码控逻辑（对照组）"""
+
+    def __init__(self, target_frame_bytes: int, quality: int):
+        self.target_frame_bytes = target_frame_bytes
+        self.quality = quality
+        self._ema_size = float(target_frame_bytes)
+        self._ema_alpha = 0.3
+
+    def update(self, quality: int, size: int) -> int:
+        self._ema_size = self._ema_alpha * size + (1 - self._ema_alpha) * self._ema_size
+        ratio = self._ema_size / self.target_frame_bytes
+        if ratio > 1.1:
+            self.quality = max(QUALITY_MIN, self.quality - 2)
+        elif ratio < 0.8:
+            self.quality = min(QUALITY_MAX, self.quality + 1)
+        return self.quality
+
+
+def make_scenes(count: int, target: int, seed: int) -> list:
+    """
+    每个场景 (intercept, slope, curvature)：ln(size) = a + b·q + c·(q - 50)²
+
+    场景复杂度按"命中目标所需质量"在 [25, 80] 内随机取，保证目标可达。
+    """
+    rng = random.Random(seed)
+    scenes = []
+    for _ in range(count):
+        q_star = rng.uniform(25, 80)
+        b, c = rng.uniform(0.015, 0.04), rng.uniform(0.0, 0.0002)
+        scenes.append((math.log(target) - b * q_star - c * (q_star - 50) ** 2, b, c))
+    return scenes
+
+
+def frame_size(scene: tuple, quality: int, rng: random.Random) -> int:
+    a, b, c = scene
+    return max(200, int(math.exp(a + b * quality + c * (quality - 50) ** 2 + rng.gauss(0, 0.05))))
+
+
+def run(kind: str, scenes: list, scene_frames: int, target: int, fps: int, seed: int) -> dict:
+    rng = random.Random(seed)
+    quality = 60
+    if kind == "ema":
+        ctrl = EmaController(target, quality)
+    else:
+        ctrl = JpegRateController(target, quality, QUALITY_MIN, QUALITY_MAX)
+
+    settle, overshoot = [], []
+    sizes = []
+    for scene in scenes:
+        in_band = 0
+        settled_at = None
+        scene_sizes = []
+        for i in range(scene_frames):
+            size = frame_size(scene, quality, rng)
+            scene_sizes.append(size)
+            quality = ctrl.update(quality, size)
+            if abs(size / target - 1.0) <= TOLERANCE:
+                in_band += 1
+                if in_band >= SETTLE_FRAMES and settled_at is None:
+                    settled_at = i - SETTLE_FRAMES + 1
+            else:
+                in_band = 0
+        settle.append(settled_at if settled_at is not None else scene_frames)
+        first_second = scene_sizes[:fps]
+        overshoot.append(max(0.0, sum(first_second) / (target * len(first_second)) - 1.0))
+        sizes.extend(scene_sizes)
+
+    return {
+        "settle_mean": statistics.mean(settle),
+        "settle_max": max(settle),
+        "unsettled": sum(1 for s in settle if s >= scene_frames),
+        "overshoot_mean": statistics.mean(overshoot) * 100,
+        "overshoot_max": max(overshoot) * 100,
+        "spikes": sum(1 for s in sizes if s > target * 1.5) / len(sizes) * 100,
+        "rate_ratio": statistics.mean(sizes) / target,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="JPEG rate control simulation benchmark")
+    parser.add_argument("--scenes", type=int, default=40)
+    parser.add_argument("--scene-frames", type=int, default=150)
+    parser.add_argument("--bitrate", type=int, default=4000, help="Target bitrate (kbps)")
+    parser.add_argument("--fps", type=int, default=30)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    target = args.bitrate * 1000 // 8 // args.fps
+    scenes = make_scenes(args.scenes, target, args.seed)
+    print(f"{args.scenes} scenes x {args.scene_frames} frames, target {target} B/frame "
+          f"({args.bitrate} kbps @ {args.fps}fps)")
+    print(f"{'controller':<12}{'settle':>8}{'(max)':>7}{'never':>7}{'overshoot%':>12}{'(max)':>8}"
+          f"{'>1.5x%':>8}{'rate/target':>13}")
+    for kind in ("ema", "model"):
+        r = run(kind, scenes, args.scene_frames, target, args.fps, args.seed)
+        print(f"{kind:<12}{r['settle_mean']:>8.1f}{r['settle_max']:>7}{r['unsettled']:>7}"
+              f"{r['overshoot_mean']:>12.1f}{r['overshoot_max']:>8.1f}{r['spikes']:>8.1f}"
+              f"{r['rate_ratio']:>13.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""接收时间戳基准 - 用户态 perf_counter vs 内核 SO_TIMESTAMPNS
+
+本机起 ControlServer（机载端）并从客户端 socket 按固定频率发控制指令，同时用若干
+纯 Python 计算线程争抢 GIL，模拟地面端 UI / 解码线程负载。每个 ACK 分别按两种方式
+取 t4（机载端 t2 对应地使用 / 不使用内核时间戳），统计 RTT 分布与机载端处理耗时 t3 - t2。
+
+用法：python benchmarks/rx_timestamp_jitter.py [--count 2000 --rate 500 --load-threads 2]
+"""
+
+import argparse
+import os
+import socket
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from network.control_server import ControlServer  # noqa: E402
+from network.protocol import Protocol, MSG_TYPE_CONTROL_COMMAND  # noqa: E402
+from network.rx_timestamp import (RX_TIMESTAMP_AVAILABLE, enable_rx_timestamps,  # noqa: E402
+                                  recv_timestamped)
+
+
+def busy(stop: threading.Event):
+    x = 0
+    while not stop.is_set():
+        for i in range(10000):
+            x += i * i
+
+
+def percentile(values: list, p: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p / 100))]
+
+
+def run(kernel: bool, count: int, rate: int, load_threads: int) -> dict:
+    server = ControlServer(kernel_timestamps=kernel)
+    server.register(MSG_TYPE_CONTROL_COMMAND,
+                    lambda addr, seq, t1, payload, rx: server.send_ack(addr, seq, rx))
+    addr = server.start("127.0.0.1", 0)
+
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    sock.bind(("127.0.0.1", 0))
+    sock.settimeout(0.5)
+    if kernel:
+        enable_rx_timestamps(sock)
+
+    stop = threading.Event()
+    load = [threading.Thread(target=busy, args=(stop,), daemon=True) for _ in range(load_threads)]
+    for t in load:
+        t.start()
+
+    rtts, processing = [], []
+    interval = 1.0 / rate
+    next_t = time.perf_counter()
+    for seq in range(1, count + 1):
+        next_t += interval
+        t1 = time.perf_counter()
+        sock.sendto(Protocol.build_control_command(seq, t1), addr)
+        try:
+            data, _, t4, _ = recv_timestamped(sock, 64)
+        except socket.timeout:
+            continue
+        ack_seq, t2, t3 = Protocol.parse_ack(data)
+        if ack_seq == seq:
+            rtts.append((t4 - t1) - (t3 - t2))
+            processing.append(t3 - t2)
+        delay = next_t - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+
+    stop.set()
+    server.stop()
+    sock.close()
+    us = [r * 1e6 for r in rtts]
+    return {
+        "p50": percentile(us, 50), "p99": percentile(us, 99), "max": max(us),
+        "spread": percentile(us, 99) - percentile(us, 1),
+        "proc": percentile([p * 1e6 for p in processing], 50),
+        "kernel_hits": server.kernel_rx_timestamps,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Receive timestamp jitter benchmark")
+    parser.add_argument("--count", type=int, default=2000)
+    parser.add_argument("--rate", type=int, default=500, help="Messages per second")
+    parser.add_argument("--load-threads", type=int, default=2, help="GIL-contending busy threads")
+    args = parser.parse_args()
+
+    if not RX_TIMESTAMP_AVAILABLE:
+        print("SO_TIMESTAMPNS not available on this platform, skipping")
+        return
+
+    print(f"{args.count} messages @ {args.rate}/s, {args.load_threads} busy threads "
+          f"(network RTT = (t4 - t1) - (t3 - t2), us)")
+    print(f"{'timestamps':<12}{'p50':>9}{'p99':>9}{'max':>9}{'p1-p99':>9}{'proc p50':>10}")
+    for kernel in (False, True):
+        r = run(kernel, args.count, args.rate, args.load_threads)
+        name = "kernel" if kernel else "user"
+        print(f"{name:<12}{r['p50']:>9.0f}{r['p99']:>9.0f}{r['max']:>9.0f}{r['spread']:>9.0f}"
+              f"{r['proc']:>10.0f}")
+
+
+if __name__ == "__main__":
+    main()
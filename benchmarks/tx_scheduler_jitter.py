@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""控制发送节拍基准 - 原 sleep(1ms) 轮询 vs 绝对截止时间调度
+
+两种发送循环各按目标频率运行 duration 秒（不发包，只记录"发送"时刻）：
+  - polling：原 ControlSender._tx_thread，每 1 ms 醒来比较 time.time()，last_send = 当前时刻
+  - deadline：network.tx_scheduler.DeadlineScheduler，睡到绝对截止时刻前 spin 秒再自旋
+
+输出：
+  - rate：实际发送频率
+  - drift：最后一次发送相对理想节拍 start + k × period 的偏移（ms，周期漂移会线性累积）
+  - jitter：每次发送相对自身理想节拍的延迟 p50 / p99 / max（µs，deadline 按节拍、polling 按上次发送 + 周期）
+  - wakeups/s：循环唤醒次数，cpu%：发送线程 CPU 占用
+--load-threads 加入争抢 GIL 的计算线程时，两者抖动都受 GIL 切换间隔（默认 5 ms）限制
+
+用法：python benchmarks/tx_scheduler_jitter.py [--rates 50 250 1000 --duration 3 --spin-us 200]
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from network.tx_scheduler import DeadlineScheduler, JITTER_BUCKETS_US  # noqa: E402
+
+
+def polling_loop(rate: float, duration: float) -> dict:
+    sends, wakeups = [], 0
+    interval = 1.0 / rate
+    start = time.time()
+    last_send_time = start
+    cpu0 = time.thread_time()
+    while time.time() - start < duration:
+        wakeups += 1
+        current_time = time.time()
+        if current_time - last_send_time >= interval:
+            sends.append((current_time, last_send_time + interval))
+            last_send_time = current_time
+        time.sleep(0.001)
+    return {"sends": sends, "start": start, "wakeups": wakeups, "cpu": time.thread_time() - cpu0}
+
+
+def deadline_loop(rate: float, duration: float, spin: float) -> dict:
+    scheduler = DeadlineScheduler(rate, spin)
+    sends = []
+    start = time.perf_counter()
+    scheduler.start(start)
+    cpu0 = time.thread_time()
+    while time.perf_counter() - start < duration:
+        deadline = scheduler.next_deadline
+        if scheduler.wait():
+            sends.append((time.perf_counter(), deadline))
+    return {"sends": sends, "start": start, "wakeups": scheduler.wakeups,
+            "cpu": time.thread_time() - cpu0, "hist": scheduler.jitter_histogram(),
+            "missed": scheduler.missed}
+
+
+def summarize(result: dict, rate: float, duration: float) -> dict:
+    sends = result["sends"]
+    period = 1.0 / rate
+    jitter = sorted((t - due) * 1e6 for t, due in sends)
+    last = sends[-1][0] - result["start"]
+    return {
+        "rate": len(sends) / duration,
+        "drift": (len(sends) * period - last) * 1000 if sends else 0.0,
+        "p50": statistics.median(jitter),
+        "p99": jitter[int(len(jitter) * 0.99)],
+        "max": jitter[-1],
+        "wakeups": result["wakeups"] / duration,
+        "cpu": result["cpu"] / duration * 100,
+    }
+
+
+def busy(stop: threading.Event):
+    x = 0
+    while not stop.is_set():
+        for i in range(1000):
+            x += i
+
+
+def main():
+    parser = argparse.ArgumentParser(description="TX scheduler jitter benchmark")
+    parser.add_argument("--rates", type=float, nargs="+", default=[50, 250, 1000])
+    parser.add_argument("--duration", type=float, default=3.0)
+    parser.add_argument("--spin-us", type=float, default=200)
+    parser.add_argument("--load-threads", type=int, default=0, help="GIL-contending busy threads")
+    args = parser.parse_args()
+
+    stop = threading.Event()
+    for _ in range(args.load_threads):
+        threading.Thread(target=busy, args=(stop,), daemon=True).start()
+
+    print(f"{args.duration:g} s per run, spin {args.spin_us:g} us, {args.load_threads} busy threads")
+    print(f"{'loop':<10}{'target':>8}{'rate':>9}{'drift ms':>10}{'p50 us':>9}{'p99 us':>9}"
+          f"{'max us':>9}{'wakeups/s':>11}{'cpu%':>7}")
+    histograms = []
+    for rate in args.rates:
+        for kind in ("polling", "deadline"):
+            if kind == "polling":
+                result = polling_loop(rate, args.duration)
+            else:
+                result = deadline_loop(rate, args.duration, args.spin_us / 1e6)
+                histograms.append((rate, result["hist"], result["missed"]))
+            r = summarize(result, rate, args.duration)
+            print(f"{kind:<10}{rate:>8g}{r['rate']:>9.1f}{r['drift']:>10.1f}{r['p50']:>9.0f}"
+                  f"{r['p99']:>9.0f}{r['max']:>9.0f}{r['wakeups']:>11.0f}{r['cpu']:>7.1f}")
+    stop.set()
+
+    labels = [f"<={edge}" for edge in JITTER_BUCKETS_US] + [f">{JITTER_BUCKETS_US[-1]}"]
+    print("\ndeadline send-time jitter histogram (us)")
+    print(f"{'target':>8}" + "".join(f"{label:>8}" for label in labels) + f"{'missed':>8}")
+    for rate, hist, missed in histograms:
+        print(f"{rate:>8g}" + "".join(f"{n:>8}" for n in hist) + f"{missed:>8}")
+
+
+if __name__ == "__main__":
+    main()
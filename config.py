@@ -6,6 +6,7 @@ class Config:
     RENDER_HEIGHT = 900
     TARGET_FPS = 120
     FULLSCREEN = False
+    STATS_PUBLISH_RATE = 10  # Hz，统计快照发布频率
 
     # Font config
     FONT_SIZE = 22
@@ -26,8 +27,14 @@ class Config:
     CONTROL_PORT_OFFSET = 2000
 
     # 控制指令配置
-    TX_SEND_RATE = 50  # Hz
+    TX_SEND_RATE = 50  # Hz，最高 1000
+    TX_SPIN_US = 200   # 发送节拍截止前自旋等待（微秒），0 = 只睡眠
     TX_TIMEOUT = 0.1
+    # 控制指令冗余：每个包携带前 N 条指令的鼠标增量 / 按键状态，单包丢失由下一个包补齐，
+    # 无需等待超时重传；0 = 关闭（改用超时重传）
+    CONTROL_REDUNDANCY = 3
+    # ACK 接收时间取内核时间戳（SO_TIMESTAMPNS，仅 Linux），不含接收线程调度延迟
+    RX_KERNEL_TIMESTAMPS = True
 
     # 心跳配置
     HEARTBEAT_INTERVAL = 0.1
@@ -36,6 +43,17 @@ class Config:
     # 视频解码配置
     RENDER_QUEUE_MAX_SIZE = 3
 
+    # 视频传输层反馈间隔（秒），供机载端拥塞控制
+    VIDEO_FEEDBACK_INTERVAL = 0.05
+    # 关键帧请求（PLI）重发间隔（秒），画面恢复前按此间隔重发
+    KEYFRAME_REQUEST_INTERVAL = 0.2
+
+    # 多分辨率层（simulcast）选择：不超过适配渲染窗口的层；丢包率超过阈值时降一层，
+    # 持续无丢包 UPGRADE_HOLD 秒后升一层；两次切换至少间隔 SWITCH_INTERVAL 秒
+    SIMULCAST_DOWNGRADE_LOSS = 0.05
+    SIMULCAST_UPGRADE_HOLD = 10.0
+    SIMULCAST_SWITCH_INTERVAL = 2.0
+
     # FEC 配置
     FEC_ENABLED = True
     FEC_REDUNDANCY = 0.2  # 20% 冗余
@@ -33,6 +33,7 @@ from ui.input_handler import InputHandler
 from ui.console import GameConsole
 from logic.param_manager import ParamManager
 from logic.status_monitor import StatusMonitor
+from logic.stats_aggregator import StatsAggregator
 from logic.config_manager import ConfigManager
 from logic.audit_logger import AuditLogger
 
@@ -106,6 +107,7 @@ class Application:
         self.console        = GameConsole(font_mono=font_mono, font_body=font_body)
         self.window_manager = WindowManager(self._display_flags)
         self.recorder       = Recorder(self.param_manager, self.audit_logger)
+        self.stats_aggregator = StatsAggregator(self._collect_stats, Config.STATS_PUBLISH_RATE)
 
         # 拦截 print → 同时输出到终端和开发者控制台
         self._original_print = builtins.print
@@ -120,6 +122,7 @@ class Application:
         self._discovered_services_raw: dict = {}
         self._pending_window_mode: Optional[int] = None
         self._pending_resolution: Optional[int] = None
+        self._stats_version = -1
 
         pygame.mouse.set_visible(True)
         pygame.key.stop_text_input()
@@ -316,8 +319,17 @@ class Application:
     # 主循环
     # -------------------------------------------------------------------------
 
+    def _collect_stats(self) -> dict:
+        """统计聚合线程调用 — 采集会话统计并附加 UI 所需字段"""
+        stats = self.session.get_statistics()
+        stats["session_state"] = self.session.state.value
+        stats["discovered_devices"] = self._discovered_devices
+        return stats
+
     def run(self) -> None:
         print("[App] Starting application")
+        self.stats_aggregator.start()
+        status = self.status_monitor.get_status()
 
         while self.running:
             # 帧开头应用延迟的窗口/分辨率切换
@@ -353,24 +365,29 @@ class Application:
                     self.session.control_sender.update_mouse(dx, dy, btn_mask, scroll)
 
             # 获取最新视频帧
-            if self.session.video_receiver:
-                frame = self.session.video_receiver.get_latest_frame()
+            frame_trace = None
+            video_receiver = self.session.video_receiver
+            if video_receiver:
+                frame = video_receiver.get_latest_frame()
                 if frame is not None:
                     try:
                         if isinstance(frame, np.ndarray) and frame.shape == (Config.RENDER_HEIGHT, Config.RENDER_WIDTH, 3):
                             self.video_renderer.update_frame(frame)
                             self.status_monitor.tick_frame()
+                            frame_trace = video_receiver.latest_trace
+                            if frame_trace:
+                                frame_trace.uploaded = _time.perf_counter()
                     except Exception:
                         pass
 
-            # 更新状态统计
-            stats = self.session.get_statistics()
-            stats["session_state"] = self.session.state.value
-            stats["discovered_devices"] = self._discovered_devices
-            self.status_monitor.bandwidth_kbps = self.imgui_ui._bandwidth_kbps
-            self.status_monitor.update(stats)
-            status = self.status_monitor.get_status()
-            self.imgui_ui.update_perf_history(status.get("fps", 0.0), status.get("latency_ms", 0.0))
+            # 读取最新统计快照（由聚合线程按 STATS_PUBLISH_RATE 发布），仅在有新快照时更新状态
+            stats = self.stats_aggregator.get_snapshot()
+            if self.stats_aggregator.version != self._stats_version:
+                self._stats_version = self.stats_aggregator.version
+                self.status_monitor.bandwidth_kbps = self.imgui_ui._bandwidth_kbps
+                self.status_monitor.update(stats)
+                status = self.status_monitor.get_status()
+                self.imgui_ui.update_perf_history(status.get("fps", 0.0), status.get("latency_ms", 0.0))
 
             # 渲染
             glClear(GL_COLOR_BUFFER_BIT | GL_DEPTH_BUFFER_BIT)
@@ -437,8 +454,12 @@ class Application:
                 self.recorder.process_frame(_time.monotonic())
 
             pygame.display.flip()
+            if frame_trace:
+                frame_trace.presented = _time.perf_counter()
+                self.session.record_frame_trace(frame_trace)
             self.fps_clock.tick(Config.TARGET_FPS)
 
+        self.stats_aggregator.stop()
         self.session.disconnect()
         self.video_renderer.cleanup()
         pygame.quit()
@@ -0,0 +1,159 @@
+"""
+时钟同步 - NTP 风格偏移/漂移估计（最小 RTT 过滤 + 线性拟合）
+"""
+
+import threading
+import time
+from collections import deque
+from typing import Optional, Tuple
+
+
+class ClockOffsetEstimator:
+    """
+    机载端与地面端时钟映射估计器
+
+    机载端 t2/t3 来自其自身 perf_counter，起点任意，单次测得的 offset 中混有排队噪声。
+    与 NTP 的 clock filter 类似，只信任 RTT 最小的样本（排队最少、对称性最好）：
+
+    1. 每个 bin_interval 时间桶内只保留 RTT 最小的样本
+    2. 对最近 max_bins 个桶的最优样本做最小二乘线性拟合：
+       offset(t) = offset0 + skew * (t - t_ref)
+    3. 拟合前剔除 RTT 明显高于全局最小值的桶（该桶内没有"干净"的交换）
+    4. 样本时间跨度不足时退化为最小 RTT 样本的 offset，skew 为 0
+
+    约定：offset = 机载端时钟 - 地面端时钟，t 为地面端 perf_counter 时间。
+    """
+
+    def __init__(self, bin_interval: float = 1.0, max_bins: int = 60,
+                 min_fit_span: float = 5.0):
+        """
+        Args:
+            bin_interval: 时间桶长度（秒）
+            max_bins: 参与拟合的桶数量上限
+            min_fit_span: 启用漂移拟合所需的最小时间跨度（秒）
+        """
+        self.bin_interval = bin_interval
+        self.min_fit_span = min_fit_span
+        self._bins: deque = deque(maxlen=max_bins)  # [(t, offset, rtt)]
+        self._current_bin: Optional[int] = None
+        self._current_best: Optional[Tuple[float, float, float]] = None
+        self._lock = threading.Lock()
+
+        # 拟合结果
+        self._t_ref = 0.0
+        self._offset0: Optional[float] = None
+        self._skew = 0.0
+        self._min_rtt: Optional[float] = None
+
+        self.samples = 0
+
+    def add_sample(self, t_local: float, offset: float, rtt: float):
+        """
+        加入一次四时间戳交换的结果
+
+        Args:
+            t_local: 地面端时间（通常取 (t1 + t4) / 2）
+            offset: 本次交换测得的偏移（秒）
+            rtt: 本次交换的 RTT（秒）
+        """
+        if rtt < 0:
+            return
+        bin_id = int(t_local / self.bin_interval)
+        with self._lock:
+            self.samples += 1
+            # 样本按 ACK 到达顺序加入，大 RTT 样本的中点时间可能落后于当前桶，归入当前桶
+            if self._current_bin is None or bin_id > self._current_bin:
+                if self._current_best is not None:
+                    self._bins.append(self._current_best)
+                self._current_bin = bin_id
+                self._current_best = None
+            if self._current_best is None or rtt < self._current_best[2]:
+                self._current_best = (t_local, offset, rtt)
+                self._refit()
+
+    def _refit(self):
+        """对各桶最优样本做最小二乘拟合（在 _lock 持有时调用）"""
+        points = list(self._bins)
+        if self._current_best is not None:
+            points.append(self._current_best)
+        if not points:
+            return
+
+        self._min_rtt = min(p[2] for p in points)
+        rtt_limit = 2 * self._min_rtt + 0.001
+        clean = [p for p in points if p[2] <= rtt_limit]
+        if len(clean) >= 3:
+            points = clean
+        n = len(points)
+        span = points[-1][0] - points[0][0]
+        if n < 3 or span < self.min_fit_span:
+            best = min(points, key=lambda p: p[2])
+            self._t_ref, self._offset0, self._skew = best[0], best[1], 0.0
+            return
+
+        t_mean = sum(p[0] for p in points) / n
+        o_mean = sum(p[1] for p in points) / n
+        sxx = sum((p[0] - t_mean) ** 2 for p in points)
+        sxy = sum((p[0] - t_mean) * (p[1] - o_mean) for p in points)
+        self._skew = sxy / sxx if sxx > 0 else 0.0
+        self._t_ref = t_mean
+        self._offset0 = o_mean
+
+    def offset_at(self, t_local: float) -> Optional[float]:
+        """地面端时间 t_local 处的估计偏移（秒）"""
+        with self._lock:
+            if self._offset0 is None:
+                return None
+            return self._offset0 + self._skew * (t_local - self._t_ref)
+
+    def air_to_ground(self, t_air: float) -> Optional[float]:
+        """机载端时间戳 → 地面端 perf_counter 时间"""
+        with self._lock:
+            if self._offset0 is None:
+                return None
+            # offset 随地面时间线性变化，以 t_air - offset0 作为初值迭代一次即可收敛
+            t_local = t_air - self._offset0
+            return t_air - (self._offset0 + self._skew * (t_local - self._t_ref))
+
+    def ground_to_air(self, t_local: float) -> Optional[float]:
+        """地面端 perf_counter 时间 → 机载端时间戳"""
+        offset = self.offset_at(t_local)
+        if offset is None:
+            return None
+        return t_local + offset
+
+    @property
+    def skew(self) -> float:
+        """时钟相对漂移（秒/秒）"""
+        return self._skew
+
+    @property
+    def error_bound(self) -> Optional[float]:
+        """偏移最大误差上界（最小 RTT / 2）"""
+        if self._min_rtt is None:
+            return None
+        return self._min_rtt / 2
+
+    def get_stats(self) -> dict:
+        """获取同步状态（offset 取当前时刻的估计值）"""
+        now = time.perf_counter()
+        with self._lock:
+            if self._offset0 is None:
+                return {'clock_samples': self.samples}
+            return {
+                'clock_samples': self.samples,
+                'clock_offset': self._offset0 + self._skew * (now - self._t_ref),
+                'clock_skew_ppm': self._skew * 1e6,
+                'clock_error_bound': self._min_rtt / 2,
+            }
+
+    def reset(self):
+        with self._lock:
+            self._bins.clear()
+            self._current_bin = None
+            self._current_best = None
+            self._t_ref = 0.0
+            self._offset0 = None
+            self._skew = 0.0
+            self._min_rtt = None
+            self.samples = 0
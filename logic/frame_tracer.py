@@ -0,0 +1,98 @@
+"""
+端到端（glass-to-glass）帧延迟追踪 - 分阶段延迟直方图
+"""
+
+import struct
+from dataclasses import dataclass, astuple
+from typing import Callable, Dict, Optional
+from logic.clock_sync import ClockOffsetEstimator
+from logic.latency_histogram import WindowedLatencyHistogram
+
+
+@dataclass
+class FrameTrace:
+    """单帧各阶段时间戳（秒，perf_counter；0.0 表示未记录）"""
+    frame_id: int = 0
+    # 机载端时钟
+    capture: float = 0.0          # 采集
+    encode_done: float = 0.0      # 编码完成
+    first_send: float = 0.0       # 首个分片发送
+    # 地面端时钟（perf_counter 为系统级单调时钟，接收子进程与主进程可直接比较）
+    first_packet: float = 0.0     # 首个分片到达
+    reassembled: float = 0.0      # 重组完成
+    decoded: float = 0.0          # 解码完成
+    published: float = 0.0        # 写入 shared memory
+    uploaded: float = 0.0         # 纹理上传
+    presented: float = 0.0        # 显示（flip）
+
+    # 跨进程传递的部分（到 published 为止）
+    _SHM_STRUCT = struct.Struct('=Q7d')
+    SHM_SIZE = _SHM_STRUCT.size
+
+    def pack_into(self, buf, offset: int):
+        """写入 shared memory（不含主进程阶段）"""
+        self._SHM_STRUCT.pack_into(buf, offset, *astuple(self)[:8])
+
+    @classmethod
+    def unpack_from(cls, buf, offset: int) -> 'FrameTrace':
+        return cls(*cls._SHM_STRUCT.unpack_from(buf, offset))
+
+
+# (阶段名, 起点字段, 终点字段, 是否跨时钟域)
+STAGES = (
+    ("encode",   "capture",      "encode_done", False),
+    ("packetize", "encode_done", "first_send",  False),
+    ("network",  "first_send",   "reassembled", True),
+    ("decode",   "reassembled",  "decoded",     False),
+    ("publish",  "decoded",      "published",   False),
+    ("upload",   "published",    "uploaded",    False),
+    ("present",  "uploaded",     "presented",   False),
+    ("glass_to_glass", "capture", "presented",  True),
+)
+
+
+class FrameLatencyTracer:
+    """
+    帧延迟追踪器
+
+    每帧按 STAGES 拆分为各阶段耗时，分别记录到窗口直方图。跨时钟域的阶段
+    （机载端 → 地面端）通过 ClockOffsetEstimator 将机载端时间映射到地面端，
+    时钟尚未同步时跳过这些阶段。
+    """
+
+    def __init__(self, clock_provider: Optional[Callable[[], Optional[ClockOffsetEstimator]]] = None):
+        self._clock_provider = clock_provider
+        self.histograms: Dict[str, WindowedLatencyHistogram] = {
+            name: WindowedLatencyHistogram() for name, *_ in STAGES
+        }
+        self.frames_traced = 0
+
+    def record(self, trace: FrameTrace):
+        """记录一帧的完整追踪"""
+        clock = self._clock_provider() if self._clock_provider else None
+        for name, start_field, end_field, cross_domain in STAGES:
+            start = getattr(trace, start_field)
+            end = getattr(trace, end_field)
+            if not start or not end:
+                continue
+            if cross_domain:
+                start = clock.air_to_ground(start) if clock else None
+                if start is None:
+                    continue
+            self.histograms[name].record(end - start)
+        self.frames_traced += 1
+
+    def get_statistics(self) -> dict:
+        """各阶段窗口 p50/p99（毫秒）"""
+        stats = {"frames_traced": self.frames_traced}
+        for name, hist in self.histograms.items():
+            pct = hist.percentiles((50.0, 99.0))
+            if pct:
+                stats[f"stage_{name}_p50_ms"] = pct[50.0] * 1000.0
+                stats[f"stage_{name}_p99_ms"] = pct[99.0] * 1000.0
+        return stats
+
+    def reset(self):
+        for hist in self.histograms.values():
+            hist.reset()
+        self.frames_traced = 0
@@ -4,9 +4,10 @@
 
 import time
 from typing import Optional, Dict, Tuple
-from collections import deque
 from dataclasses import dataclass
-import statistics
+from logic.rolling_stats import RollingStats
+from logic.latency_histogram import WindowedLatencyHistogram, DEFAULT_PERCENTILES
+from logic.clock_sync import ClockOffsetEstimator
 
 
 @dataclass
@@ -16,6 +17,7 @@ class LatencyResult:
     offset: float  # 时钟偏移（秒）
     delay_up: float  # 上行延迟（秒）
     delay_down: float  # 下行延迟（秒）
+    processing: float = 0.0  # 机载端处理耗时 t3 - t2（秒）
 
 
 class LatencyCalculator:
@@ -33,6 +35,9 @@ class LatencyCalculator:
     - offset = ((t2 - t1) + (t3 - t4)) / 2
     - delay_up = (t2 - t1) - offset
     - delay_down = (t4 - t3) - offset
+    - processing = t3 - t2（机载端收包到回 ACK 的处理耗时）
+
+    t2 / t4 取内核接收时间戳时（SO_TIMESTAMPNS），样本不含收端线程调度抖动。
     """
 
     def __init__(self, max_history: int = 100, timeout: float = 5.0):
@@ -49,11 +54,20 @@ class LatencyCalculator:
         # 待处理的发送记录：{seq: (t1, send_time)}
         self.pending_sends: Dict[int, Tuple[float, float]] = {}
 
-        # 延迟历史记录
-        self.rtt_history = deque(maxlen=max_history)
-        self.offset_history = deque(maxlen=max_history)
-        self.delay_up_history = deque(maxlen=max_history)
-        self.delay_down_history = deque(maxlen=max_history)
+        # 延迟历史记录（滑动窗口增量统计，每次 ACK / 查询均为 O(1)）
+        self.rtt_history = RollingStats(max_history)
+        self.offset_history = RollingStats(max_history)
+        self.delay_up_history = RollingStats(max_history)
+        self.delay_down_history = RollingStats(max_history)
+        self.processing_history = RollingStats(max_history)
+
+        # 分位数直方图（窗口 + 全生命周期），记录所有样本，不经过 3σ 过滤
+        self.rtt_hist = WindowedLatencyHistogram()
+        self.delay_up_hist = WindowedLatencyHistogram()
+        self.delay_down_hist = WindowedLatencyHistogram()
+
+        # 机载端 ↔ 地面端时钟映射（最小 RTT 过滤 + 漂移拟合）
+        self.clock = ClockOffsetEstimator()
 
         # 统计数据
         self.total_measurements = 0
@@ -111,6 +125,15 @@ class LatencyCalculator:
         offset = ((t2 - t1) + (t3 - t4)) / 2
         delay_up = (t2 - t1) - offset
         delay_down = (t4 - t3) - offset
+        processing = max(0.0, t3 - t2)
+        self.processing_history.append(processing)
+
+        self.clock.add_sample((t1 + t4) / 2, offset, rtt)
+
+        # 尾部延迟正是需要观察的部分，分位数直方图在过滤前记录
+        self.rtt_hist.record(rtt)
+        self.delay_up_hist.record(delay_up)
+        self.delay_down_hist.record(delay_down)
 
         # 异常值过滤（3σ 规则）
         if not self._is_outlier(rtt, delay_up, delay_down):
@@ -126,44 +149,63 @@ class LatencyCalculator:
             rtt=rtt,
             offset=offset,
             delay_up=delay_up,
-            delay_down=delay_down
+            delay_down=delay_down,
+            processing=processing,
         )
 
     def get_average_rtt(self) -> Optional[float]:
         """获取平均 RTT（秒）"""
-        if not self.rtt_history:
-            return None
-        return statistics.mean(self.rtt_history)
+        return self.rtt_history.mean()
 
     def get_average_delay_up(self) -> Optional[float]:
         """获取平均上行延迟（秒）"""
-        if not self.delay_up_history:
-            return None
-        return statistics.mean(self.delay_up_history)
+        return self.delay_up_history.mean()
 
     def get_average_delay_down(self) -> Optional[float]:
         """获取平均下行延迟（秒）"""
-        if not self.delay_down_history:
-            return None
-        return statistics.mean(self.delay_down_history)
+        return self.delay_down_history.mean()
+
+    def get_average_processing(self) -> Optional[float]:
+        """获取机载端平均处理耗时（秒）"""
+        return self.processing_history.mean()
 
     def get_average_offset(self) -> Optional[float]:
-        """获取平均时钟偏移（秒）"""
-        if not self.offset_history:
-            return None
-        return statistics.mean(self.offset_history)
+        """获取平均时钟偏移（秒）— 受排队噪声影响，时钟映射请使用 get_clock_offset"""
+        return self.offset_history.mean()
+
+    def get_clock_offset(self, t_local: Optional[float] = None) -> Optional[float]:
+        """获取估计的时钟偏移（秒，机载端 - 地面端），基于最小 RTT 样本与漂移拟合"""
+        if t_local is None:
+            t_local = time.perf_counter()
+        return self.clock.offset_at(t_local)
 
     def get_min_rtt(self) -> Optional[float]:
         """获取最小 RTT（秒）"""
-        if not self.rtt_history:
-            return None
-        return min(self.rtt_history)
+        return self.rtt_history.min()
 
     def get_max_rtt(self) -> Optional[float]:
         """获取最大 RTT（秒）"""
-        if not self.rtt_history:
-            return None
-        return max(self.rtt_history)
+        return self.rtt_history.max()
+
+    def get_percentiles(self, metric: str = 'rtt', lifetime: bool = False) -> Dict[float, float]:
+        """
+        获取延迟分位数
+
+        Args:
+            metric: 'rtt' / 'delay_up' / 'delay_down'
+            lifetime: True 返回全生命周期分位数，否则为最近窗口
+
+        Returns:
+            {百分位: 秒}，无数据时为空 dict
+        """
+        hist = getattr(self, f'{metric}_hist')
+        return hist.percentiles(DEFAULT_PERCENTILES, lifetime=lifetime)
+
+    def merge(self, other: 'LatencyCalculator'):
+        """合并另一会话的分位数直方图"""
+        self.rtt_hist.merge(other.rtt_hist)
+        self.delay_up_hist.merge(other.delay_up_hist)
+        self.delay_down_hist.merge(other.delay_down_hist)
 
     def get_stats(self) -> Dict[str, float]:
         """获取完整统计数据"""
@@ -174,24 +216,34 @@ class LatencyCalculator:
         }
 
         if self.rtt_history:
-            stats['rtt_avg'] = statistics.mean(self.rtt_history)
-            stats['rtt_min'] = min(self.rtt_history)
-            stats['rtt_max'] = max(self.rtt_history)
+            stats['rtt_avg'] = self.rtt_history.mean()
+            stats['rtt_min'] = self.rtt_history.min()
+            stats['rtt_max'] = self.rtt_history.max()
             if len(self.rtt_history) > 1:
-                stats['rtt_stdev'] = statistics.stdev(self.rtt_history)
+                stats['rtt_stdev'] = self.rtt_history.stdev()
 
         if self.delay_up_history:
-            stats['delay_up_avg'] = statistics.mean(self.delay_up_history)
-            stats['delay_up_min'] = min(self.delay_up_history)
-            stats['delay_up_max'] = max(self.delay_up_history)
+            stats['delay_up_avg'] = self.delay_up_history.mean()
+            stats['delay_up_min'] = self.delay_up_history.min()
+            stats['delay_up_max'] = self.delay_up_history.max()
 
         if self.delay_down_history:
-            stats['delay_down_avg'] = statistics.mean(self.delay_down_history)
-            stats['delay_down_min'] = min(self.delay_down_history)
-            stats['delay_down_max'] = max(self.delay_down_history)
+            stats['delay_down_avg'] = self.delay_down_history.mean()
+            stats['delay_down_min'] = self.delay_down_history.min()
+            stats['delay_down_max'] = self.delay_down_history.max()
 
         if self.offset_history:
-            stats['offset_avg'] = statistics.mean(self.offset_history)
+            stats['offset_avg'] = self.offset_history.mean()
+
+        if self.processing_history:
+            stats['processing_avg'] = self.processing_history.mean()
+            stats['processing_max'] = self.processing_history.max()
+
+        stats.update(self.clock.get_stats())
+
+        for metric in ('rtt', 'delay_up', 'delay_down'):
+            for p, value in self.get_percentiles(metric).items():
+                stats[f'{metric}_p{p:g}'.replace('.', '')] = value
 
         return stats
 
@@ -212,27 +264,24 @@ class LatencyCalculator:
             return False
 
         # 检查 RTT
-        rtt_mean = statistics.mean(self.rtt_history)
-        rtt_stdev = statistics.stdev(self.rtt_history)
-        if abs(rtt - rtt_mean) > 3 * rtt_stdev:
+        if self._deviates(self.rtt_history, rtt):
             return True
 
         # 检查上行延迟
-        if len(self.delay_up_history) >= 2:
-            delay_up_mean = statistics.mean(self.delay_up_history)
-            delay_up_stdev = statistics.stdev(self.delay_up_history)
-            if abs(delay_up - delay_up_mean) > 3 * delay_up_stdev:
-                return True
+        if len(self.delay_up_history) >= 2 and self._deviates(self.delay_up_history, delay_up):
+            return True
 
         # 检查下行延迟
-        if len(self.delay_down_history) >= 2:
-            delay_down_mean = statistics.mean(self.delay_down_history)
-            delay_down_stdev = statistics.stdev(self.delay_down_history)
-            if abs(delay_down - delay_down_mean) > 3 * delay_down_stdev:
-                return True
+        if len(self.delay_down_history) >= 2 and self._deviates(self.delay_down_history, delay_down):
+            return True
 
         return False
 
+    @staticmethod
+    def _deviates(history: RollingStats, value: float) -> bool:
+        """value 是否偏离窗口均值超过 3σ"""
+        return abs(value - history.mean()) > 3 * history.stdev()
+
     def _cleanup_timeout(self):
         """清理超时的待处理记录"""
         current_time = time.perf_counter()
@@ -252,5 +301,10 @@ class LatencyCalculator:
         self.offset_history.clear()
         self.delay_up_history.clear()
         self.delay_down_history.clear()
+        self.processing_history.clear()
+        self.rtt_hist.reset()
+        self.delay_up_hist.reset()
+        self.delay_down_hist.reset()
+        self.clock.reset()
         self.total_measurements = 0
         self.filtered_outliers = 0
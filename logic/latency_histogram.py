@@ -0,0 +1,196 @@
+"""
+流式延迟分位数 - HDR 风格对数-线性直方图（微秒分桶）
+"""
+
+import bisect
+import math
+import threading
+import time
+from typing import Dict, Iterable, List, Optional, Sequence
+
+
+# 每个 2 的幂区间划分为 64 个线性子桶 → 相对误差 ≤ 1/128（约 0.8%）
+SUB_BUCKET_BITS = 6
+_SUB_BUCKET_HALF = 1 << SUB_BUCKET_BITS          # 64
+_SUB_BUCKET_COUNT = _SUB_BUCKET_HALF << 1        # 128，小于此值的样本精确到 1µs
+
+DEFAULT_PERCENTILES = (50.0, 95.0, 99.0, 99.9)
+
+
+def _bucket_index(value_us: int) -> int:
+    """微秒值 → 桶索引"""
+    if value_us < _SUB_BUCKET_COUNT:
+        return value_us
+    shift = value_us.bit_length() - (SUB_BUCKET_BITS + 1)
+    sub = value_us >> shift                      # [64, 127]
+    return _SUB_BUCKET_COUNT + (shift - 1) * _SUB_BUCKET_HALF + (sub - _SUB_BUCKET_HALF)
+
+
+def _bucket_value(index: int) -> float:
+    """桶索引 → 桶中点（微秒）"""
+    if index < _SUB_BUCKET_COUNT:
+        return float(index)
+    offset = index - _SUB_BUCKET_COUNT
+    shift = offset // _SUB_BUCKET_HALF + 1
+    sub = offset % _SUB_BUCKET_HALF + _SUB_BUCKET_HALF
+    low = sub << shift
+    return low + ((1 << shift) - 1) / 2.0
+
+
+class LatencyHistogram:
+    """
+    HDR 风格延迟直方图
+
+    - 记录 O(1)，内存只与实际出现的桶数有关（稀疏 dict）
+    - 可合并：merge() 逐桶累加，用于窗口切片汇总或多会话合并
+    - 输入/输出单位为秒，内部以微秒分桶
+    """
+
+    def __init__(self, max_value: float = 60.0):
+        """
+        Args:
+            max_value: 可记录的最大值（秒），超出部分截断到该值
+        """
+        self.max_value_us = int(max_value * 1_000_000)
+        self.counts: Dict[int, int] = {}
+        self.total_count = 0
+        self.min_us: Optional[int] = None
+        self.max_us: Optional[int] = None
+
+    def record(self, value: float, count: int = 1):
+        """记录一个样本（秒），负值按 0 处理"""
+        value_us = min(self.max_value_us, max(0, int(round(value * 1_000_000))))
+        idx = _bucket_index(value_us)
+        self.counts[idx] = self.counts.get(idx, 0) + count
+        self.total_count += count
+        if self.min_us is None or value_us < self.min_us:
+            self.min_us = value_us
+        if self.max_us is None or value_us > self.max_us:
+            self.max_us = value_us
+
+    def merge(self, other: 'LatencyHistogram'):
+        """将另一个直方图累加到本直方图"""
+        for idx, n in other.counts.items():
+            self.counts[idx] = self.counts.get(idx, 0) + n
+        self.total_count += other.total_count
+        if other.min_us is not None and (self.min_us is None or other.min_us < self.min_us):
+            self.min_us = other.min_us
+        if other.max_us is not None and (self.max_us is None or other.max_us > self.max_us):
+            self.max_us = other.max_us
+
+    def percentiles(self, ps: Iterable[float] = DEFAULT_PERCENTILES) -> Dict[float, float]:
+        """一次遍历计算多个分位数，返回 {p: 秒}；无数据时返回空 dict"""
+        if not self.total_count:
+            return {}
+        targets = sorted((max(1, math.ceil(p / 100.0 * self.total_count)), p) for p in ps)
+        result = {}
+        cumulative = 0
+        ti = 0
+        for idx in sorted(self.counts):
+            cumulative += self.counts[idx]
+            while ti < len(targets) and cumulative >= targets[ti][0]:
+                value_us = min(max(_bucket_value(idx), self.min_us), self.max_us)
+                result[targets[ti][1]] = value_us / 1_000_000
+                ti += 1
+            if ti == len(targets):
+                break
+        return result
+
+    def percentile(self, p: float) -> Optional[float]:
+        """单个分位数（秒）"""
+        return self.percentiles((p,)).get(p)
+
+    def bucket_counts(self, edges: Sequence[float]) -> List[int]:
+        """按升序区间上界 edges（秒）汇总样本数，返回 len(edges) + 1 项（末项为超出最大上界的样本）"""
+        edges_us = [edge * 1_000_000 for edge in edges]
+        result = [0] * (len(edges_us) + 1)
+        for idx, n in self.counts.items():
+            result[bisect.bisect_left(edges_us, _bucket_value(idx))] += n
+        return result
+
+    def reset(self):
+        self.counts.clear()
+        self.total_count = 0
+        self.min_us = None
+        self.max_us = None
+
+
+class WindowedLatencyHistogram:
+    """
+    窗口 + 全生命周期双视图直方图（线程安全）
+
+    窗口视图由 slices 个时间切片组成的环形数组实现，查询时合并未过期切片；
+    切片过期时整片丢弃，不需要逐样本删除。
+    """
+
+    def __init__(self, window: float = 10.0, slices: int = 10, max_value: float = 60.0):
+        self.window = window
+        self.slices = slices
+        self._slice_len = window / slices
+        self._max_value = max_value
+        self._ring = [LatencyHistogram(max_value) for _ in range(slices)]
+        self._ring_epoch = [-1] * slices
+        self.lifetime = LatencyHistogram(max_value)
+        self._lock = threading.Lock()
+
+    def record(self, value: float, now: Optional[float] = None):
+        """记录一个样本（秒）"""
+        if now is None:
+            now = time.monotonic()
+        epoch = int(now / self._slice_len)
+        slot = epoch % self.slices
+        with self._lock:
+            if self._ring_epoch[slot] != epoch:
+                self._ring[slot].reset()
+                self._ring_epoch[slot] = epoch
+            self._ring[slot].record(value)
+            self.lifetime.record(value)
+
+    def windowed(self, now: Optional[float] = None) -> LatencyHistogram:
+        """合并窗口内切片，返回新的直方图"""
+        if now is None:
+            now = time.monotonic()
+        oldest = int(now / self._slice_len) - self.slices + 1
+        merged = LatencyHistogram(self._max_value)
+        with self._lock:
+            for hist, epoch in zip(self._ring, self._ring_epoch):
+                if epoch >= oldest:
+                    merged.merge(hist)
+        return merged
+
+    def percentiles(self, ps: Iterable[float] = DEFAULT_PERCENTILES,
+                    lifetime: bool = False) -> Dict[float, float]:
+        """窗口（默认）或全生命周期分位数，返回 {p: 秒}"""
+        if lifetime:
+            with self._lock:
+                return self.lifetime.percentiles(ps)
+        return self.windowed().percentiles(ps)
+
+    def merge(self, other: 'WindowedLatencyHistogram'):
+        """合并另一会话的直方图（按切片时间对齐）"""
+        with other._lock:
+            ring = [(h.counts.copy(), h.total_count, h.min_us, h.max_us, e)
+                    for h, e in zip(other._ring, other._ring_epoch)]
+            lifetime = LatencyHistogram(other._max_value)
+            lifetime.merge(other.lifetime)
+        with self._lock:
+            for counts, total, min_us, max_us, epoch in ring:
+                if epoch < 0:
+                    continue
+                slot = epoch % self.slices
+                if self._ring_epoch[slot] < epoch:
+                    self._ring[slot].reset()
+                    self._ring_epoch[slot] = epoch
+                elif self._ring_epoch[slot] > epoch:
+                    continue
+                src = LatencyHistogram(other._max_value)
+                src.counts, src.total_count, src.min_us, src.max_us = counts, total, min_us, max_us
+                self._ring[slot].merge(src)
+            self.lifetime.merge(lifetime)
+
+    def reset(self):
+        with self._lock:
+            for hist in self._ring:
+                hist.reset()
+            self._ring_epoch = [-1] * self.slices
+            self.lifetime.reset()
@@ -37,6 +37,7 @@ class ParamManager:
             # Image enhancement (remote — synced to air unit)
             "brightness": 0,   # -100~100
             "contrast": 0,     # -100~100
+            "gamma": 100,      # 30~300（百分比，100 = 1.0）
             "sharpness": 0,    # 0~100
             "denoise": 0,      # 0~100
         }
@@ -0,0 +1,130 @@
+"""
+滑动窗口统计 - O(1) 增量均值/方差/极值
+"""
+
+import math
+from collections import deque
+from typing import Iterator, Optional
+
+
+# 每追加 maxlen * _RESYNC_FACTOR 个样本，从窗口重新精确计算一次均值/方差，
+# 抑制长时间滑动累积的浮点误差（均摊仍为 O(1)）
+_RESYNC_FACTOR = 16
+
+
+class RollingStats:
+    """
+    固定长度滑动窗口的增量统计
+
+    - 均值/方差：窗口化 Welford（加入新值、移除最旧值均为 O(1)）
+    - 最小/最大值：单调队列（均摊 O(1)）
+
+    接口兼容 deque 的常用操作（append / len / 迭代 / clear），
+    可直接替换 LatencyCalculator 中的历史 deque。
+    """
+
+    def __init__(self, maxlen: int = 100):
+        self.maxlen = maxlen
+        self._values: deque = deque(maxlen=maxlen)
+
+        # Welford 状态
+        self._mean = 0.0
+        self._m2 = 0.0
+
+        # 单调队列：元素为 (index, value)
+        self._min_q: deque = deque()
+        self._max_q: deque = deque()
+        self._index = 0
+
+    def append(self, x: float):
+        """加入新样本，窗口已满时同时移除最旧样本"""
+        n = len(self._values)
+        if n == self.maxlen:
+            # 替换：同时移除 old、加入 x
+            old = self._values[0]
+            old_mean = self._mean
+            self._mean += (x - old) / n
+            self._m2 += (x - old) * (x - self._mean + old - old_mean)
+            if self._m2 < 0.0:
+                self._m2 = 0.0
+        else:
+            n += 1
+            delta = x - self._mean
+            self._mean += delta / n
+            self._m2 += delta * (x - self._mean)
+        self._values.append(x)
+
+        idx = self._index
+        if idx and idx % (self.maxlen * _RESYNC_FACTOR) == 0:
+            self._resync()
+        self._index += 1
+        expire = idx - self.maxlen
+
+        while self._min_q and self._min_q[-1][1] >= x:
+            self._min_q.pop()
+        self._min_q.append((idx, x))
+        while self._min_q[0][0] <= expire:
+            self._min_q.popleft()
+
+        while self._max_q and self._max_q[-1][1] <= x:
+            self._max_q.pop()
+        self._max_q.append((idx, x))
+        while self._max_q[0][0] <= expire:
+            self._max_q.popleft()
+
+    def _resync(self):
+        """从窗口数据重新计算 Welford 状态"""
+        n = len(self._values)
+        mean = math.fsum(self._values) / n
+        self._mean = mean
+        self._m2 = math.fsum((v - mean) ** 2 for v in self._values)
+
+    def mean(self) -> Optional[float]:
+        """窗口均值"""
+        if not self._values:
+            return None
+        return self._mean
+
+    def variance(self) -> Optional[float]:
+        """窗口样本方差（n-1，与 statistics.variance 一致）"""
+        n = len(self._values)
+        if n < 2:
+            return None
+        return self._m2 / (n - 1)
+
+    def stdev(self) -> Optional[float]:
+        """窗口样本标准差（与 statistics.stdev 一致）"""
+        var = self.variance()
+        if var is None:
+            return None
+        return math.sqrt(var)
+
+    def min(self) -> Optional[float]:
+        """窗口最小值"""
+        if not self._min_q:
+            return None
+        return self._min_q[0][1]
+
+    def max(self) -> Optional[float]:
+        """窗口最大值"""
+        if not self._max_q:
+            return None
+        return self._max_q[0][1]
+
+    def clear(self):
+        """清空窗口"""
+        self._values.clear()
+        self._mean = 0.0
+        self._m2 = 0.0
+        self._min_q.clear()
+        self._max_q.clear()
+        self._index = 0
+
+    def __len__(self) -> int:
+        return len(self._values)
+
+    def __iter__(self) -> Iterator[float]:
+        return iter(self._values)
+
+    def __bool__(self) -> bool:
+        return bool(self._values)
@@ -0,0 +1,67 @@
+"""统计聚合 - 后台线程按固定频率发布不可变快照，UI 帧循环只读最新快照"""
+
+import threading
+import logging
+from types import MappingProxyType
+from typing import Callable, Mapping, Optional
+
+
+logger = logging.getLogger(__name__)
+
+_EMPTY = MappingProxyType({})
+
+
+class StatsAggregator:
+    """统计聚合器
+
+    UI 每帧调用 session.get_statistics() 会跨多个组件加锁、扫描 deque 并构建新 dict。
+    聚合器改为在后台线程以 rate_hz 频率调用 source()，将结果封装为只读映射发布；
+    读取方（Application.run / StatusMonitor / ImGuiUI）每帧只取引用，不产生额外开销。
+    """
+
+    def __init__(self, source: Callable[[], dict], rate_hz: float = 10.0):
+        self._source = source
+        self._interval = 1.0 / max(0.1, rate_hz)
+        self._snapshot: Mapping = _EMPTY
+        self._version = 0
+        self._stop_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop_event.clear()
+        self.publish()
+        self._thread = threading.Thread(
+            target=self._publish_loop, daemon=True, name="StatsAggregator"
+        )
+        self._thread.start()
+
+    def stop(self):
+        self._stop_event.set()
+        if self._thread:
+            self._thread.join(timeout=1.0)
+            self._thread = None
+
+    def _publish_loop(self):
+        while not self._stop_event.wait(timeout=self._interval):
+            self.publish()
+
+    def publish(self):
+        """立即采集一次并发布快照（引用替换是原子的，读取方无需加锁）"""
+        try:
+            stats = self._source()
+        except Exception as e:
+            logger.debug(f"Stats source error: {e}")
+            return
+        self._snapshot = MappingProxyType(stats)
+        self._version += 1
+
+    def get_snapshot(self) -> Mapping:
+        """返回最新快照（只读）"""
+        return self._snapshot
+
+    @property
+    def version(self) -> int:
+        """快照版本号，每次发布 +1，供读取方判断是否有新数据"""
+        return self._version
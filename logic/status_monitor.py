@@ -3,6 +3,7 @@
 import time
 import threading
 import logging
+from types import MappingProxyType
 try:
     import psutil
     _PSUTIL_AVAILABLE = True
@@ -54,6 +55,9 @@ class StatusMonitor:
         self._proc_mem: int = 0
         self._proc = psutil.Process() if _PSUTIL_AVAILABLE else None
 
+        # 最新状态快照（update 时重建，get_status 直接返回引用）
+        self._status = MappingProxyType(self._build_status())
+
     def tick_frame(self) -> None:
         """Call once per rendered frame for FPS calculation"""
         with self._lock:
@@ -85,6 +89,8 @@ class StatusMonitor:
                 self._hist_last_update = current_time
                 self._sample_history()
 
+            self._status = MappingProxyType(self._build_status())
+
     def _sample_history(self):
         """采样一帧历史数据（在 _lock 持有时调用）"""
         idx = self._hist_idx % HISTORY_SIZE
@@ -112,22 +118,25 @@ class StatusMonitor:
 
         self._hist_idx += 1
 
-    def get_status(self) -> dict:
-        """Get current status"""
-        with self._lock:
-            return {
-                "fps": self.fps,
-                "latency_ms": self.rtt_ms,
-                "packet_loss_rate": self.packet_loss_rate,
-                "frames_received": self.frames_received,
-                "packets_received": self.packets_received,
-                "bytes_received": self.bytes_received,
-                "cpu_percent": self._cpu_percent,
-                "mem_percent": self._mem_percent,
-                "mem_used": self._mem_used,
-                "mem_total": self._mem_total,
-                "proc_mem": self._proc_mem,
-            }
+    def get_status(self):
+        """Get current status (read-only snapshot, rebuilt on each update)"""
+        return self._status
+
+    def _build_status(self) -> dict:
+        """构建状态字典（在 _lock 持有时调用）"""
+        return {
+            "fps": self.fps,
+            "latency_ms": self.rtt_ms,
+            "packet_loss_rate": self.packet_loss_rate,
+            "frames_received": self.frames_received,
+            "packets_received": self.packets_received,
+            "bytes_received": self.bytes_received,
+            "cpu_percent": self._cpu_percent,
+            "mem_percent": self._mem_percent,
+            "mem_used": self._mem_used,
+            "mem_total": self._mem_total,
+            "proc_mem": self._proc_mem,
+        }
 
     def get_history(self) -> dict:
         """返回有序历史数组（oldest→newest），供图表使用"""
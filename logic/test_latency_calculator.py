@@ -3,8 +3,14 @@ LatencyCalculator 单元测试
 """
 
 import pytest
+import random
+import statistics
 import time
+from collections import deque
 from logic.latency_calculator import LatencyCalculator, LatencyResult
+from logic.rolling_stats import RollingStats
+from logic.latency_histogram import LatencyHistogram, WindowedLatencyHistogram
+from logic.clock_sync import ClockOffsetEstimator
 
 
 class TestLatencyCalculatorBasic:
@@ -264,6 +270,22 @@ class TestLatencyCalculatorAsymmetricNetwork:
         assert result.delay_up < result.delay_down
 
 
+class TestLatencyCalculatorProcessing:
+    """机载端处理耗时（t3 - t2）"""
+
+    def test_processing_time(self):
+        calc = LatencyCalculator()
+        for i in range(5):
+            t1 = 1000.0 + i
+            calc.record_send(i, t1)
+            result = calc.record_ack(i, t1 + 0.004, t1 + 0.004 + 0.0002 * (i + 1), t1 + 0.010)
+            assert result.processing == pytest.approx(0.0002 * (i + 1))
+
+        stats = calc.get_stats()
+        assert calc.get_average_processing() == pytest.approx(0.0006)
+        assert stats['processing_max'] == pytest.approx(0.001)
+
+
 class TestLatencyCalculatorMaxHistory:
     """历史记录限制测试"""
 
@@ -288,5 +310,239 @@ class TestLatencyCalculatorMaxHistory:
         assert calc.total_measurements == 10
 
 
+class TestRollingStats:
+    """滑动窗口增量统计测试"""
+
+    def test_matches_statistics_module(self):
+        """测试与 statistics 全量计算结果一致"""
+        rng = random.Random(42)
+        window = RollingStats(maxlen=100)
+        reference = deque(maxlen=100)
+
+        for _ in range(2000):
+            x = rng.gauss(0.020, 0.004)
+            window.append(x)
+            reference.append(x)
+
+            assert window.mean() == pytest.approx(statistics.mean(reference), rel=1e-9, abs=1e-12)
+            assert window.min() == min(reference)
+            assert window.max() == max(reference)
+            if len(reference) > 1:
+                assert window.stdev() == pytest.approx(statistics.stdev(reference), rel=1e-6, abs=1e-12)
+
+    def test_monotonic_sequences(self):
+        """测试单调递增/递减序列的极值过期"""
+        window = RollingStats(maxlen=5)
+        for i in range(20):
+            window.append(float(i))
+            assert window.min() == float(max(0, i - 4))
+            assert window.max() == float(i)
+
+        window = RollingStats(maxlen=5)
+        for i in range(20):
+            window.append(float(-i))
+            assert window.min() == float(-i)
+            assert window.max() == float(-max(0, i - 4))
+
+    def test_empty_and_single(self):
+        """测试空窗口和单样本"""
+        window = RollingStats(maxlen=10)
+        assert window.mean() is None
+        assert window.min() is None
+        assert window.stdev() is None
+        assert not window
+
+        window.append(1.5)
+        assert window.mean() == 1.5
+        assert window.stdev() is None
+        assert len(window) == 1
+
+        window.clear()
+        assert window.mean() is None
+        assert len(window) == 0
+
+
+class TestLatencyCalculatorEquivalence:
+    """增量统计与原全量扫描实现的等价性测试"""
+
+    @staticmethod
+    def _reference_run(samples, max_history):
+        """原实现：deque + statistics 全量计算"""
+        rtt_h = deque(maxlen=max_history)
+        up_h = deque(maxlen=max_history)
+        down_h = deque(maxlen=max_history)
+        accepted = 0
+        filtered = 0
+
+        def outlier(value, hist):
+            return abs(value - statistics.mean(hist)) > 3 * statistics.stdev(hist)
+
+        for t1, t2, t3, t4 in samples:
+            rtt = t4 - t1
+            offset = ((t2 - t1) + (t3 - t4)) / 2
+            up = (t2 - t1) - offset
+            down = (t4 - t3) - offset
+            is_outlier = len(rtt_h) >= 2 and (
+                outlier(rtt, rtt_h) or outlier(up, up_h) or outlier(down, down_h))
+            if is_outlier:
+                filtered += 1
+            else:
+                rtt_h.append(rtt)
+                up_h.append(up)
+                down_h.append(down)
+                accepted += 1
+        return {
+            'total_measurements': accepted,
+            'filtered_outliers': filtered,
+            'rtt_avg': statistics.mean(rtt_h),
+            'rtt_min': min(rtt_h),
+            'rtt_max': max(rtt_h),
+            'rtt_stdev': statistics.stdev(rtt_h),
+            'delay_up_avg': statistics.mean(up_h),
+            'delay_down_max': max(down_h),
+        }
+
+    def test_equivalent_to_reference(self):
+        """测试随机延迟（含尖峰）下统计结果与原实现一致"""
+        rng = random.Random(7)
+        samples = []
+        t = 1000.0
+        for _ in range(2000):
+            up = rng.uniform(0.004, 0.008)
+            proc = rng.uniform(0.0001, 0.0005)
+            down = rng.uniform(0.004, 0.008)
+            if rng.random() < 0.02:
+                down += rng.uniform(0.05, 0.2)  # 偶发尖峰
+            samples.append((t, t + up, t + up + proc, t + up + proc + down))
+            t += 0.02
+
+        calc = LatencyCalculator(max_history=100, timeout=1e9)
+        for seq, (t1, t2, t3, t4) in enumerate(samples):
+            calc.record_send(seq, t1)
+            calc.record_ack(seq, t2, t3, t4)
+
+        expected = self._reference_run(samples, 100)
+        stats = calc.get_stats()
+
+        assert stats['total_measurements'] == expected['total_measurements']
+        assert stats['filtered_outliers'] == expected['filtered_outliers']
+        for key in ('rtt_avg', 'rtt_min', 'rtt_max', 'rtt_stdev', 'delay_up_avg', 'delay_down_max'):
+            assert stats[key] == pytest.approx(expected[key], rel=1e-6), key
+
+
+class TestLatencyPercentiles:
+    """延迟分位数直方图测试"""
+
+    def test_percentiles_accuracy(self):
+        """测试分位数相对误差在分桶精度内"""
+        rng = random.Random(3)
+        values = [rng.expovariate(1 / 0.015) for _ in range(20000)]
+        hist = LatencyHistogram()
+        for v in values:
+            hist.record(v)
+
+        ordered = sorted(values)
+        result = hist.percentiles((50.0, 95.0, 99.0, 99.9))
+        for p, got in result.items():
+            exact = ordered[max(0, int(p / 100.0 * len(ordered)) - 1)]
+            assert got == pytest.approx(exact, rel=0.02, abs=2e-6), p
+
+    def test_merge(self):
+        """测试合并两个直方图等价于合并样本"""
+        a, b, both = LatencyHistogram(), LatencyHistogram(), LatencyHistogram()
+        for i in range(1000):
+            a.record(0.001 * (i % 50))
+            both.record(0.001 * (i % 50))
+            b.record(0.050 + 0.001 * (i % 30))
+            both.record(0.050 + 0.001 * (i % 30))
+        a.merge(b)
+        assert a.total_count == 2000
+        assert a.percentiles() == both.percentiles()
+
+    def test_windowed_and_lifetime(self):
+        """测试窗口视图丢弃过期切片，全生命周期视图保留"""
+        hist = WindowedLatencyHistogram(window=10.0, slices=10)
+        for i in range(100):
+            hist.record(0.100, now=1000.0 + i * 0.01)
+        for i in range(100):
+            hist.record(0.010, now=1020.0 + i * 0.01)
+
+        windowed = hist.windowed(now=1021.0)
+        assert windowed.total_count == 100
+        assert windowed.percentile(99.0) == pytest.approx(0.010, rel=0.01)
+        assert hist.percentiles((99.0,), lifetime=True)[99.0] == pytest.approx(0.100, rel=0.01)
+
+    def test_tail_not_filtered(self):
+        """测试 3σ 过滤掉的尖峰仍计入分位数"""
+        calc = LatencyCalculator(timeout=1e9)
+        for i in range(200):
+            t1 = 1000.0 + i * 0.02
+            spike = 0.5 if i % 50 == 49 else 0.0
+            calc.record_send(i, t1)
+            calc.record_ack(i, t1 + 0.005, t1 + 0.006, t1 + 0.011 + spike)
+
+        assert calc.filtered_outliers > 0
+        assert calc.get_max_rtt() < 0.1
+        assert calc.rtt_hist.lifetime.percentile(99.9) > 0.4
+
+
+class TestClockOffsetEstimator:
+    """时钟偏移/漂移估计测试"""
+
+    @staticmethod
+    def _exchange(rng, t_ground, true_offset):
+        """模拟一次四时间戳交换：基础延迟 2ms + 非对称排队噪声"""
+        up = 0.002 + rng.expovariate(1 / 0.004)
+        proc = 0.0002
+        down = 0.002 + rng.expovariate(1 / 0.010)
+        t1 = t_ground
+        t2 = t1 + up + true_offset
+        t3 = t2 + proc
+        t4 = t1 + up + proc + down
+        return t1, t2, t3, t4
+
+    def test_offset_and_skew(self):
+        """测试在排队噪声下恢复偏移与漂移"""
+        rng = random.Random(11)
+        base_offset = 12345.678   # 机载端 perf_counter 起点任意
+        skew = 50e-6              # 50 ppm
+        calc = LatencyCalculator(timeout=1e9)
+
+        t = 100.0
+        for seq in range(3000):
+            true_offset = base_offset + skew * (t - 100.0)
+            t1, t2, t3, t4 = self._exchange(rng, t, true_offset)
+            calc.record_send(seq, t1)
+            calc.record_ack(seq, t2, t3, t4)
+            t += 0.02
+
+        true_now = base_offset + skew * (t - 100.0)
+        estimated = calc.get_clock_offset(t)
+        averaged = calc.get_average_offset()
+
+        assert calc.clock.skew * 1e6 == pytest.approx(50.0, abs=10.0)
+        assert abs(estimated - true_now) < 0.001
+        # 估计器应明显优于简单平均
+        assert abs(estimated - true_now) < abs(averaged - true_now)
+
+    def test_air_to_ground_roundtrip(self):
+        """测试时间戳双向映射一致"""
+        est = ClockOffsetEstimator(min_fit_span=1.0)
+        for i in range(20):
+            t = 10.0 + i
+            est.add_sample(t, 500.0 + 1e-4 * (t - 10.0), 0.004)
+
+        assert est.skew == pytest.approx(1e-4, rel=1e-6)
+        t_air = est.ground_to_air(25.0)
+        assert est.air_to_ground(t_air) == pytest.approx(25.0, abs=1e-6)
+
+    def test_not_ready(self):
+        """测试无样本时返回 None"""
+        est = ClockOffsetEstimator()
+        assert est.offset_at(1.0) is None
+        assert est.air_to_ground(1.0) is None
+        assert est.error_bound is None
+
+
 if __name__ == '__main__':
     pytest.main([__file__, '-v'])
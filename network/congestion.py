@@ -0,0 +1,356 @@
+"""拥塞控制 - 基于时延梯度 + 丢包的发送端码率估计（GCC 风格）"""
+
+import threading
+import time
+from collections import OrderedDict, deque
+from typing import Optional
+
+
+# 带宽使用状态
+BW_NORMAL = "normal"
+BW_OVERUSING = "overusing"
+BW_UNDERUSING = "underusing"
+
+
+class TrendlineEstimator:
+    """
+    时延梯度趋势检测（WebRTC TrendlineEstimator 的简化实现）
+
+    以帧为包组，比较相邻两组的到达间隔与发送间隔之差（单向排队时延的变化量），
+    对累积时延做指数平滑后在滑动窗口内线性回归，斜率持续高于自适应阈值即判定过载。
+    """
+
+    def __init__(self, window_size: int = 20, smoothing: float = 0.9,
+                 threshold_gain: float = 4.0):
+        self.window_size = window_size
+        self.smoothing = smoothing
+        self.threshold_gain = threshold_gain
+
+        self._points: deque = deque(maxlen=window_size)  # [(arrival_ms, smoothed_delay_ms)]
+        self._first_arrival_ms: Optional[float] = None
+        self._accumulated_delay = 0.0
+        self._smoothed_delay = 0.0
+        self._num_deltas = 0
+
+        # 过载检测器
+        self.threshold = 12.5
+        self._last_threshold_update_ms: Optional[float] = None
+        self._time_over_using = -1.0
+        self._overuse_counter = 0
+        self._prev_trend = 0.0
+        self.trend = 0.0
+        self.state = BW_NORMAL
+
+    def update(self, send_delta_ms: float, arrival_delta_ms: float, arrival_ms: float) -> str:
+        """加入一组相邻包组的间隔，返回当前带宽使用状态"""
+        delay_delta = arrival_delta_ms - send_delta_ms
+        self._num_deltas = min(self._num_deltas + 1, 1000)
+        if self._first_arrival_ms is None:
+            self._first_arrival_ms = arrival_ms
+
+        self._accumulated_delay += delay_delta
+        self._smoothed_delay = (self.smoothing * self._smoothed_delay +
+                                (1 - self.smoothing) * self._accumulated_delay)
+        self._points.append((arrival_ms - self._first_arrival_ms, self._smoothed_delay))
+
+        if len(self._points) == self.window_size:
+            slope = self._linear_fit_slope()
+            if slope is not None:
+                self.trend = slope
+        self._detect(send_delta_ms, arrival_ms)
+        return self.state
+
+    def _linear_fit_slope(self) -> Optional[float]:
+        n = len(self._points)
+        x_mean = sum(p[0] for p in self._points) / n
+        y_mean = sum(p[1] for p in self._points) / n
+        num = sum((x - x_mean) * (y - y_mean) for x, y in self._points)
+        den = sum((x - x_mean) ** 2 for x, _ in self._points)
+        if den == 0:
+            return None
+        return num / den
+
+    def _detect(self, ts_delta_ms: float, now_ms: float):
+        if self._num_deltas < 2:
+            return
+        modified_trend = min(self._num_deltas, 60) * self.trend * self.threshold_gain
+
+        if modified_trend > self.threshold:
+            if self._time_over_using == -1:
+                # 从零开始计时会过于敏感，先计入半个包组间隔
+                self._time_over_using = ts_delta_ms / 2
+            else:
+                self._time_over_using += ts_delta_ms
+            self._overuse_counter += 1
+            if (self._time_over_using > 10.0 and self._overuse_counter > 1
+                    and self.trend >= self._prev_trend):
+                self._time_over_using = 0.0
+                self._overuse_counter = 0
+                self.state = BW_OVERUSING
+        elif modified_trend < -self.threshold:
+            self._time_over_using = -1
+            self._overuse_counter = 0
+            self.state = BW_UNDERUSING
+        else:
+            self._time_over_using = -1
+            self._overuse_counter = 0
+            self.state = BW_NORMAL
+        self._prev_trend = self.trend
+        self._update_threshold(modified_trend, now_ms)
+
+    def _update_threshold(self, modified_trend: float, now_ms: float):
+        """自适应阈值：趋势超出阈值时缓慢上调，回落时较快下调"""
+        if self._last_threshold_update_ms is None:
+            self._last_threshold_update_ms = now_ms
+        abs_trend = abs(modified_trend)
+        if abs_trend > self.threshold + 15.0:
+            # 突发尖峰不参与阈值学习
+            self._last_threshold_update_ms = now_ms
+            return
+        k = 0.039 if abs_trend < self.threshold else 0.0087
+        dt = min(now_ms - self._last_threshold_update_ms, 100.0)
+        self.threshold += k * (abs_trend - self.threshold) * dt
+        self.threshold = min(600.0, max(6.0, self.threshold))
+        self._last_threshold_update_ms = now_ms
+
+    def reset(self):
+        self._points.clear()
+        self._first_arrival_ms = None
+        self._accumulated_delay = 0.0
+        self._smoothed_delay = 0.0
+        self._num_deltas = 0
+        self.threshold = 12.5
+        self._last_threshold_update_ms = None
+        self._time_over_using = -1.0
+        self._overuse_counter = 0
+        self._prev_trend = 0.0
+        self.trend = 0.0
+        self.state = BW_NORMAL
+
+
+class CongestionController:
+    """
+    发送端拥塞控制器（机载端）
+
+    输入：
+    - on_packet_sent：节拍器每发出一个视频分片调用一次
+    - on_feedback：地面端 VIDEO_FEEDBACK（每个分片的到达时间）
+
+    输出 target_kbps = min(时延控制码率, 丢包控制码率)：
+    - 时延（AIMD）：过载 → 降到 0.85 × 实际接收速率；正常 → 远离收敛点时每秒 +8%，
+      接近上次过载时的速率时按 RTT 加性增长；欠载 → 保持
+    - 丢包：丢包率 > 10% 按 (1 - 0.5 × loss) 下调；< 2% 允许每次反馈 +5%
+    - RTT 由反馈计算：本端发送时刻 → 反馈到达时刻，扣除地面端持有反馈的时长
+    """
+
+    BETA = 0.85
+    HISTORY_MAX = 2000
+    LOSS_WINDOW_PACKETS = 20
+
+    def __init__(self, start_kbps: int, min_kbps: int = 300, max_kbps: int = 8000):
+        self.min_kbps = min_kbps
+        self.max_kbps = max_kbps
+        self._lock = threading.Lock()
+
+        self._history: OrderedDict = OrderedDict()  # {(frame_id, chunk_idx): (send_t, size)}
+        self._trendline = TrendlineEstimator()
+
+        # 包组（帧）：[frame_id, last_send_t, last_arrival_t]
+        self._current_group: Optional[list] = None
+        self._prev_group: Optional[list] = None
+
+        # 接收速率（到达时间滑动窗口）
+        self._received: deque = deque()  # [(arrival_t, size)]
+        self.received_kbps: Optional[float] = None
+
+        # 丢包统计窗口
+        self._loss_sent = 0
+        self._loss_lost = 0
+        self.loss_fraction = 0.0
+
+        self.rtt: Optional[float] = None
+        self._delay_kbps = float(start_kbps)
+        self._loss_kbps = float(start_kbps)
+        self._rate_state = "increase"
+        self._avg_max_kbps: Optional[float] = None  # 过载时接收速率的均值（收敛点估计）
+        self._last_update_t: Optional[float] = None
+        self.overuse_events = 0
+        self.target_kbps = float(start_kbps)
+
+    def set_bounds(self, min_kbps: int, max_kbps: int):
+        """更新码率上下限（操作员设定的码率作为上限）"""
+        with self._lock:
+            self.min_kbps = min_kbps
+            self.max_kbps = max_kbps
+            self._delay_kbps = min(max(self._delay_kbps, min_kbps), max_kbps)
+            self._loss_kbps = min(max(self._loss_kbps, min_kbps), max_kbps)
+            self.target_kbps = min(self._delay_kbps, self._loss_kbps)
+
+    def on_packet_sent(self, frame_id: int, chunk_idx: int, size: int, send_t: float):
+        with self._lock:
+            key = (frame_id, chunk_idx)
+            # 重传覆盖原记录（按最后一次发送计）
+            self._history.pop(key, None)
+            self._history[key] = (send_t, size)
+            while len(self._history) > self.HISTORY_MAX:
+                self._history.popitem(last=False)
+
+    def on_feedback(self, report_t: float, arrivals: list, now: Optional[float] = None) -> float:
+        """
+        处理一条传输层反馈，返回新的目标码率（kbps）
+
+        Args:
+            report_t: 地面端发出反馈的时刻（地面端时钟）
+            arrivals: [(frame_id, chunk_idx, arrival_t)]（地面端时钟，按到达顺序）
+            now: 本端收到反馈的时刻
+        """
+        if now is None:
+            now = time.perf_counter()
+        with self._lock:
+            matched = []
+            for frame_id, chunk_idx, arrival_t in arrivals:
+                entry = self._history.pop((frame_id, chunk_idx), None)
+                if entry is not None:
+                    matched.append((frame_id, entry[0], arrival_t, entry[1]))
+            if not matched:
+                return self.target_kbps
+
+            # RTT：最后一个被报告分片，扣除地面端在上报前的持有时间
+            last_send_t, last_arrival_t = matched[-1][1], matched[-1][2]
+            rtt = (now - last_send_t) - max(0.0, report_t - last_arrival_t)
+            if rtt > 0:
+                self.rtt = rtt if self.rtt is None else 0.875 * self.rtt + 0.125 * rtt
+
+            # 丢包：早于最新被报告分片发出、却仍未被报告的分片视为丢失
+            newest_send_t = max(m[1] for m in matched)
+            lost = 0
+            while self._history:
+                key, (send_t, _) = next(iter(self._history.items()))
+                if send_t >= newest_send_t:
+                    break
+                self._history.popitem(last=False)
+                lost += 1
+            self._update_loss(len(matched), lost)
+
+            for frame_id, send_t, arrival_t, size in matched:
+                self._received.append((arrival_t, size))
+                self._add_to_group(frame_id, send_t, arrival_t)
+            self._update_received_rate()
+
+            self._update_delay_based(now)
+            self.target_kbps = min(self._delay_kbps, self._loss_kbps)
+            return self.target_kbps
+
+    def _add_to_group(self, frame_id: int, send_t: float, arrival_t: float):
+        group = self._current_group
+        if group is None or frame_id != group[0]:
+            if group is not None and self._prev_group is not None:
+                send_delta_ms = (group[1] - self._prev_group[1]) * 1000.0
+                arrival_delta_ms = (group[2] - self._prev_group[2]) * 1000.0
+                if send_delta_ms >= 0:
+                    self._trendline.update(send_delta_ms, arrival_delta_ms, group[2] * 1000.0)
+            if group is not None:
+                self._prev_group = group
+            self._current_group = [frame_id, send_t, arrival_t]
+        else:
+            group[1] = max(group[1], send_t)
+            group[2] = max(group[2], arrival_t)
+
+    def _update_received_rate(self, window: float = 0.5):
+        if not self._received:
+            return
+        newest = self._received[-1][0]
+        while self._received and self._received[0][0] < newest - window:
+            self._received.popleft()
+        span = newest - self._received[0][0]
+        if span >= 0.1:
+            total = sum(size for _, size in self._received)
+            self.received_kbps = total * 8 / span / 1000
+
+    def _update_loss(self, received: int, lost: int):
+        """按约 LOSS_WINDOW_PACKETS 个分片统计一次丢包率，并据此调整丢包控制码率"""
+        self._loss_sent += received + lost
+        self._loss_lost += lost
+        if self._loss_sent < self.LOSS_WINDOW_PACKETS:
+            return
+        self.loss_fraction = self._loss_lost / self._loss_sent
+        self._loss_sent = 0
+        self._loss_lost = 0
+        if self.loss_fraction > 0.10:
+            self._loss_kbps = self.target_kbps * (1 - 0.5 * self.loss_fraction)
+        elif self.loss_fraction < 0.02:
+            self._loss_kbps = self.target_kbps * 1.05
+        self._loss_kbps = min(max(self._loss_kbps, self.min_kbps), self.max_kbps)
+
+    def _update_delay_based(self, now: float):
+        """AIMD：根据过载检测状态调整时延控制码率"""
+        dt = 0.0 if self._last_update_t is None else min(1.0, now - self._last_update_t)
+        self._last_update_t = now
+        state = self._trendline.state
+        received = self.received_kbps
+
+        if state == BW_OVERUSING:
+            if self._rate_state != "decrease" and received:
+                self.overuse_events += 1
+                self._delay_kbps = self.BETA * received
+                if self._avg_max_kbps is None:
+                    self._avg_max_kbps = received
+                else:
+                    self._avg_max_kbps = 0.95 * self._avg_max_kbps + 0.05 * received
+            self._rate_state = "decrease"
+        elif state == BW_UNDERUSING:
+            self._rate_state = "hold"
+        else:
+            if self._rate_state == "decrease":
+                self._rate_state = "hold"
+            elif self._rate_state == "hold":
+                self._rate_state = "increase"
+            else:
+                near_max = (self._avg_max_kbps is not None and
+                            abs(self._delay_kbps - self._avg_max_kbps) < 0.1 * self._avg_max_kbps)
+                if near_max:
+                    # 加性增长：每个响应时间（RTT + 100ms）约增加一个 1200B 包
+                    response_time = (self.rtt or 0.1) + 0.1
+                    self._delay_kbps += 1200 * 8 / 1000 / response_time * dt
+                else:
+                    self._delay_kbps *= 1.08 ** dt
+            # 实际发送受限（编码器输出低于目标）时不让目标无限上涨
+            if received:
+                self._delay_kbps = min(self._delay_kbps, 1.5 * received + 10)
+
+        self._delay_kbps = min(max(self._delay_kbps, self.min_kbps), self.max_kbps)
+
+    @property
+    def state(self) -> str:
+        return self._trendline.state
+
+    def get_stats(self) -> dict:
+        with self._lock:
+            return {
+                'cc_target_kbps': self.target_kbps,
+                'cc_delay_kbps': self._delay_kbps,
+                'cc_loss_kbps': self._loss_kbps,
+                'cc_received_kbps': self.received_kbps,
+                'cc_loss': self.loss_fraction,
+                'cc_rtt_ms': self.rtt * 1000.0 if self.rtt is not None else None,
+                'cc_state': self._trendline.state,
+                'cc_overuse_events': self.overuse_events,
+            }
+
+    def reset(self, start_kbps: Optional[int] = None):
+        with self._lock:
+            self._history.clear()
+            self._trendline.reset()
+            self._current_group = None
+            self._prev_group = None
+            self._received.clear()
+            self.received_kbps = None
+            self._loss_sent = 0
+            self._loss_lost = 0
+            self.loss_fraction = 0.0
+            self.rtt = None
+            if start_kbps is not None:
+                self._delay_kbps = self._loss_kbps = self.target_kbps = float(start_kbps)
+            self._rate_state = "increase"
+            self._avg_max_kbps = None
+            self._last_update_t = None
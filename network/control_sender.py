@@ -8,8 +8,11 @@ import logging
 from collections import deque
 from typing import Optional, Callable, Dict
 from config import Config
-from network.protocol import Protocol, MSG_TYPE_ACK, MSG_TYPE_PARAM_UPDATE, KEYBOARD_STATE_SIZE
+from network.protocol import (Protocol, MSG_TYPE_ACK, MSG_TYPE_PARAM_UPDATE, KEYBOARD_STATE_SIZE,
+                              CONTROL_HISTORY_MAX)
 from network.keyboard_encoder import KeyboardEncoder
+from network.rx_timestamp import enable_rx_timestamps, recv_timestamped
+from network.tx_scheduler import DeadlineScheduler
 from logic.latency_calculator import LatencyCalculator
 
 
@@ -30,7 +33,7 @@ class ControlSender:
         # 延迟计算
         self.latency_calc = LatencyCalculator()
 
-        # 待确认的消息 {seq: (send_time, retry_count)}
+        # 待确认的消息 {seq: (send_time, retry_count)}，send_time 为 perf_counter
         self._pending_acks: Dict[int, tuple] = {}
         self._pending_lock = threading.Lock()
 
@@ -45,6 +48,13 @@ class ControlSender:
         self._scroll_delta = 0
         self._mouse_lock = threading.Lock()
 
+        # 冗余模式：最近发送的 N 条指令鼠标数据 (dx, dy, buttons, scroll)，最近的在前
+        self.redundancy = max(0, min(CONTROL_HISTORY_MAX, Config.CONTROL_REDUNDANCY))
+        self._history: deque = deque(maxlen=self.redundancy)
+
+        # 发送节拍（绝对截止时间），只在发送时刻与重传截止时刻唤醒
+        self.scheduler = DeadlineScheduler(Config.TX_SEND_RATE, Config.TX_SPIN_US / 1e6)
+
         # 回调
         self.on_error: Optional[Callable] = None
         self.on_param_response: Optional[Callable[[dict], None]] = None
@@ -56,7 +66,11 @@ class ControlSender:
         self.acks_received = 0
         self.retransmits = 0
         self.timeout_errors = 0
+        # 冗余模式下未收到 ACK 的指令（数据由后续包冗余携带，不算超时错误）
+        self.unacked_redundant = 0
         self._param_seq = 0
+        # ACK 接收时间 t4 是否取内核时间戳（SO_TIMESTAMPNS）
+        self.kernel_rx_timestamps = False
 
         # 滑动窗口丢包率
         self._send_times: deque = deque(maxlen=200)
@@ -118,26 +132,22 @@ class ControlSender:
             self.socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
             self.socket.bind(('0.0.0.0', 0))
             self.socket.settimeout(0.1)
+            if Config.RX_KERNEL_TIMESTAMPS:
+                self.kernel_rx_timestamps = enable_rx_timestamps(self.socket)
 
             seq = 0
-            interval = 1.0 / Config.TX_SEND_RATE
-            last_send_time = time.time()
+            self.scheduler.start()
 
             while self.is_running:
-                current_time = time.time()
-                elapsed = current_time - last_send_time
-
-                # 定期发送控制指令
-                if elapsed >= interval:
-                    seq += 1
-                    self._send_control_command(seq)
-                    last_send_time = current_time
+                # 睡到下一个发送节拍或最早的重传截止时刻
+                if self.scheduler.wait(self._next_retransmit_deadline()):
+                    # 只有构建出控制包时才占用 seq，保证 history[i] 与 seq - 1 - i 对应
+                    if self._send_control_command(seq + 1):
+                        seq += 1
 
                 # 检查超时重传
                 self._check_retransmit()
 
-                time.sleep(0.001)
-
         except Exception as e:
             logger.error(f"TX thread error: {e}")
             if self.on_error:
@@ -152,13 +162,16 @@ class ControlSender:
                     continue
 
                 try:
-                    data, addr = self.socket.recvfrom(4096)
+                    if self.kernel_rx_timestamps:
+                        data, addr, rx_time, _ = recv_timestamped(self.socket, 4096)
+                    else:
+                        data, addr = self.socket.recvfrom(4096)
+                        rx_time = time.perf_counter()
                     if len(data) < 13:
                         continue
-                    import struct
-                    msg_type = struct.unpack('B', data[3:4])[0]
+                    msg_type = data[3]
                     if msg_type == MSG_TYPE_ACK:
-                        self._process_ack(data)
+                        self._process_ack(data, rx_time)
                     elif msg_type == MSG_TYPE_PARAM_UPDATE:
                         self._process_param_response(data)
                 except socket.timeout:
@@ -169,6 +182,11 @@ class ControlSender:
         except Exception as e:
             logger.error(f"RX thread error: {e}")
 
+    def set_send_rate(self, rate_hz: float):
+        """修改控制指令发送频率（Hz，最高 1000）"""
+        self.scheduler.set_rate(rate_hz)
+        logger.info(f"Control send rate: {self.scheduler.rate:g} Hz")
+
     def update_mouse(self, dx: int, dy: int, buttons: int, scroll: int):
         """由 app.py 每帧调用，更新鼠标状态供下一次控制指令使用"""
         with self._mouse_lock:
@@ -177,12 +195,17 @@ class ControlSender:
             self._mouse_buttons = buttons
             self._scroll_delta = scroll
 
-    def _send_control_command(self, seq: int):
-        """发送控制指令 — READY 时发真实位图，否则发全零"""
+    def _send_control_command(self, seq: int) -> bool:
+        """发送控制指令 — READY 时发真实位图，否则发全零
+
+        Returns:
+            seq 是否已占用（控制包已构建并记入冗余历史，发送失败也算占用）
+        """
+        built = False
         try:
             sock = self.socket
             if not sock or not self.remote_addr:
-                return
+                return False
 
             polled = self.keyboard.get_state()
             keyboard_state = polled if self.is_ready else self._zero_state
@@ -208,13 +231,17 @@ class ControlSender:
                 mouse_dy=mouse_dy,
                 mouse_buttons=mouse_buttons,
                 scroll_delta=scroll_delta,
+                history=tuple(self._history),
             )
+            if self.redundancy:
+                self._history.appendleft((mouse_dx, mouse_dy, mouse_buttons, scroll_delta))
+            built = True
 
             sock.sendto(message, self.remote_addr)
 
             # 记录待确认
             with self._pending_lock:
-                self._pending_acks[seq] = (time.time(), 0)
+                self._pending_acks[seq] = (time.perf_counter(), 0)
                 self.latency_calc.record_send(seq, t1)
 
             with self._stats_lock:
@@ -226,14 +253,12 @@ class ControlSender:
                 logger.error(f"Send error: {e}")
                 if self.on_error:
                     self.on_error(str(e))
+        return built
 
-    def _process_ack(self, data: bytes):
-        """处理ACK"""
+    def _process_ack(self, data: bytes, t4: float):
+        """处理ACK（t4 为 ACK 接收时间）"""
         try:
             seq, t2, t3 = Protocol.parse_ack(data)
-
-            # 记录ACK时间
-            t4 = time.perf_counter()
             self.latency_calc.record_ack(seq, t2, t3, t4)
 
             # 移除待确认
@@ -249,26 +274,41 @@ class ControlSender:
             logger.debug(f"ACK parse error: {e}")
 
     def _check_retransmit(self):
-        """检查超时重传"""
-        current_time = time.time()
+        """检查超时重传（冗余模式下丢失的指令已由后续包补齐，超时只计数不重传）"""
+        current_time = time.perf_counter()
         to_retransmit = []
+        max_retries = 0 if self.redundancy else 3
 
         with self._pending_lock:
             for seq, (send_time, retry_count) in list(self._pending_acks.items()):
                 elapsed = current_time - send_time
 
-                if elapsed > 0.1 and retry_count < 3:
+                if elapsed >= Config.TX_TIMEOUT and retry_count < max_retries:
                     to_retransmit.append((seq, retry_count))
-                elif elapsed > 0.1 and retry_count >= 3:
+                elif elapsed >= Config.TX_TIMEOUT and retry_count >= max_retries:
                     del self._pending_acks[seq]
                     with self._stats_lock:
-                        self.timeout_errors += 1
+                        if self.redundancy:
+                            self.unacked_redundant += 1
+                        else:
+                            self.timeout_errors += 1
 
         for seq, retry_count in to_retransmit:
             self._retransmit_command(seq, retry_count)
 
+    def _next_retransmit_deadline(self) -> Optional[float]:
+        """最早的待确认指令超时时刻（perf_counter），无待确认时返回 None"""
+        with self._pending_lock:
+            if not self._pending_acks:
+                return None
+            return min(send_time for send_time, _ in self._pending_acks.values()) + Config.TX_TIMEOUT
+
     def _retransmit_command(self, seq: int, retry_count: int):
-        """重传控制指令"""
+        """重传控制指令
+
+        发送失败（socket 已关闭 / sendto 异常）也计为一次尝试并刷新超时时刻，
+        否则截止时刻停在过去，发送线程会空转并每轮重复报错
+        """
         try:
             sock = self.socket
             if not sock or not self.remote_addr:
@@ -286,11 +326,6 @@ class ControlSender:
 
             sock.sendto(message, self.remote_addr)
 
-            # 更新待确认
-            with self._pending_lock:
-                if seq in self._pending_acks:
-                    self._pending_acks[seq] = (time.time(), retry_count + 1)
-
             with self._stats_lock:
                 self.retransmits += 1
 
@@ -298,6 +333,11 @@ class ControlSender:
 
         except Exception as e:
             logger.error(f"Retransmit error: {e}")
+        finally:
+            # 更新待确认
+            with self._pending_lock:
+                if seq in self._pending_acks:
+                    self._pending_acks[seq] = (time.perf_counter(), retry_count + 1)
 
     def get_recent_loss(self, window: float = 1.0) -> float:
         """计算最近 window 秒内的丢包率"""
@@ -353,6 +393,7 @@ class ControlSender:
         with self._stats_lock:
             rtt_min = self.latency_calc.get_min_rtt()
             rtt_max = self.latency_calc.get_max_rtt()
+            processing = self.latency_calc.get_average_processing()
             return {
                 "commands_sent": self.commands_sent,
                 "acks_received": self.acks_received,
@@ -362,6 +403,33 @@ class ControlSender:
                 "packets_lost": max(0, self.commands_sent - self.acks_received),
                 "packets_retransmitted": self.retransmits,
                 "timeout_errors": self.timeout_errors,
+                "unacked_redundant": self.unacked_redundant,
                 "latency_min_ms": (rtt_min * 1000.0) if rtt_min else 0.0,
                 "latency_max_ms": (rtt_max * 1000.0) if rtt_max else 0.0,
+                "air_processing_ms": (processing * 1000.0) if processing else 0.0,
+                "kernel_rx_timestamps": self.kernel_rx_timestamps,
+                **self._percentile_stats(),
+                **self._clock_stats(),
+                **self.scheduler.get_statistics(),
             }
+
+    def _clock_stats(self) -> dict:
+        """机载端时钟映射状态"""
+        clock = self.latency_calc.clock.get_stats()
+        if "clock_offset" not in clock:
+            return {}
+        return {
+            "clock_offset_ms": clock["clock_offset"] * 1000.0,
+            "clock_skew_ppm": clock["clock_skew_ppm"],
+            "clock_error_ms": clock["clock_error_bound"] * 1000.0,
+        }
+
+    def _percentile_stats(self) -> dict:
+        """RTT / 上下行分位数（毫秒）：窗口视图 + RTT 全生命周期视图"""
+        stats = {}
+        for metric in ("rtt", "delay_up", "delay_down"):
+            for p, value in self.latency_calc.get_percentiles(metric).items():
+                stats[f"{metric}_p{p:g}_ms".replace(".", "")] = value * 1000.0
+        for p, value in self.latency_calc.get_percentiles("rtt", lifetime=True).items():
+            stats[f"rtt_lifetime_p{p:g}_ms".replace(".", "")] = value * 1000.0
+        return stats
@@ -0,0 +1,169 @@
+"""机载端控制面 - asyncio 事件循环 + add_reader 批量收包，复用 Protocol 编解码，按消息类型查表分发"""
+
+import asyncio
+import logging
+import socket
+import threading
+import time
+from typing import Callable, Dict, Optional
+
+from network.protocol import Protocol
+from network.rx_timestamp import enable_rx_timestamps, recv_timestamped
+
+logger = logging.getLogger(__name__)
+
+# 每次可读事件最多连续接收的数据报数（避免单个客户端洪泛时饿死事件循环中的其他回调）
+RECV_BATCH = 64
+RECV_BUFFER_SIZE = 4096
+
+# 处理函数签名：handler(addr, seq, t1, payload, rx_time)
+#   payload 为 Header + t1 之后、CRC 之前的字节（无则 None），rx_time 为收到该包时的 perf_counter
+#   （开启内核时间戳时为包到达协议栈的时刻，不含事件循环调度延迟）
+ControlHandler = Callable[[tuple, int, float, Optional[bytes], float], None]
+
+
+class ControlServer:
+    """
+    控制端口 UDP 服务
+
+    事件循环运行在独立线程中；每个数据报经 Protocol.parse_message 校验（Magic / 版本 / CRC）后
+    按 msg_type 在 handlers 表中查找处理函数，未注册的类型计入 unhandled。
+    处理函数在事件循环线程中执行，可直接调用 sendto / send_ack。
+
+    不使用 create_datagram_endpoint（标准 datagram transport 每次可读事件只收一个包），
+    而是把非阻塞 socket 用 add_reader 挂到事件循环上，一次可读事件批量收完 socket 缓冲
+    （最多 RECV_BATCH 个）再逐个分发；发送直接 sendto 非阻塞 socket，缓冲满时丢弃（UDP 语义）。
+    """
+
+    def __init__(self, handlers: Optional[Dict[int, ControlHandler]] = None,
+                 on_message: Optional[Callable[[tuple], None]] = None,
+                 kernel_timestamps: bool = True):
+        """
+        Args:
+            handlers: {msg_type: handler}
+            on_message: 每个通过校验的消息（分发前）回调 on_message(addr)，用于记录客户端
+            kernel_timestamps: rx_time 使用 SO_TIMESTAMPNS 内核接收时间戳（平台支持时）
+        """
+        self.handlers: Dict[int, ControlHandler] = dict(handlers or {})
+        self.on_message = on_message
+        self.kernel_timestamps = kernel_timestamps
+
+        self.address: Optional[tuple] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._sock: Optional[socket.socket] = None
+        self._thread: Optional[threading.Thread] = None
+
+        # 统计
+        self.messages_received = 0
+        self.invalid_messages = 0
+        self.unhandled_messages = 0
+        self.handler_errors = 0
+        self.acks_sent = 0
+        self.send_drops = 0
+        self.kernel_rx_timestamps = 0
+
+    def register(self, msg_type: int, handler: ControlHandler):
+        self.handlers[msg_type] = handler
+
+    # -------------------------------------------------------------------------
+    # 生命周期
+    # -------------------------------------------------------------------------
+
+    def start(self, host: str = "0.0.0.0", port: int = 0) -> tuple:
+        """绑定端口并在后台线程启动事件循环，返回实际绑定地址"""
+        sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        sock.bind((host, port))
+        sock.setblocking(False)
+        if self.kernel_timestamps:
+            self.kernel_timestamps = enable_rx_timestamps(sock)
+        self.address = sock.getsockname()
+        self._sock = sock
+
+        self._loop = asyncio.new_event_loop()
+        self._loop.add_reader(sock.fileno(), self._read_ready)
+        self._thread = threading.Thread(target=self._run, name="control-server", daemon=True)
+        self._thread.start()
+        logger.info(f"Control server listening on {self.address[0]}:{self.address[1]} "
+                    f"(rx timestamps: {'kernel' if self.kernel_timestamps else 'user'})")
+        return self.address
+
+    def _run(self):
+        asyncio.set_event_loop(self._loop)
+        try:
+            self._loop.run_forever()
+        finally:
+            self._loop.remove_reader(self._sock.fileno())
+            self._sock.close()
+            self._loop.close()
+
+    def stop(self):
+        loop = self._loop
+        if loop is None or loop.is_closed():
+            return
+        loop.call_soon_threadsafe(loop.stop)
+        if self._thread and self._thread is not threading.current_thread():
+            self._thread.join(timeout=2.0)
+
+    # -------------------------------------------------------------------------
+    # 收包（事件循环线程）
+    # -------------------------------------------------------------------------
+
+    def _read_ready(self):
+        """可读事件：批量收包"""
+        sock = self._sock
+        for _ in range(RECV_BATCH):
+            try:
+                if self.kernel_timestamps:
+                    data, addr, rx_time, from_kernel = recv_timestamped(sock, RECV_BUFFER_SIZE)
+                    self.kernel_rx_timestamps += from_kernel
+                else:
+                    data, addr = sock.recvfrom(RECV_BUFFER_SIZE)
+                    rx_time = time.perf_counter()
+            except (BlockingIOError, InterruptedError):
+                return
+            except OSError as e:
+                self._socket_error(e)
+                return
+            self._dispatch(data, addr, rx_time)
+
+    def _dispatch(self, data: bytes, addr: tuple, rx_time: float):
+        try:
+            msg_type, seq, t1, payload = Protocol.parse_message(data)
+        except (ValueError, IndexError):
+            self.invalid_messages += 1
+            return
+        self.messages_received += 1
+        if self.on_message:
+            self.on_message(addr)
+
+        handler = self.handlers.get(msg_type)
+        if handler is None:
+            self.unhandled_messages += 1
+            return
+        try:
+            handler(addr, seq, t1, payload, rx_time)
+        except Exception as e:
+            self.handler_errors += 1
+            logger.error(f"Control handler error (type={msg_type:#04x}): {e}")
+
+    def _socket_error(self, exc: OSError):
+        # ICMP 端口不可达等（客户端已退出），不影响其他客户端
+        logger.debug(f"Control socket error: {exc}")
+
+    # -------------------------------------------------------------------------
+    # 发送（事件循环线程内调用）
+    # -------------------------------------------------------------------------
+
+    def sendto(self, data: bytes, addr: tuple):
+        try:
+            self._sock.sendto(data, addr)
+        except (BlockingIOError, InterruptedError):
+            self.send_drops += 1
+        except OSError as e:
+            self._socket_error(e)
+
+    def send_ack(self, addr: tuple, seq: int, t2: float):
+        """回复 ACK：t2 为收包时间，t3 为发送前时刻（t3 - t2 即机载端处理耗时）"""
+        self.sendto(Protocol.build_ack(seq, t2, time.perf_counter()), addr)
+        self.acks_sent += 1
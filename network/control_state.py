@@ -0,0 +1,72 @@
+"""机载端控制状态 - 按 seq 去重，用控制包携带的前序指令冗余补齐丢失的包"""
+
+from dataclasses import dataclass
+from typing import Optional
+
+from network.protocol import ControlCommand, KEYBOARD_STATE_SIZE
+
+# seq 落后最新值超过该窗口时视为客户端重启（seq 从头计数），而非迟到的旧包
+SEQ_RESET_WINDOW = 1024
+
+
+@dataclass
+class ControlInput:
+    """累计的输入状态"""
+    keyboard_state: bytes = b'\x00' * KEYBOARD_STATE_SIZE
+    mouse_x: int = 0            # 鼠标增量累计
+    mouse_y: int = 0
+    scroll: int = 0
+    buttons: int = 0            # 当前按键位图
+    button_presses: int = 0     # 按下 / 抬起沿计数（冗余补齐后不丢短促点击）
+    button_releases: int = 0
+
+
+class ControlStateReceiver:
+    """
+    单个客户端的控制指令接收状态
+
+    - seq 不大于已应用的最新 seq：重复（超时重传 / 网络复制）或迟到的包，不再应用
+    - seq 跳号：包中 history[i] 对应 seq - 1 - i，按 seq 升序补应用未收到的前序指令；
+      超出冗余深度的部分计入 lost
+    - 键盘位图为状态量，只取最新包
+    """
+
+    def __init__(self):
+        self.last_seq: Optional[int] = None
+        self.input = ControlInput()
+
+        # 统计
+        self.applied = 0
+        self.duplicates = 0
+        self.recovered = 0
+        self.lost = 0
+
+    def receive(self, seq: int, cmd: ControlCommand) -> bool:
+        """处理一条控制指令，返回是否为新指令（重复 / 迟到的包返回 False）"""
+        last = self.last_seq
+        if last is not None and last - SEQ_RESET_WINDOW < seq <= last:
+            self.duplicates += 1
+            return False
+
+        if last is not None and last < seq:
+            gap = seq - last - 1
+            recoverable = min(gap, len(cmd.history))
+            for i in reversed(range(recoverable)):
+                self._apply(*cmd.history[i])
+            self.recovered += recoverable
+            self.lost += gap - recoverable
+
+        self._apply(cmd.mouse_dx, cmd.mouse_dy, cmd.mouse_buttons, cmd.scroll_delta)
+        self.input.keyboard_state = cmd.keyboard_state
+        self.last_seq = seq
+        self.applied += 1
+        return True
+
+    def _apply(self, dx: int, dy: int, buttons: int, scroll: int):
+        state = self.input
+        state.mouse_x += dx
+        state.mouse_y += dy
+        state.scroll += scroll
+        state.button_presses += bin(buttons & ~state.buttons).count('1')
+        state.button_releases += bin(state.buttons & ~buttons).count('1')
+        state.buttons = buttons
@@ -1,7 +1,7 @@
 """H.264 解码器 - 使用 PyAV 实现实时解码"""
 
 import logging
-from typing import List, Optional
+from typing import Iterator, List, Optional, Tuple
 import numpy as np
 
 logger = logging.getLogger(__name__)
@@ -14,6 +14,101 @@ except ImportError:
     logger.warning("PyAV not installed, H.264 decoding unavailable")
 
 
+# NAL 单元类型
+NAL_SLICE = 1
+NAL_IDR = 5
+NAL_SEI = 6
+NAL_SPS = 7
+NAL_PPS = 8
+# SEI payload 类型：恢复点（intra-refresh 周期起点）
+SEI_RECOVERY_POINT = 6
+
+
+def iter_nal_units(data: bytes) -> Iterator[Tuple[int, bytes]]:
+    """按 Annex B 起始码拆分，逐个返回 (nal_type, nal_bytes)（含 NAL 头，不含起始码）"""
+    n = len(data)
+    start = data.find(b'\x00\x00\x01')
+    while start != -1 and start + 3 < n:
+        begin = start + 3
+        nxt = data.find(b'\x00\x00\x01', begin)
+        end = n if nxt == -1 else nxt
+        # 4 字节起始码的前导 0 属于下一个起始码
+        nal_end = end - 1 if nxt != -1 and data[end - 1] == 0 else end
+        if nal_end > begin:
+            yield data[begin] & 0x1F, data[begin:nal_end]
+        start = nxt
+
+
+def _unescape_rbsp(nal: bytes) -> bytes:
+    """去除防竞争字节（00 00 03 → 00 00）"""
+    return nal.replace(b'\x00\x00\x03', b'\x00\x00')
+
+
+def _read_ue(rbsp: bytes, bit_pos: int) -> Tuple[Optional[int], int]:
+    """读取一个无符号 Exp-Golomb 码，返回 (值, 新位置)；越界返回 (None, bit_pos)"""
+    total_bits = len(rbsp) * 8
+    zeros = 0
+    pos = bit_pos
+    while pos < total_bits and not (rbsp[pos >> 3] >> (7 - (pos & 7))) & 1:
+        zeros += 1
+        pos += 1
+    if pos + zeros >= total_bits:
+        return None, bit_pos
+    pos += 1
+    value = 0
+    for _ in range(zeros):
+        value = (value << 1) | ((rbsp[pos >> 3] >> (7 - (pos & 7))) & 1)
+        pos += 1
+    return (1 << zeros) - 1 + value, pos
+
+
+def parse_recovery_point(sei_nal: bytes) -> Optional[int]:
+    """解析 SEI NAL 中的恢复点消息，返回 recovery_frame_cnt；没有则返回 None"""
+    rbsp = _unescape_rbsp(sei_nal[1:])
+    i = 0
+    while i < len(rbsp) and rbsp[i] != 0x80:  # 0x80 为 rbsp_trailing_bits
+        payload_type = 0
+        while i < len(rbsp) and rbsp[i] == 0xFF:
+            payload_type += 255
+            i += 1
+        if i >= len(rbsp):
+            return None
+        payload_type += rbsp[i]
+        i += 1
+        payload_size = 0
+        while i < len(rbsp) and rbsp[i] == 0xFF:
+            payload_size += 255
+            i += 1
+        if i >= len(rbsp):
+            return None
+        payload_size += rbsp[i]
+        i += 1
+        if payload_type == SEI_RECOVERY_POINT:
+            value, _ = _read_ue(rbsp[i:i + payload_size], 0)
+            return value
+        i += payload_size
+    return None
+
+
+def scan_access_unit(data: bytes) -> Tuple[bool, Optional[int]]:
+    """
+    扫描一帧编码数据
+
+    Returns:
+        (是否含 IDR, 恢复点 recovery_frame_cnt 或 None)
+    """
+    is_idr = False
+    recovery_cnt = None
+    for nal_type, nal in iter_nal_units(data):
+        if nal_type == NAL_IDR:
+            is_idr = True
+        elif nal_type == NAL_SEI and recovery_cnt is None:
+            recovery_cnt = parse_recovery_point(nal)
+        elif nal_type == NAL_SLICE:
+            break  # SEI 位于首个 slice 之前
+    return is_idr, recovery_cnt
+
+
 class H264Decoder:
     """H.264 实时解码器"""
 
@@ -2,7 +2,9 @@
 
 import fractions
 import logging
-from typing import List, Optional
+import threading
+import time
+from typing import List, Optional, Sequence, Union
 import numpy as np
 
 logger = logging.getLogger(__name__)
@@ -14,53 +16,272 @@ except ImportError:
     H264_AVAILABLE = False
     logger.warning("PyAV not installed, H.264 encoding unavailable")
 
+# VBV 缓冲区（按每帧码率预算计）：限制单帧突发，I 帧最多约占两帧预算
+VBV_BUFFER_FRAMES = 2
+
+
+def packetize_access_unit(data: bytes, max_size: int) -> List[bytes]:
+    """
+    按 NAL 边界切分 Annex B 帧数据
+
+    每个分片由一个或多个完整 NAL（含起始码）拼接而成，不超过 max_size；
+    单个 NAL 超过 max_size 时才被拆开（后续分片不以起始码开头）。
+    分片按顺序拼接即还原原始字节流，接收端可只解码到达的 slice。
+    """
+    starts = []
+    pos = data.find(b'\x00\x00\x01')
+    while pos != -1:
+        # 4 字节起始码从前导 0 开始
+        starts.append(pos - 1 if pos > 0 and data[pos - 1] == 0 else pos)
+        pos = data.find(b'\x00\x00\x01', pos + 3)
+    if not starts or starts[0] != 0:
+        starts.insert(0, 0)
+    bounds = starts + [len(data)]
+
+    chunks = []
+    current = bytearray()
+    for begin, end in zip(bounds, bounds[1:]):
+        nal_len = end - begin
+        if current and len(current) + nal_len > max_size:
+            chunks.append(bytes(current))
+            current = bytearray()
+        if nal_len > max_size:
+            # 超长 NAL：按 max_size 拆开
+            for off in range(begin, end, max_size):
+                chunks.append(data[off:min(off + max_size, end)])
+            continue
+        current += data[begin:end]
+    if current:
+        chunks.append(bytes(current))
+    return chunks
+
+
+def split_i420(frame: np.ndarray, width: int, height: int) -> tuple:
+    """紧凑 I420 数组 (height * 3/2, width) → (Y, U, V) 平面视图（不复制）"""
+    y = frame[:height]
+    u = frame[height:height + height // 4].reshape(height // 2, width // 2)
+    v = frame[height + height // 4:height + height // 2].reshape(height // 2, width // 2)
+    return y, u, v
+
+
+def split_nv12(frame: np.ndarray, width: int, height: int) -> tuple:
+    """紧凑 NV12 数组 (height * 3/2, width) → (Y, UV) 平面视图（不复制）"""
+    return frame[:height], frame[height:height + height // 2]
+
 
 class H264Encoder:
-    """H.264 实时编码器 - ultrafast + zerolatency"""
+    """H.264 实时编码器 - ultrafast + zerolatency
+
+    两种输入路径：
+    - encode(frame_bgr)：每帧新建 VideoFrame，由 swscale 转换 BGR → YUV
+    - encode_yuv(planes)：YUV420P / NV12 平面直接写入预分配、复用的 VideoFrame，
+      无颜色转换（pix_fmt='nv12' 时 x264 直接接受 NV12 输入）
+
+    输出 packet 以 memoryview 交出（不复制），调用方拼接时才复制一次。
+
+    intra_refresh=True 时使用 x264 周期帧内刷新：不再周期性插入 IDR，而是让一列
+    帧内宏块在 keyframe_interval 帧内扫过整幅画面，每个刷新周期起点带恢复点 SEI。
+    帧大小保持平稳，丢包后经过一个刷新周期即可恢复。
+
+    码率控制为 CBR VBV（maxrate = bitrate），max_bitrate 为打开编码器时的码率上限，
+    reconfigure 在其之下在线修改码率。
+    """
 
     def __init__(self, width: int, height: int, fps: int = 30,
-                 bitrate: int = 2_000_000, keyframe_interval: int = 30):
+                 bitrate: int = 2_000_000, keyframe_interval: int = 30,
+                 intra_refresh: bool = False, slice_max_size: int = 0,
+                 pix_fmt: str = 'yuv420p', max_bitrate: Optional[int] = None):
         if not H264_AVAILABLE:
             raise RuntimeError("PyAV not installed")
 
         self.width = width
         self.height = height
-        self.fps = fps
+        self.keyframe_interval = keyframe_interval
+        self.intra_refresh = intra_refresh
+        # > 0 时每个 slice NAL（含起始码）不超过该字节数，与分片大小匹配
+        self.slice_max_size = slice_max_size
+        if pix_fmt not in ('yuv420p', 'nv12'):
+            raise ValueError(f"Unsupported pix_fmt: {pix_fmt}")
+        self.pix_fmt = pix_fmt
         self.pts = 0
 
+        # encode_yuv 复用的输入帧及其各平面的可写视图（首次使用时分配）
+        self._input_frame = None
+        self._input_planes: List[np.ndarray] = []
+
+        # 目标码率 / 帧率（运行中可由 reconfigure 修改）
+        self.bitrate = bitrate
+        self.fps = fps
+        self.max_bitrate = max_bitrate or bitrate
+        # 编码器打开时的帧率与 VBV 码率：x264 按此帧率分配每帧码率预算，
+        # 在线修改的码率不能超过打开时的 VBV 码率
+        self._open_fps = fps
+        self._vbv_max_rate = 0
+
+        self.reconfigures = 0
+        self.reopens = 0
+        self.last_reconfigure_ms = 0.0
+        # 上一次 encode 输出的是编码器（重）开后的首帧（IDR），重开由 reconfigure 触发时调用方
+        # 需据此标记切层点；帧内刷新模式的恢复点也带 is_keyframe，不能用来判断
+        self.last_reopened = False
+        self._reopened = False
+        # 最近一帧编码耗时：墙钟 / 调用线程 CPU（含颜色转换；x264 内部线程不计入）
+        self.last_encode_ms = 0.0
+        self.last_encode_cpu_ms = 0.0
+
+        # 编码线程与参数更新线程（拥塞控制）互斥
+        self._lock = threading.Lock()
+        self.codec_ctx = None
+        self._open()
+        logger.info(f"H264Encoder initialized: {width}x{height}@{fps}fps, "
+                    f"{bitrate // 1000}kbps"
+                    f"{', intra-refresh' if intra_refresh else ''}")
+
+    def _open(self):
+        ceiling = max(self.max_bitrate, self.bitrate)
         self.codec_ctx = av.CodecContext.create('libx264', 'w')
-        self.codec_ctx.width = width
-        self.codec_ctx.height = height
-        self.codec_ctx.time_base = fractions.Fraction(1, fps)
-        self.codec_ctx.bit_rate = bitrate
-        self.codec_ctx.pix_fmt = 'yuv420p'
-        self.codec_ctx.gop_size = keyframe_interval
+        self.codec_ctx.width = self.width
+        self.codec_ctx.height = self.height
+        self.codec_ctx.time_base = fractions.Fraction(1, self.fps)
+        self.codec_ctx.bit_rate = ceiling
+        self.codec_ctx.pix_fmt = self.pix_fmt
+        self.codec_ctx.gop_size = self.keyframe_interval
         self.codec_ctx.max_b_frames = 0
-        self.codec_ctx.options = {
+        options = {
             'preset': 'ultrafast',
             'tune': 'zerolatency',
             'profile': 'baseline',
+            # CBR VBV：x264 只有启用 VBV 时才接受在线修改码率
+            'maxrate': str(ceiling),
+            'bufsize': str(ceiling * VBV_BUFFER_FRAMES // self.fps),
         }
+        if self.intra_refresh:
+            # 刷新周期 = keyint；只有首帧为 IDR
+            options['intra-refresh'] = '1'
+        if self.slice_max_size > 0:
+            options['x264-params'] = f'slice-max-size={self.slice_max_size}'
+        self.codec_ctx.options = options
         self.codec_ctx.open()
-        logger.info(f"H264Encoder initialized: {width}x{height}@{fps}fps, "
-                    f"{bitrate // 1000}kbps")
+        self._reopened = True
+        self._open_fps = self.fps
+        self._vbv_max_rate = ceiling
+        # 低于上限时下一帧编码前即在线收紧
+        self.codec_ctx.bit_rate = self.bitrate
+
+    def _effective_bit_rate(self) -> int:
+        """
+        写入编码器的码率
+
+        x264 按打开时的帧率计算每帧预算（bitrate / open_fps）。帧率在线变化时
+        按比例缩放码率（VBV 码率随之缩放，见 reconfigure），使每帧预算等于
+        bitrate / fps，无需重开编码器。
+        """
+        return int(self.bitrate * self._open_fps / self.fps)
+
+    def reconfigure(self, bitrate: Optional[int] = None, fps: Optional[int] = None,
+                    max_bitrate: Optional[int] = None) -> bool:
+        """
+        在线修改目标码率 / 帧率 / 码率上限
 
-    def encode(self, frame_bgr: np.ndarray, force_keyframe: bool = False) -> List[bytes]:
+        libavcodec 的 libx264 封装在每帧编码前比较 bit_rate，变化时调用
+        x264_encoder_reconfig。打开时 maxrate = bitrate（CBR），x264 在线修改时
+        保持 CBR：VBV 码率随新码率一起更新，平均码率目标仍为打开时的码率，
+        因此只能在打开时的 VBV 码率之下在线生效（不重开、不插入 IDR、pts 连续）。
+        PyAV 不能在打开后修改 rc_max_rate / rc_buffer_size，VBV 缓冲区保持打开时大小，
+        码率降低后按帧计的缓冲略大。
+        超出打开时的 VBV 码率时按 max(max_bitrate, bitrate) 重开编码器并沿用 pts（下一帧为 IDR）。
+
+        Returns:
+            True 表示在线生效，False 表示重开了编码器
+        """
+        t0 = time.perf_counter()
+        with self._lock:
+            if bitrate is not None:
+                self.bitrate = int(bitrate)
+            if fps is not None:
+                self.fps = int(fps)
+            if max_bitrate is not None:
+                self.max_bitrate = int(max_bitrate)
+            effective = self._effective_bit_rate()
+            in_place = effective <= self._vbv_max_rate
+            if in_place:
+                self.codec_ctx.bit_rate = effective
+                self.reconfigures += 1
+            else:
+                self._open()
+                self.reopens += 1
+        self.last_reconfigure_ms = (time.perf_counter() - t0) * 1000.0
+        logger.debug(f"H264Encoder reconfigured: {self.bitrate // 1000}kbps @ {self.fps}fps "
+                     f"({'in-place' if in_place else 'reopened'}, {self.last_reconfigure_ms:.2f}ms)")
+        return in_place
+
+    def encode(self, frame_bgr: np.ndarray, force_keyframe: bool = False) -> List[memoryview]:
         """编码一帧 BGR，返回编码后的 packet 列表"""
+        t0, c0 = time.perf_counter(), time.thread_time()
         frame = av.VideoFrame.from_ndarray(frame_bgr, format='bgr24')
+        return self._encode_frame(frame, force_keyframe, t0, c0)
+
+    def encode_yuv(self, planes: Union[np.ndarray, Sequence[np.ndarray]],
+                   force_keyframe: bool = False) -> List[memoryview]:
+        """
+        编码一帧 YUV，写入复用的输入帧，无颜色转换
+
+        Args:
+            planes: 与 pix_fmt 一致的平面：yuv420p 为 (Y, U, V)，nv12 为 (Y, UV)；
+                    也可传紧凑数组 (height * 3/2, width)
+        """
+        t0, c0 = time.perf_counter(), time.thread_time()
+        if isinstance(planes, np.ndarray):
+            split = split_i420 if self.pix_fmt == 'yuv420p' else split_nv12
+            planes = split(planes, self.width, self.height)
+        frame = self._input_frame
+        if frame is None:
+            frame = self._input_frame = av.VideoFrame(self.width, self.height, self.pix_fmt)
+            self._input_planes = self._plane_views(frame)
+        for view, src in zip(self._input_planes, planes):
+            np.copyto(view, src)
+        # 复用帧上一帧可能被标记为 I 帧，每帧重置
+        frame.pict_type = av.video.frame.PictureType.NONE
+        return self._encode_frame(frame, force_keyframe, t0, c0)
+
+    @staticmethod
+    def _plane_views(frame) -> List[np.ndarray]:
+        """
+        各 VideoPlane 的可写 numpy 视图（去掉行尾对齐填充）
+
+        plane.width 是采样点数；NV12 的 UV 平面每点交错 2 字节，
+        行字节宽按平面内分量数计算
+        """
+        views = []
+        for index, plane in enumerate(frame.planes):
+            components = sum(1 for c in frame.format.components if c.plane == index)
+            rows = plane.buffer_size // plane.line_size
+            view = np.frombuffer(plane, dtype=np.uint8).reshape(rows, plane.line_size)
+            views.append(view[:plane.height, :plane.width * components])
+        return views
+
+    def _encode_frame(self, frame, force_keyframe: bool, t0: float, c0: float) -> List[memoryview]:
         frame.pts = self.pts
         self.pts += 1
 
         if force_keyframe:
             frame.pict_type = av.video.frame.PictureType.I
 
-        packets = self.codec_ctx.encode(frame)
-        return [bytes(pkt) for pkt in packets]
+        # libx264 在 encode 调用内复制输入画面，返回后复用帧可立即写入下一帧
+        with self._lock:
+            packets = self.codec_ctx.encode(frame)
+            self.last_reopened = self._reopened and bool(packets)
+            if packets:
+                self._reopened = False
+        self.last_encode_ms = (time.perf_counter() - t0) * 1000.0
+        self.last_encode_cpu_ms = (time.thread_time() - c0) * 1000.0
+        return [memoryview(pkt) for pkt in packets]
 
-    def flush(self) -> List[bytes]:
+    def flush(self) -> List[memoryview]:
         """刷新编码器缓冲"""
-        packets = self.codec_ctx.encode()
-        return [bytes(pkt) for pkt in packets]
+        with self._lock:
+            packets = self.codec_ctx.encode()
+        return [memoryview(pkt) for pkt in packets]
 
     def close(self):
         if self.codec_ctx:
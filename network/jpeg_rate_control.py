@@ -0,0 +1,99 @@
+"""JPEG 码控 - 按场景拟合 帧大小-质量 模型，一步预测达到目标帧大小的质量"""
+
+import math
+from collections import deque
+from typing import Optional
+
+# 判定场景切换时，每质量级额外容许的 ln(size) 偏差（斜率估计误差）
+SLOPE_UNCERTAINTY = 0.015
+
+
+class JpegRateController:
+    """
+    基于模型的 JPEG 质量控制
+
+    同一场景内帧大小与质量近似对数线性：ln(size) = a + b × quality
+
+    - 截距 a：每帧由实际大小更新（EMA）；预测误差超过 scene_cut（质量偏离上次观测越远，
+      允许的斜率误差越大）时判定场景切换，截距直接取本帧观测值、斜率回到先验并清空拟合窗口，
+      下一帧即按新场景求解
+    - 斜率 b：窗口内 (quality, ln size) 最小二乘拟合；质量跨度不足时沿用上次拟合值
+      （初始为先验），避免在拟合值与先验之间来回跳变
+    - 下一帧质量 = (ln target - a) / b，一步到位，限制在 [quality_min, quality_max]
+    """
+
+    def __init__(self, target_frame_bytes: int, quality: int,
+                 quality_min: int = 15, quality_max: int = 85,
+                 slope: float = 0.025, window: int = 30,
+                 scene_cut: float = 0.35, alpha: float = 0.4):
+        """
+        Args:
+            target_frame_bytes: 目标每帧字节数
+            quality: 初始质量
+            slope: 斜率先验（每质量级 ln(size) 的变化量）
+            window: 斜率拟合窗口（帧）
+            scene_cut: 判定场景切换的 |ln(实际 / 预测)| 阈值（同一质量下）
+            alpha: 截距 EMA 系数
+        """
+        self.target_frame_bytes = max(1, target_frame_bytes)
+        self.quality = quality
+        self.quality_min = quality_min
+        self.quality_max = quality_max
+        self.prior_slope = slope
+        self.slope = slope
+        self.scene_cut = scene_cut
+        self.alpha = alpha
+
+        self._intercept: Optional[float] = None
+        self._last_quality: Optional[int] = None
+        self._samples: deque = deque(maxlen=window)   # [(quality, ln size)]
+        self.scene_cuts = 0
+
+    def set_target(self, target_frame_bytes: int):
+        self.target_frame_bytes = max(1, target_frame_bytes)
+
+    def predict_size(self, quality: int) -> Optional[float]:
+        """按当前模型预测 quality 下的帧大小，尚无观测时返回 None"""
+        if self._intercept is None:
+            return None
+        return math.exp(self._intercept + self.slope * quality)
+
+    def update(self, quality: int, size: int) -> int:
+        """加入一帧（编码质量, 实际字节数），返回下一帧应使用的质量"""
+        log_size = math.log(max(1, size))
+        if self._intercept is not None:
+            error = log_size - (self._intercept + self.slope * quality)
+            # 质量跨度越大，斜率误差造成的预测偏差越大，不应误判为场景切换
+            tolerance = self.scene_cut + SLOPE_UNCERTAINTY * abs(quality - self._last_quality)
+            if abs(error) > tolerance:
+                self._samples.clear()
+                self._intercept = None
+                self.slope = self.prior_slope
+                self.scene_cuts += 1
+        self._last_quality = quality
+        self._samples.append((quality, log_size))
+        self._fit_slope()
+
+        observed = log_size - self.slope * quality
+        if self._intercept is None:
+            self._intercept = observed
+        else:
+            self._intercept += self.alpha * (observed - self._intercept)
+
+        target = (math.log(self.target_frame_bytes) - self._intercept) / self.slope
+        self.quality = int(min(self.quality_max, max(self.quality_min, math.floor(target))))
+        return self.quality
+
+    def _fit_slope(self):
+        """窗口内最小二乘斜率；质量跨度不足（无法区分内容变化与质量影响）时保持不变"""
+        n = len(self._samples)
+        if n < 5:
+            return
+        mean_q = sum(q for q, _ in self._samples) / n
+        mean_s = sum(s for _, s in self._samples) / n
+        var_q = sum((q - mean_q) ** 2 for q, _ in self._samples)
+        if var_q < 9.0 * n:
+            return
+        cov = sum((q - mean_q) * (s - mean_s) for q, s in self._samples)
+        # 限制在合理范围内，避免噪声导致的极端外推
+        self.slope = min(0.08, max(0.01, cov / var_q))
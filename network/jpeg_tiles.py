@@ -0,0 +1,164 @@
+"""条带化 JPEG - 画面按水平条带独立编码 / 并行解码，丢失的条带只影响局部画面"""
+
+import struct
+from concurrent.futures import Executor
+from typing import Dict, List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+# 条带记录头: [stripes:1][index:1][frame_height:2][y:2][height:2][length:4]，其后为该条带的 JPEG
+# stripes 在首字节且 >= 1，FEC 恢复出的分片末尾补零可据此跳过
+TILE_HEADER = struct.Struct('=BBHHHI')
+# 条带边界对齐（4:2:0 JPEG 的 MCU 高度），避免接缝处色度错位
+STRIPE_ALIGN = 16
+MAX_STRIPES = 64
+
+_JPEG_SOI = b'\xff\xd8'
+
+
+def stripe_bounds(height: int, stripes: int) -> List[Tuple[int, int]]:
+    """把 height 行均分为 stripes 个条带 [(y0, y1)]，边界对齐到 STRIPE_ALIGN"""
+    stripes = max(1, min(stripes, MAX_STRIPES, height // STRIPE_ALIGN or 1))
+    edges = [0]
+    for i in range(1, stripes):
+        y = round(height * i / stripes / STRIPE_ALIGN) * STRIPE_ALIGN
+        if edges[-1] < y < height:
+            edges.append(y)
+    edges.append(height)
+    return list(zip(edges, edges[1:]))
+
+
+def encode_tiles(frame: np.ndarray, stripes: int, quality: int,
+                 executor: Optional[Executor] = None) -> bytes:
+    """
+    条带化编码一帧 BGR，返回按条带顺序拼接的记录
+
+    cv2.imencode 执行期间释放 GIL，传入线程池时各条带并行编码。
+    """
+    bounds = stripe_bounds(frame.shape[0], stripes)
+    params = [cv2.IMWRITE_JPEG_QUALITY, quality]
+
+    def encode(bound):
+        y0, y1 = bound
+        ok, jpeg = cv2.imencode('.jpg', frame[y0:y1], params)
+        if not ok:
+            raise ValueError(f"JPEG encode failed for stripe {y0}-{y1}")
+        return jpeg
+
+    jpegs = list(executor.map(encode, bounds)) if executor else [encode(b) for b in bounds]
+    count = len(bounds)
+    parts = []
+    for index, ((y0, y1), jpeg) in enumerate(zip(bounds, jpegs)):
+        parts.append(TILE_HEADER.pack(count, index, frame.shape[0], y0, y1 - y0, len(jpeg)))
+        parts.append(jpeg.tobytes())
+    return b"".join(parts)
+
+
+def packetize_tiles(data: bytes, max_size: int) -> List[bytes]:
+    """
+    按条带记录切分帧数据
+
+    每个条带单独成为一个分片（丢一个分片只损失一个条带）；超过 max_size 的
+    条带拆成多个分片，后续分片不以记录头开头。分片按顺序拼接即还原原始数据。
+    """
+    chunks = []
+    pos = 0
+    while pos < len(data):
+        length = TILE_HEADER.unpack_from(data, pos)[5]
+        end = pos + TILE_HEADER.size + length
+        for off in range(pos, end, max_size):
+            chunks.append(data[off:min(off + max_size, end)])
+        pos = end
+    return chunks
+
+
+def _valid_header(data: bytes, pos: int) -> Optional[tuple]:
+    if len(data) - pos < TILE_HEADER.size + 2:
+        return None
+    header = TILE_HEADER.unpack_from(data, pos)
+    stripes, index, frame_height, y, height, _ = header
+    if not (1 <= stripes <= MAX_STRIPES and index < stripes and height > 0
+            and y + height <= frame_height):
+        return None
+    if data[pos + TILE_HEADER.size:pos + TILE_HEADER.size + 2] != _JPEG_SOI:
+        return None
+    return header
+
+
+def parse_tiles(data: bytes) -> List[tuple]:
+    """
+    解析条带记录，返回 [(index, stripes, frame_height, y, height, jpeg)]
+
+    跳过记录之间的补零（FEC 恢复的分片），遇到无效或截断的记录即停止。
+    """
+    records = []
+    pos = 0
+    while pos < len(data):
+        if data[pos] == 0:
+            pos += 1
+            continue
+        header = _valid_header(data, pos)
+        if header is None:
+            break
+        stripes, index, frame_height, y, height, length = header
+        start = pos + TILE_HEADER.size
+        if start + length > len(data):
+            break
+        records.append((index, stripes, frame_height, y, height, data[start:start + length]))
+        pos = start + length
+    return records
+
+
+def assemble_partial_tiles(received: Dict[int, bytes], n_data: int) -> bytes:
+    """
+    不完整帧：拼接所有分片都已到达的条带记录
+
+    以记录头开头的分片开始一个条带，条带的后续分片须连续到达，中间缺失则放弃该条带。
+    """
+    parts = []
+    current = bytearray()
+    need = 0
+    for idx in range(n_data):
+        chunk = received.get(idx)
+        if chunk is None:
+            current, need = bytearray(), 0
+            continue
+        if need == 0:
+            header = _valid_header(chunk, 0)
+            if header is None:
+                continue  # 缺失首分片的条带的后续部分
+            current = bytearray()
+            need = TILE_HEADER.size + header[5]
+        current += chunk
+        if len(current) >= need:
+            parts.append(bytes(current[:need]))
+            current, need = bytearray(), 0
+    return b"".join(parts)
+
+
+def decode_tiles(records: List[tuple], canvas: Optional[np.ndarray],
+                 executor: Optional[Executor] = None) -> Optional[np.ndarray]:
+    """
+    并行解码条带并合成到 canvas（就地更新，未到达的条带保留上一帧内容）
+
+    canvas 为 None 或尺寸不符时新建（黑底）。返回合成后的画面，全部解码失败时返回 None。
+    """
+    if not records:
+        return None
+
+    def decode(record):
+        return cv2.imdecode(np.frombuffer(record[5], dtype=np.uint8), cv2.IMREAD_COLOR)
+
+    images = list(executor.map(decode, records)) if executor else [decode(r) for r in records]
+    decoded = [(record, image) for record, image in zip(records, images) if image is not None]
+    if not decoded:
+        return None
+    frame_height = decoded[0][0][2]
+    width = decoded[0][1].shape[1]
+    if canvas is None or canvas.shape[:2] != (frame_height, width):
+        canvas = np.zeros((frame_height, width, 3), dtype=np.uint8)
+    for (_, _, _, y, height, _), image in decoded:
+        if image.shape[1] == width and y + image.shape[0] <= frame_height:
+            canvas[y:y + image.shape[0]] = image
+    return canvas
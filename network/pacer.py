@@ -0,0 +1,161 @@
+"""视频发送节拍器 - 令牌桶平滑发送，NACK 重传优先"""
+
+import threading
+import time
+from collections import deque
+from typing import Callable, Tuple
+
+
+class PacketPacer:
+    """
+    令牌桶发送节拍器
+
+    位于分片与 socket 之间，避免 I 帧的全部分片背靠背写入链路：
+
+    - 基础速率 = 目标码率 × pacing_factor（留出余量，正常帧不会被拖慢）
+    - 每帧分片需在 spread_fraction × 帧间隔 内发完：入队时设定清空期限，
+      积压超过基础速率所能消化的量时按"剩余积压 / 剩余时间"临时提速，
+      因此排队时延有上界，不会无限堆积
+    - NACK 重传走独立的高优先级队列，先于普通分片发送，同样消耗令牌
+    - 令牌允许透支一个包：包长可大于桶容量（60KB 分片），发送后令牌为负，
+      需等待补足后再发下一个
+    """
+
+    def __init__(self, send_fn: Callable[[bytes, Tuple[str, int]], None],
+                 target_bitrate_kbps: int, fps: int,
+                 spread_fraction: float = 0.5, pacing_factor: float = 1.5,
+                 burst_ms: float = 5.0):
+        """
+        Args:
+            send_fn: 实际发送函数 send_fn(packet, addr)
+            target_bitrate_kbps: 视频目标码率
+            fps: 帧率（决定帧间隔）
+            spread_fraction: 每帧分片摊开的帧间隔比例 (0, 1]
+            pacing_factor: 基础发送速率相对目标码率的倍数
+            burst_ms: 令牌桶容量（按基础速率折算的毫秒数）
+        """
+        self._send_fn = send_fn
+        self.spread_fraction = spread_fraction
+        self.pacing_factor = pacing_factor
+        self.burst_ms = burst_ms
+        self._base_rate = 0.0        # 字节/秒
+        self._frame_interval = 0.0   # 秒
+        self.configure(target_bitrate_kbps, fps)
+
+        self._media: deque = deque()         # [(packet, addr)]
+        self._retransmit: deque = deque()
+        self._media_bytes = 0
+        self._drain_deadline = 0.0           # 当前积压应发完的时刻
+        self._cond = threading.Condition()
+        self._tokens = 0.0
+        self._last_refill = time.perf_counter()
+        self._running = False
+        self._thread = None
+
+        # 统计
+        self.packets_sent = 0
+        self.bytes_sent = 0
+        self.retransmits_sent = 0
+        self.send_errors = 0
+        self.max_queue_bytes = 0
+
+    def configure(self, target_bitrate_kbps: int, fps: int):
+        """更新目标码率 / 帧率（运行中可调用）"""
+        self._base_rate = target_bitrate_kbps * 1000 / 8 * self.pacing_factor
+        self._frame_interval = 1.0 / max(1, fps)
+
+    def start(self):
+        self._running = True
+        self._last_refill = time.perf_counter()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        with self._cond:
+            self._running = False
+            self._cond.notify_all()
+        if self._thread:
+            self._thread.join(timeout=1.0)
+
+    def enqueue_frame(self, packets, addr: Tuple[str, int]):
+        """加入一帧的全部分片（普通优先级）"""
+        with self._cond:
+            for pkt in packets:
+                self._media.append((pkt, addr))
+                self._media_bytes += len(pkt)
+            if self._media_bytes > self.max_queue_bytes:
+                self.max_queue_bytes = self._media_bytes
+            self._drain_deadline = time.perf_counter() + self._frame_interval * self.spread_fraction
+            self._cond.notify()
+
+    def enqueue_retransmit(self, packets, addr: Tuple[str, int]):
+        """加入 NACK 重传分片（高优先级）"""
+        with self._cond:
+            for pkt in packets:
+                self._retransmit.append((pkt, addr))
+            self._cond.notify()
+
+    def flush(self):
+        """丢弃所有待发分片（客户端断开时）"""
+        with self._cond:
+            self._media.clear()
+            self._retransmit.clear()
+            self._media_bytes = 0
+
+    @property
+    def queued_bytes(self) -> int:
+        return self._media_bytes
+
+    def _current_rate(self, now: float = None) -> float:
+        """当前发送速率：基础速率与"在期限前清空积压"所需速率取大"""
+        if now is None:
+            now = time.perf_counter()
+        # 期限已过时按 1ms 计，尽快发完
+        remaining = max(0.001, self._drain_deadline - now)
+        return max(self._base_rate, self._media_bytes / remaining)
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while self._running and not self._media and not self._retransmit:
+                    self._cond.wait(0.1)
+                if not self._running:
+                    return
+
+                now = time.perf_counter()
+                rate = self._current_rate(now)
+                capacity = rate * self.burst_ms / 1000.0
+                self._tokens = min(capacity, self._tokens + (now - self._last_refill) * rate)
+                self._last_refill = now
+
+                if self._tokens < 0:
+                    # 令牌不足，等待补足（期间到达的重传会在下一轮优先发出）
+                    self._cond.wait(-self._tokens / rate)
+                    continue
+
+                if self._retransmit:
+                    pkt, addr = self._retransmit.popleft()
+                    is_retransmit = True
+                else:
+                    pkt, addr = self._media.popleft()
+                    self._media_bytes -= len(pkt)
+                    is_retransmit = False
+                self._tokens -= len(pkt)
+
+            try:
+                self._send_fn(pkt, addr)
+                self.packets_sent += 1
+                self.bytes_sent += len(pkt)
+                if is_retransmit:
+                    self.retransmits_sent += 1
+            except Exception:
+                self.send_errors += 1
+
+    def get_stats(self) -> dict:
+        return {
+            'pacer_packets_sent': self.packets_sent,
+            'pacer_retransmits_sent': self.retransmits_sent,
+            'pacer_queue_bytes': self._media_bytes,
+            'pacer_max_queue_bytes': self.max_queue_bytes,
+            'pacer_rate_kbps': self._current_rate() * 8 / 1000,
+        }
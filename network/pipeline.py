@@ -0,0 +1,81 @@
+"""视频流水线基础组件 - 有界阶段队列与阶段耗时统计"""
+
+import queue
+import threading
+from typing import Any, Optional
+
+
+class StageQueue:
+    """有界阶段队列
+
+    drop_oldest=True：队列满时丢弃最旧项，适合尚未编码的原始帧（只关心最新画面）；
+    drop_oldest=False：put 阻塞形成背压，适合已编码的帧（丢弃会破坏 H.264 参考链）。
+    """
+
+    def __init__(self, maxsize: int = 2, drop_oldest: bool = False):
+        self._q: queue.Queue = queue.Queue(maxsize=maxsize)
+        self.drop_oldest = drop_oldest
+        self.dropped = 0
+
+    def put(self, item: Any, timeout: float = 0.1) -> bool:
+        """放入一项，背压模式下超时返回 False（调用方可据此检查是否仍在运行）"""
+        if not self.drop_oldest:
+            try:
+                self._q.put(item, timeout=timeout)
+                return True
+            except queue.Full:
+                return False
+        while True:
+            try:
+                self._q.put_nowait(item)
+                return True
+            except queue.Full:
+                try:
+                    self._q.get_nowait()
+                    self.dropped += 1
+                except queue.Empty:
+                    pass
+
+    def get(self, timeout: float = 0.1) -> Optional[Any]:
+        """取出一项，超时返回 None"""
+        try:
+            return self._q.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def qsize(self) -> int:
+        return self._q.qsize()
+
+
+class StageStats:
+    """阶段耗时统计（线程安全），按统计窗口输出平均/最大耗时"""
+
+    def __init__(self, name: str):
+        self.name = name
+        self._lock = threading.Lock()
+        self._count = 0
+        self._total_ms = 0.0
+        self._max_ms = 0.0
+        self.last_ms = 0.0
+
+    def record(self, ms: float):
+        with self._lock:
+            self._count += 1
+            self._total_ms += ms
+            if ms > self._max_ms:
+                self._max_ms = ms
+            self.last_ms = ms
+
+    def snapshot(self, reset: bool = True) -> dict:
+        """返回 {count, avg_ms, max_ms}，默认同时开始新的统计窗口"""
+        with self._lock:
+            result = {
+                "count": self._count,
+                "avg_ms": self._total_ms / self._count if self._count else 0.0,
+                "max_ms": self._max_ms,
+            }
+            if reset:
+                self._count = 0
+                self._total_ms = 0.0
+                self._max_ms = 0.0
+            return result
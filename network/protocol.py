@@ -21,15 +21,45 @@ MSG_TYPE_HEARTBEAT = 0x04
 MSG_TYPE_ACK = 0x05
 MSG_TYPE_VIDEO_ACK = 0x06
 MSG_TYPE_VIDEO_NACK = 0x07
+MSG_TYPE_VIDEO_FEEDBACK = 0x08
+MSG_TYPE_KEYFRAME_REQUEST = 0x09
+MSG_TYPE_LAYER_SELECT = 0x0A
+MSG_TYPE_LAYER_INFO = 0x0B
 
 
 KEYBOARD_STATE_SIZE = 10
 MOUSE_DATA_SIZE = 6  # int16 dx + int16 dy + uint8 buttons + int8 scroll
+MOUSE_DATA = struct.Struct('=hhBb')
+# 控制指令冗余：每个包最多携带的前序指令数（鼠标增量 + 按键状态）
+CONTROL_HISTORY_MAX = 8
+
+# 视频分片头（视频端口，无 Magic/CRC）
+# [frame_id:4][total:2][idx:2][size:4][fec_flag:1][orig_chunks:2][codec:1][encode_ms:4]
+# codec: 0 JPEG / 1 H.264 / 2 条带化 JPEG（见 network/jpeg_tiles.py）
+VIDEO_HEADER = struct.Struct('=IHHIBHBf')
+# 带时间戳追踪的分片头：追加机载端 perf_counter 时间（秒）
+# [...VIDEO_HEADER:20][capture_t:8][encode_done_t:8][first_send_t:8]
+VIDEO_HEADER_TRACE = struct.Struct('=IHHIBHBfddd')
+# first_send_t 由发送路径在首个分片实际发出时写入（各订阅端各自的发送时刻）
+VIDEO_TRACE_FIRST_SEND = struct.Struct('=d')
+VIDEO_TRACE_FIRST_SEND_OFFSET = VIDEO_HEADER_TRACE.size - VIDEO_TRACE_FIRST_SEND.size
+
+# 传输层反馈：每个到达分片一条记录 [frame_id:4][chunk_idx:2][arrival_delta_us:4]
+VIDEO_FEEDBACK_ENTRY = struct.Struct('=IHI')
+VIDEO_FEEDBACK_MAX_ENTRIES = 100
+
+# 多分辨率层（simulcast）描述：[width:2][height:2][bitrate_kbps:4]
+LAYER_INFO_ENTRY = struct.Struct('=HHI')
+
+# 通用消息头 / CRC 尾 / ACK（头 + t2 + t3）预编译，控制面热路径单次 pack
+MSG_HEADER = struct.Struct('=HBBBI')
+MSG_CRC = struct.Struct('=I')
+ACK_BODY = struct.Struct('=HBBBIdd')
 
 
 @dataclass
 class ControlCommand:
-    """控制指令 — 10 字节键盘位图 + 6 字节鼠标数据"""
+    """控制指令 — 10 字节键盘位图 + 6 字节鼠标数据（+ 可选的前序指令冗余）"""
     seq: int
     t1: float
     keyboard_state: bytes = b'\x00' * KEYBOARD_STATE_SIZE
@@ -37,6 +67,8 @@ class ControlCommand:
     mouse_dy: int = 0
     mouse_buttons: int = 0
     scroll_delta: int = 0
+    # 前序指令的鼠标数据 [(dx, dy, buttons, scroll)]，history[i] 对应 seq - 1 - i
+    history: tuple = ()
 
     def to_bytes(self) -> bytes:
         return bytes(self.keyboard_state[:KEYBOARD_STATE_SIZE]).ljust(KEYBOARD_STATE_SIZE, b'\x00')
@@ -45,12 +77,19 @@ class ControlCommand:
     def from_bytes(data: bytes) -> 'ControlCommand':
         kb = data[:KEYBOARD_STATE_SIZE] if len(data) >= KEYBOARD_STATE_SIZE else data.ljust(KEYBOARD_STATE_SIZE, b'\x00')
         mouse_dx = mouse_dy = mouse_buttons = scroll_delta = 0
-        if len(data) >= KEYBOARD_STATE_SIZE + MOUSE_DATA_SIZE:
-            mouse_dx, mouse_dy, mouse_buttons, scroll_delta = struct.unpack(
-                '=hhBb', data[KEYBOARD_STATE_SIZE:KEYBOARD_STATE_SIZE + MOUSE_DATA_SIZE])
+        history = ()
+        base = KEYBOARD_STATE_SIZE + MOUSE_DATA_SIZE
+        if len(data) >= base:
+            mouse_dx, mouse_dy, mouse_buttons, scroll_delta = MOUSE_DATA.unpack_from(
+                data, KEYBOARD_STATE_SIZE)
+        if len(data) > base:
+            count = min(data[base], (len(data) - base - 1) // MOUSE_DATA_SIZE)
+            history = tuple(MOUSE_DATA.unpack_from(data, base + 1 + i * MOUSE_DATA_SIZE)
+                            for i in range(count))
         return ControlCommand(seq=0, t1=0.0, keyboard_state=kb,
                               mouse_dx=mouse_dx, mouse_dy=mouse_dy,
-                              mouse_buttons=mouse_buttons, scroll_delta=scroll_delta)
+                              mouse_buttons=mouse_buttons, scroll_delta=scroll_delta,
+                              history=history)
 
 
 @dataclass
@@ -74,17 +113,17 @@ class Protocol:
 
     @staticmethod
     def _build_header(msg_type: int, seq: int) -> bytes:
-        return struct.pack('=HBBBI', MAGIC, VERSION, msg_type, 0, seq)
+        return MSG_HEADER.pack(MAGIC, VERSION, msg_type, 0, seq)
 
     @staticmethod
     def _seal(data: bytes) -> bytes:
         """追加 CRC32 校验尾"""
-        return data + struct.pack('=I', zlib.crc32(data) & 0xffffffff)
+        return data + MSG_CRC.pack(zlib.crc32(data) & 0xffffffff)
 
     @staticmethod
     def _verify_crc(data: bytes) -> None:
-        crc_recv = struct.unpack('=I', data[-4:])[0]
-        crc_calc = zlib.crc32(data[:-4]) & 0xffffffff
+        crc_recv = MSG_CRC.unpack_from(data, len(data) - 4)[0]
+        crc_calc = zlib.crc32(memoryview(data)[:-4]) & 0xffffffff
         if crc_recv != crc_calc:
             raise ValueError(f"CRC 校验失败: {hex(crc_recv)} != {hex(crc_calc)}")
 
@@ -93,7 +132,7 @@ class Protocol:
         """解析并验证消息头，返回 (msg_type, seq)"""
         if len(data) < min_len:
             raise ValueError(f"消息太短: {len(data)} bytes")
-        magic, version, msg_type, _, seq = struct.unpack('=HBBBI', data[:9])
+        magic, version, msg_type, _, seq = MSG_HEADER.unpack_from(data)
         if magic != MAGIC:
             raise ValueError(f"Magic 错误: {hex(magic)}")
         if version != VERSION:
@@ -103,6 +142,14 @@ class Protocol:
         Protocol._verify_crc(data)
         return msg_type, seq
 
+    @staticmethod
+    def _pack_mouse(dx: int, dy: int, buttons: int, scroll: int) -> bytes:
+        """鼠标数据（超出范围的值截断）"""
+        return MOUSE_DATA.pack(max(-32768, min(32767, dx)),
+                               max(-32768, min(32767, dy)),
+                               buttons & 0xFF,
+                               max(-128, min(127, scroll)))
+
     # -------------------------------------------------------------------------
     # 构建方法
     # -------------------------------------------------------------------------
@@ -116,16 +163,18 @@ class Protocol:
         mouse_dy: int = 0,
         mouse_buttons: int = 0,
         scroll_delta: int = 0,
+        history: tuple = (),
     ) -> bytes:
-        """构建控制指令消息（37 字节）
-        格式：[Header:9][t1:8][KeyboardState:10][MouseDX:2][MouseDY:2][MouseButtons:1][ScrollDelta:1][CRC32:4]
+        """构建控制指令消息（37 字节，带冗余时 38 + 6N 字节）
+        格式：[Header:9][t1:8][KeyboardState:10][MouseDX:2][MouseDY:2][MouseButtons:1][ScrollDelta:1]
+              [HistoryCount:1][History:6*N]（可选）[CRC32:4]
+        history: 前序 N 条指令的 (dx, dy, buttons, scroll)，最近的在前，供接收端补齐丢失的包
         """
         kb = bytes(keyboard_state[:KEYBOARD_STATE_SIZE]).ljust(KEYBOARD_STATE_SIZE, b'\x00')
-        mouse = struct.pack('=hhBb',
-                            max(-32768, min(32767, mouse_dx)),
-                            max(-32768, min(32767, mouse_dy)),
-                            mouse_buttons & 0xFF,
-                            max(-128, min(127, scroll_delta)))
+        mouse = Protocol._pack_mouse(mouse_dx, mouse_dy, mouse_buttons, scroll_delta)
+        if history:
+            history = history[:CONTROL_HISTORY_MAX]
+            mouse += bytes((len(history),)) + b''.join(Protocol._pack_mouse(*entry) for entry in history)
         return Protocol._seal(
             Protocol._build_header(MSG_TYPE_CONTROL_COMMAND, seq) + struct.pack('=d', t1) + kb + mouse
         )
@@ -135,9 +184,7 @@ class Protocol:
         """构建 ACK 消息
         格式：[Header:9][t2:8][t3:8][CRC32:4]
         """
-        return Protocol._seal(
-            Protocol._build_header(MSG_TYPE_ACK, seq) + struct.pack('=dd', t2, t3)
-        )
+        return Protocol._seal(ACK_BODY.pack(MAGIC, VERSION, MSG_TYPE_ACK, 0, seq, t2, t3))
 
     @staticmethod
     def build_heartbeat(seq: int, t1: float) -> bytes:
@@ -165,6 +212,50 @@ class Protocol:
             chunks += struct.pack('=H', idx)
         return Protocol._seal(Protocol._build_header(MSG_TYPE_VIDEO_NACK, frame_id) + chunks)
 
+    @staticmethod
+    def build_video_feedback(seq: int, report_t: float, arrivals: list) -> bytes:
+        """构建传输层反馈（地面端到达时间，供机载端拥塞控制）
+        格式：[Header:9][report_t:8][base_t:8][Count:2][Entry:10*N][CRC32:4]
+        Entry：[frame_id:4][chunk_idx:2][arrival_delta_us:4]，到达时间 = base_t + delta
+        arrivals: [(frame_id, chunk_idx, arrival_t)]，按到达顺序，最多 VIDEO_FEEDBACK_MAX_ENTRIES 条
+        """
+        arrivals = arrivals[:VIDEO_FEEDBACK_MAX_ENTRIES]
+        base_t = arrivals[0][2] if arrivals else report_t
+        body = struct.pack('=ddH', report_t, base_t, len(arrivals))
+        body += b''.join(
+            VIDEO_FEEDBACK_ENTRY.pack(frame_id, chunk_idx,
+                                      min(0xFFFFFFFF, max(0, int(round((t - base_t) * 1_000_000)))))
+            for frame_id, chunk_idx, t in arrivals)
+        return Protocol._seal(Protocol._build_header(MSG_TYPE_VIDEO_FEEDBACK, seq) + body)
+
+    @staticmethod
+    def build_keyframe_request(seq: int, last_frame_id: int) -> bytes:
+        """构建关键帧请求（PLI）
+        格式：[Header:9][LastFrameId:4][CRC32:4]，LastFrameId 为最后一个完整解码的帧
+        """
+        return Protocol._seal(
+            Protocol._build_header(MSG_TYPE_KEYFRAME_REQUEST, seq) + struct.pack('=I', last_frame_id)
+        )
+
+    @staticmethod
+    def build_layer_select(seq: int, layer: int) -> bytes:
+        """构建层选择消息（地面端 → 机载端，视频端口）
+        格式：[Header:9][Layer:1][CRC32:4]，Layer 0 为最高分辨率
+        """
+        return Protocol._seal(
+            Protocol._build_header(MSG_TYPE_LAYER_SELECT, seq) + struct.pack('=B', layer)
+        )
+
+    @staticmethod
+    def build_layer_info(seq: int, current: int, layers: list) -> bytes:
+        """构建层信息消息（机载端 → 地面端，视频端口）
+        格式：[Header:9][Current:1][Count:1][Entry:8*N][CRC32:4]
+        layers: [(width, height, bitrate_kbps)]，按分辨率从高到低
+        """
+        body = struct.pack('=BB', current, len(layers))
+        body += b''.join(LAYER_INFO_ENTRY.pack(w, h, int(kbps)) for w, h, kbps in layers)
+        return Protocol._seal(Protocol._build_header(MSG_TYPE_LAYER_INFO, seq) + body)
+
     @staticmethod
     def build_param_update(seq: int, t1: float, params: dict) -> bytes:
         """构建参数修改消息（payload 为 JSON）"""
@@ -188,7 +279,7 @@ class Protocol:
     def parse_message(data: bytes) -> Tuple[int, int, float, Optional[bytes]]:
         """解析通用消息，返回 (msg_type, seq, t1, payload)"""
         msg_type, seq = Protocol._parse_header(data, min_len=18)
-        t1 = struct.unpack('=d', data[9:17])[0]
+        t1 = struct.unpack_from('=d', data, 9)[0]
         payload = data[17:-4] if len(data) > 21 else None
         return msg_type, seq, t1, payload
 
@@ -219,3 +310,41 @@ class Protocol:
         num_chunks = struct.unpack('=H', data[9:11])[0]
         missing = [struct.unpack('=H', data[11 + i * 2: 13 + i * 2])[0] for i in range(num_chunks)]
         return frame_id, missing
+
+    @staticmethod
+    def parse_video_feedback(data: bytes) -> tuple:
+        """解析传输层反馈，返回 (seq, report_t, [(frame_id, chunk_idx, arrival_t)])"""
+        _, seq = Protocol._parse_header(data, min_len=31, expected_type=MSG_TYPE_VIDEO_FEEDBACK)
+        report_t, base_t, count = struct.unpack('=ddH', data[9:27])
+        if len(data) < 31 + count * VIDEO_FEEDBACK_ENTRY.size:
+            raise ValueError(f"反馈条目不完整: {count}")
+        arrivals = []
+        for i in range(count):
+            frame_id, chunk_idx, delta_us = VIDEO_FEEDBACK_ENTRY.unpack_from(
+                data, 27 + i * VIDEO_FEEDBACK_ENTRY.size)
+            arrivals.append((frame_id, chunk_idx, base_t + delta_us / 1_000_000))
+        return seq, report_t, arrivals
+
+    @staticmethod
+    def parse_keyframe_request(data: bytes) -> Tuple[int, int]:
+        """解析关键帧请求，返回 (seq, last_frame_id)"""
+        _, seq = Protocol._parse_header(data, min_len=17, expected_type=MSG_TYPE_KEYFRAME_REQUEST)
+        last_frame_id = struct.unpack('=I', data[9:13])[0]
+        return seq, last_frame_id
+
+    @staticmethod
+    def parse_layer_select(data: bytes) -> Tuple[int, int]:
+        """解析层选择消息，返回 (seq, layer)"""
+        _, seq = Protocol._parse_header(data, min_len=14, expected_type=MSG_TYPE_LAYER_SELECT)
+        return seq, data[9]
+
+    @staticmethod
+    def parse_layer_info(data: bytes) -> tuple:
+        """解析层信息消息，返回 (seq, current, [(width, height, bitrate_kbps)])"""
+        _, seq = Protocol._parse_header(data, min_len=15, expected_type=MSG_TYPE_LAYER_INFO)
+        current, count = struct.unpack('=BB', data[9:11])
+        if len(data) < 15 + count * LAYER_INFO_ENTRY.size:
+            raise ValueError(f"层信息条目不完整: {count}")
+        layers = [LAYER_INFO_ENTRY.unpack_from(data, 11 + i * LAYER_INFO_ENTRY.size)
+                  for i in range(count)]
+        return seq, current, layers
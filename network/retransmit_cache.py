@@ -0,0 +1,127 @@
+"""NACK 重传缓存 - 按 RTT 决定保留时长，按字节预算限制内存"""
+
+import threading
+import time
+from collections import deque
+from typing import Dict, Hashable, List, Optional
+
+
+class RetransmitCache:
+    """
+    已发送分片的环形缓存
+
+    - 按发送顺序追加到队尾，过期 / 超预算时从队头淘汰，每帧 O(1)
+    - 保留时长 = nack_window + rtt_factor × RTT，限制在 [min_retention, max_retention]：
+      NACK 最迟在接收端多次超时重试后到达，窗口之外的帧重传已无意义
+    - 总字节数不超过 max_bytes（最新一帧始终保留）
+    - 统计被 NACK 分片的命中 / 未命中，未命中说明保留时长或预算不足
+    """
+
+    def __init__(self, max_bytes: int = 4 * 1024 * 1024,
+                 nack_window: float = 0.15, rtt_factor: float = 4.0,
+                 min_retention: float = 0.15, max_retention: float = 1.0):
+        """
+        Args:
+            max_bytes: 字节预算
+            nack_window: 接收端发出全部 NACK 重试所需时间（秒）
+            rtt_factor: 保留时长中 RTT 的倍数
+            min_retention / max_retention: 保留时长上下限（秒）
+        """
+        self.max_bytes = max_bytes
+        self.nack_window = nack_window
+        self.rtt_factor = rtt_factor
+        self.min_retention = min_retention
+        self.max_retention = max_retention
+        self.retention = min_retention
+
+        self._lock = threading.Lock()
+        self._order: deque = deque()                    # [(key, sent_t, nbytes)]
+        self._frames: Dict[Hashable, List[bytes]] = {}  # {key: [packet by chunk_idx]}
+        self._bytes = 0
+
+        # 统计
+        self.hits = 0
+        self.misses = 0
+        self.evicted_expired = 0
+        self.evicted_budget = 0
+
+    def set_rtt(self, rtt: Optional[float]):
+        """根据 RTT 估计（秒）更新保留时长"""
+        retention = self.nack_window + self.rtt_factor * (rtt or 0.0)
+        self.retention = min(self.max_retention, max(self.min_retention, retention))
+
+    def put(self, key: Hashable, packets: List[bytes], now: Optional[float] = None):
+        """缓存一帧已发送的分片（key 通常为 frame_id 或 (layer, frame_id)）"""
+        if now is None:
+            now = time.perf_counter()
+        nbytes = sum(len(pkt) for pkt in packets)
+        with self._lock:
+            if key in self._frames:
+                return
+            self._frames[key] = packets
+            self._order.append((key, now, nbytes))
+            self._bytes += nbytes
+            self._evict(now)
+
+    def get(self, key: Hashable, chunk_indices: List[int]) -> List[bytes]:
+        """取出被 NACK 的分片，缺失（已淘汰或索引越界）的计入未命中"""
+        with self._lock:
+            packets = self._frames.get(key)
+            if packets is None:
+                self.misses += len(chunk_indices)
+                return []
+            found = [packets[idx] for idx in chunk_indices if idx < len(packets)]
+            self.hits += len(found)
+            self.misses += len(chunk_indices) - len(found)
+            return found
+
+    def _evict(self, now: float):
+        """淘汰过期帧，再按预算淘汰最旧帧（在锁内调用）"""
+        cutoff = now - self.retention
+        while len(self._order) > 1:
+            key, sent_t, nbytes = self._order[0]
+            if sent_t < cutoff:
+                self.evicted_expired += 1
+            elif self._bytes > self.max_bytes:
+                self.evicted_budget += 1
+            else:
+                break
+            self._order.popleft()
+            del self._frames[key]
+            self._bytes -= nbytes
+
+    def clear(self):
+        with self._lock:
+            self._order.clear()
+            self._frames.clear()
+            self._bytes = 0
+
+    def __len__(self) -> int:
+        return len(self._frames)
+
+    @property
+    def queued_bytes(self) -> int:
+        return self._bytes
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 1.0
+
+    def get_stats(self) -> dict:
+        return {
+            'rtx_cache_frames': len(self._frames),
+            'rtx_cache_bytes': self._bytes,
+            'rtx_cache_retention_ms': self.retention * 1000.0,
+            'rtx_cache_hits': self.hits,
+            'rtx_cache_misses': self.misses,
+            'rtx_cache_hit_rate': self.hit_rate,
+            'rtx_cache_evicted_expired': self.evicted_expired,
+            'rtx_cache_evicted_budget': self.evicted_budget,
+        }
+
+    def summary(self) -> str:
+        return (f"{len(self._frames)} frames / {self._bytes // 1024} KB "
+                f"(retention {self.retention * 1000:.0f}ms) "
+                f"hit={self.hits} miss={self.misses} ({self.hit_rate * 100:.1f}%) "
+                f"evicted={self.evicted_expired} expired / {self.evicted_budget} budget")
@@ -0,0 +1,56 @@
+"""内核接收时间戳（SO_TIMESTAMPNS）- 包到达网卡协议栈的时刻，换算到 perf_counter 时间轴"""
+
+import logging
+import socket
+import struct
+import sys
+import time
+from typing import Tuple
+
+logger = logging.getLogger(__name__)
+
+# Linux: SO_TIMESTAMPNS == SCM_TIMESTAMPNS == 35（socket 模块未导出）
+SO_TIMESTAMPNS = getattr(socket, 'SO_TIMESTAMPNS', 35)
+RX_TIMESTAMP_AVAILABLE = sys.platform.startswith('linux') and hasattr(socket.socket, 'recvmsg')
+
+_TIMESPEC = struct.Struct('@ll')
+_ANCBUF_SIZE = socket.CMSG_SPACE(_TIMESPEC.size) if RX_TIMESTAMP_AVAILABLE else 0
+
+# 时间戳距当前时刻超出此范围视为无效（系统时钟被调整等），退回用户态时间
+MAX_TIMESTAMP_AGE = 1.0
+
+
+def enable_rx_timestamps(sock: socket.socket) -> bool:
+    """为 socket 开启内核接收时间戳，平台不支持时返回 False"""
+    if not RX_TIMESTAMP_AVAILABLE:
+        return False
+    try:
+        sock.setsockopt(socket.SOL_SOCKET, SO_TIMESTAMPNS, 1)
+        return True
+    except OSError as e:
+        logger.debug(f"SO_TIMESTAMPNS unavailable: {e}")
+        return False
+
+
+def recv_timestamped(sock: socket.socket, bufsize: int) -> Tuple[bytes, tuple, float, bool]:
+    """
+    接收一个数据报，返回 (data, addr, rx_time, from_kernel)
+
+    内核时间戳为 CLOCK_REALTIME，按 "当前 wall 时间 - 时间戳" 得到包在缓冲中停留的时长，
+    再从当前 perf_counter 中减去，得到与 t1/t3 同一时间轴的到达时刻。未开启时间戳或
+    不支持 recvmsg 的平台，rx_time 为 recv 返回后的 perf_counter。
+    """
+    if not RX_TIMESTAMP_AVAILABLE:
+        data, addr = sock.recvfrom(bufsize)
+        return data, addr, time.perf_counter(), False
+
+    data, ancdata, _, addr = sock.recvmsg(bufsize, _ANCBUF_SIZE)
+    now = time.perf_counter()
+    wall_ns = time.time_ns()
+    for level, kind, cdata in ancdata:
+        if level == socket.SOL_SOCKET and kind == SO_TIMESTAMPNS and len(cdata) >= _TIMESPEC.size:
+            sec, nsec = _TIMESPEC.unpack_from(cdata)
+            age = (wall_ns - (sec * 1_000_000_000 + nsec)) / 1e9
+            if -0.001 <= age < MAX_TIMESTAMP_AGE:
+                return data, addr, now - max(0.0, age), True
+    return data, addr, now, False
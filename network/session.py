@@ -10,6 +10,7 @@ from network.service_discovery import ServiceDiscovery
 from network.video_process import VideoReceiverProcess
 from network.control_sender import ControlSender
 from network.heartbeat import HeartbeatManager
+from logic.frame_tracer import FrameLatencyTracer, FrameTrace
 
 
 logger = logging.getLogger(__name__)
@@ -38,6 +39,9 @@ class SessionManager:
         self.control_sender: Optional[ControlSender] = None
         self.heartbeat: Optional[HeartbeatManager] = None
 
+        # 端到端帧延迟追踪（跨时钟域阶段使用控制链路的时钟映射）
+        self.frame_tracer = FrameLatencyTracer(self._get_clock)
+
         # 服务器信息
         self.server_ip: str = ""
         self.control_port: int = 0
@@ -405,6 +409,15 @@ class SessionManager:
 
         logger.info("Disconnected")
 
+    def _get_clock(self):
+        """当前控制链路的时钟映射（未连接时为 None）"""
+        control_sender = self.control_sender
+        return control_sender.latency_calc.clock if control_sender else None
+
+    def record_frame_trace(self, trace: FrameTrace):
+        """记录已显示帧的完整追踪（由主循环在 flip 后调用）"""
+        self.frame_tracer.record(trace)
+
     def _set_state(self, new_state: SessionState):
         """设置状态"""
         if self.state != new_state:
@@ -423,18 +436,25 @@ class SessionManager:
             "video_port": self.video_port,
         }
 
-        if self.video_receiver:
-            stats.update(self.video_receiver.get_statistics())
+        # 由统计聚合线程调用，先取局部引用，避免与断开流程竞态
+        video_receiver = self.video_receiver
+        control_sender = self.control_sender
+        heartbeat = self.heartbeat
 
-        if self.control_sender:
-            ctrl_stats = self.control_sender.get_statistics()
+        if video_receiver:
+            stats.update(video_receiver.get_statistics())
+
+        if control_sender:
+            ctrl_stats = control_sender.get_statistics()
             # rtt_avg 从秒转毫秒，None 转 0.0
             rtt_sec = ctrl_stats.pop("rtt_avg", None)
             ctrl_stats["rtt_avg"] = (rtt_sec * 1000.0) if rtt_sec else 0.0
-            ctrl_stats["packet_loss_rate"] = self.control_sender.get_recent_loss(1.0)
+            ctrl_stats["packet_loss_rate"] = control_sender.get_recent_loss(1.0)
             stats.update(ctrl_stats)
 
-        if self.heartbeat:
-            stats.update(self.heartbeat.get_statistics())
+        if heartbeat:
+            stats.update(heartbeat.get_statistics())
+
+        stats.update(self.frame_tracer.get_statistics())
 
         return stats
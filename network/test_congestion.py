@@ -0,0 +1,145 @@
+"""
+CongestionController / TrendlineEstimator 单元测试
+"""
+
+import pytest
+from network.congestion import (CongestionController, TrendlineEstimator,
+                                BW_NORMAL, BW_OVERUSING)
+
+FRAME_INTERVAL = 1 / 30
+CHUNKS = 10
+CHUNK_SIZE = 1200
+
+
+def send_frame(cc: CongestionController, frame_id: int, delay: float, lost=()) -> float:
+    """发送一帧 CHUNKS 个分片，按单向时延 delay 到达，上报除 lost 以外的分片，返回反馈后的目标码率"""
+    arrivals = []
+    for chunk in range(CHUNKS):
+        send_t = frame_id * FRAME_INTERVAL + chunk * 0.001
+        cc.on_packet_sent(frame_id, chunk, CHUNK_SIZE, send_t)
+        if chunk not in lost:
+            arrivals.append((frame_id, chunk, send_t + delay))
+    now = frame_id * FRAME_INTERVAL + 0.05 + delay
+    return cc.on_feedback(now, arrivals, now)
+
+
+class TestTrendlineEstimator:
+    """时延梯度过载检测测试"""
+
+    def test_constant_delay_stays_normal(self):
+        est = TrendlineEstimator()
+        for i in range(100):
+            assert est.update(33.3, 33.3, i * 33.3) == BW_NORMAL
+
+    def test_growing_delay_detects_overuse(self):
+        """到达间隔持续大于发送间隔（排队增长）判定过载"""
+        est = TrendlineEstimator()
+        states = [est.update(33.3, 43.3, i * 43.3) for i in range(40)]
+        assert BW_OVERUSING in states
+        assert est.trend > 0
+
+
+class TestCongestionOveruse:
+    """过载退避测试"""
+
+    def test_overuse_backs_off_to_beta_received(self):
+        cc = CongestionController(4000)
+        for f in range(60):
+            send_frame(cc, f, 0.02)
+        assert cc.overuse_events == 0
+        assert cc.state == BW_NORMAL
+
+        delay = 0.02
+        f = 60
+        while cc.overuse_events == 0 and f < 120:
+            delay += 0.01
+            send_frame(cc, f, delay)
+            f += 1
+        assert cc.overuse_events == 1
+        assert cc.state == BW_OVERUSING
+        stats = cc.get_stats()
+        assert stats['cc_delay_kbps'] == pytest.approx(CongestionController.BETA * cc.received_kbps)
+        assert cc.target_kbps < 4000
+
+    def test_aimd_recovery_after_overuse(self):
+        """过载消失后先保持、再逐步回升"""
+        cc = CongestionController(4000)
+        for f in range(60):
+            send_frame(cc, f, 0.02)
+        delay = 0.02
+        f = 60
+        while cc.overuse_events == 0:
+            delay += 0.01
+            send_frame(cc, f, delay)
+            f += 1
+        backed_off = cc.target_kbps
+
+        for f in range(f, f + 200):
+            send_frame(cc, f, delay)
+        assert cc.state == BW_NORMAL
+        assert cc.overuse_events == 1
+        assert cc.target_kbps > backed_off * 1.1
+
+    def test_target_clamped_to_bounds(self):
+        cc = CongestionController(4000, min_kbps=300, max_kbps=5000)
+        for f in range(600):
+            send_frame(cc, f, 0.02)
+        assert cc.target_kbps <= 5000
+        cc.set_bounds(300, 1000)
+        assert cc.target_kbps == 1000
+
+
+class TestCongestionLoss:
+    """丢包统计测试"""
+
+    def test_unreported_chunks_counted_lost(self):
+        """早于最新被报告分片发出、却未被报告的分片计为丢失"""
+        cc = CongestionController(4000)
+        send_frame(cc, 0, 0.02, lost=(2, 3, 4))
+        send_frame(cc, 1, 0.02)
+        # 20 个分片（一个统计窗口）中丢 3 个
+        assert cc.loss_fraction == pytest.approx(3 / 20)
+        assert cc.get_stats()['cc_loss_kbps'] == pytest.approx(4000 * (1 - 0.5 * 3 / 20))
+
+    def test_later_unreported_chunks_not_lost(self):
+        """晚于最新被报告分片发出的分片仍在途中，不计丢失"""
+        cc = CongestionController(4000)
+        for chunk in range(CHUNKS):
+            cc.on_packet_sent(0, chunk, CHUNK_SIZE, chunk * 0.001)
+        # 只报告前 5 个分片
+        cc.on_feedback(0.05, [(0, c, c * 0.001 + 0.02) for c in range(5)], 0.05)
+        for chunk in range(CHUNKS):
+            cc.on_packet_sent(1, chunk, CHUNK_SIZE, FRAME_INTERVAL + chunk * 0.001)
+        arrivals = [(0, c, c * 0.001 + 0.02) for c in range(5, CHUNKS)]
+        arrivals += [(1, c, FRAME_INTERVAL + c * 0.001 + 0.02) for c in range(CHUNKS)]
+        cc.on_feedback(0.1, arrivals, 0.1)
+        assert cc.loss_fraction == 0.0
+
+    def test_split_reports_do_not_count_loss(self):
+        """同一间隔内拆成多条反馈上报（每条不超过上限）不产生误判丢包"""
+        cc = CongestionController(4000)
+        sent = []
+        for f in range(10):
+            for chunk in range(CHUNKS):
+                send_t = f * FRAME_INTERVAL + chunk * 0.001
+                cc.on_packet_sent(f, chunk, CHUNK_SIZE, send_t)
+                sent.append((f, chunk, send_t + 0.02))
+        cc.on_feedback(0.5, sent[:50], 0.5)
+        cc.on_feedback(0.5, sent[50:], 0.5)
+        assert cc.loss_fraction == 0.0
+
+    def test_low_loss_allows_increase(self):
+        cc = CongestionController(4000)
+        send_frame(cc, 0, 0.02)
+        send_frame(cc, 1, 0.02)
+        assert cc.loss_fraction == 0.0
+        assert cc.get_stats()['cc_loss_kbps'] == pytest.approx(4000 * 1.05)
+
+    def test_reset_clears_state(self):
+        cc = CongestionController(4000)
+        send_frame(cc, 0, 0.02, lost=(1, 2, 3))
+        send_frame(cc, 1, 0.02)
+        cc.reset(2000)
+        assert cc.loss_fraction == 0.0
+        assert cc.rtt is None
+        assert cc.target_kbps == 2000
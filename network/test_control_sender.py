@@ -0,0 +1,122 @@
+"""
+ControlSender 超时重传单元测试
+"""
+
+import importlib
+import sys
+import time
+import types
+import pytest
+from config import Config
+
+ADDR = ("127.0.0.1", 5000)
+
+
+class FakeKeyboard:
+    """键盘编码器替身（Win32 GetAsyncKeyState 只在 Windows 可用）"""
+
+    def __init__(self):
+        self.on_f5_pressed = None
+
+    def get_state(self) -> bytes:
+        return b'\x00' * 10
+
+    def start(self):
+        pass
+
+    def stop(self):
+        pass
+
+
+class RecordingSocket:
+    def __init__(self):
+        self.sent = []
+
+    def sendto(self, data: bytes, addr):
+        self.sent.append((data, addr))
+
+
+class FailingSocket:
+    def sendto(self, data: bytes, addr):
+        raise OSError("network unreachable")
+
+
+@pytest.fixture
+def make_sender(monkeypatch):
+    """按冗余深度构造 ControlSender（不启动线程）"""
+    fake = types.ModuleType("network.keyboard_encoder")
+    fake.KeyboardEncoder = FakeKeyboard
+    monkeypatch.setitem(sys.modules, "network.keyboard_encoder", fake)
+    monkeypatch.delitem(sys.modules, "network.control_sender", raising=False)
+    module = importlib.import_module("network.control_sender")
+    monkeypatch.setitem(sys.modules, "network.control_sender", module)
+
+    def make(redundancy: int):
+        monkeypatch.setattr(Config, "CONTROL_REDUNDANCY", redundancy)
+        sender = module.ControlSender()
+        sender.remote_addr = ADDR
+        return sender
+    return make
+
+
+def expire(sender, seq: int):
+    """把待确认指令的发送时刻拨回到已超时"""
+    _, retry_count = sender._pending_acks[seq]
+    sender._pending_acks[seq] = (time.perf_counter() - Config.TX_TIMEOUT * 2, retry_count)
+
+
+class TestRetransmit:
+    """无冗余模式：超时重传"""
+
+    def test_retransmit_sends_and_refreshes(self, make_sender):
+        sender = make_sender(0)
+        sender.socket = RecordingSocket()
+        sender._pending_acks[7] = (0.0, 0)
+        expire(sender, 7)
+        sender._check_retransmit()
+        assert len(sender.socket.sent) == 1
+        assert sender.retransmits == 1
+        assert sender._pending_acks[7][1] == 1
+        assert sender._next_retransmit_deadline() > time.perf_counter()
+
+    @pytest.mark.parametrize("sock", [None, FailingSocket()], ids=["closed", "sendto-raises"])
+    def test_failed_retransmit_moves_deadline(self, make_sender, sock):
+        """重传失败后截止时刻仍前移（否则发送线程空转）"""
+        sender = make_sender(0)
+        sender.socket = sock
+        sender._pending_acks[7] = (0.0, 0)
+        expire(sender, 7)
+        sender._check_retransmit()
+        assert sender._next_retransmit_deadline() > time.perf_counter()
+        assert sender._pending_acks[7][1] == 1
+        assert sender.retransmits == 0
+
+    def test_failed_retransmits_expire(self, make_sender):
+        """持续失败的指令用尽重试次数后移除并计超时"""
+        sender = make_sender(0)
+        sender.socket = FailingSocket()
+        sender._pending_acks[7] = (0.0, 0)
+        for _ in range(3):
+            expire(sender, 7)
+            sender._check_retransmit()
+        expire(sender, 7)
+        sender._check_retransmit()
+        assert 7 not in sender._pending_acks
+        assert sender._next_retransmit_deadline() is None
+        assert sender.timeout_errors == 1
+
+
+class TestRedundantUnacked:
+    """冗余模式：超时不重传"""
+
+    def test_unacked_counted_separately(self, make_sender):
+        sender = make_sender(3)
+        sender.socket = RecordingSocket()
+        for seq in (1, 2):
+            sender._pending_acks[seq] = (0.0, 0)
+            expire(sender, seq)
+        sender._check_retransmit()
+        assert sender.socket.sent == []
+        assert not sender._pending_acks
+        assert sender.unacked_redundant == 2
+        assert sender.timeout_errors == 0
@@ -0,0 +1,60 @@
+"""
+ControlServer 单元测试（本机回环）
+"""
+
+import socket
+import pytest
+from network.control_server import ControlServer
+from network.protocol import Protocol, MSG_TYPE_CONTROL_COMMAND, MSG_TYPE_HEARTBEAT
+
+
+@pytest.fixture
+def server():
+    srv = ControlServer(kernel_timestamps=False)
+    srv.register(MSG_TYPE_CONTROL_COMMAND,
+                 lambda addr, seq, t1, payload, rx: srv.send_ack(addr, seq, rx))
+    srv.start("127.0.0.1", 0)
+    yield srv
+    srv.stop()
+
+
+@pytest.fixture
+def client():
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    sock.bind(("127.0.0.1", 0))
+    sock.settimeout(1.0)
+    yield sock
+    sock.close()
+
+
+class TestControlServer:
+
+    def test_control_command_acked(self, server, client):
+        for seq in (1, 2, 3):
+            client.sendto(Protocol.build_control_command(seq, 0.0), server.address)
+            ack_seq, t2, t3 = Protocol.parse_ack(client.recvfrom(64)[0])
+            assert ack_seq == seq
+            assert t3 >= t2
+        # ACK 先于 acks_sent 计数发出：停止事件循环后再读计数
+        server.stop()
+        assert server.messages_received == 3
+        assert server.acks_sent == 3
+
+    def test_invalid_and_unhandled_counted(self, server, client):
+        client.sendto(b"garbage", server.address)
+        client.sendto(Protocol.build_heartbeat(1, 0.0), server.address)
+        # 之后的控制指令仍正常处理（同一 socket 按序到达）
+        client.sendto(Protocol.build_control_command(2, 0.0), server.address)
+        assert Protocol.parse_ack(client.recvfrom(64)[0])[0] == 2
+        assert server.invalid_messages == 1
+        assert server.unhandled_messages == 1
+
+    def test_handler_error_isolated(self, server, client):
+        def failing(addr, seq, t1, payload, rx):
+            raise RuntimeError("boom")
+
+        server.register(MSG_TYPE_HEARTBEAT, failing)
+        client.sendto(Protocol.build_heartbeat(1, 0.0), server.address)
+        client.sendto(Protocol.build_control_command(2, 0.0), server.address)
+        assert Protocol.parse_ack(client.recvfrom(64)[0])[0] == 2
+        assert server.handler_errors == 1
@@ -0,0 +1,197 @@
+"""
+ControlStateReceiver / 控制指令冗余字段单元测试
+"""
+
+import random
+import pytest
+from network.control_state import ControlStateReceiver, SEQ_RESET_WINDOW
+from network.protocol import (Protocol, ControlCommand, CONTROL_HISTORY_MAX,
+                              MSG_TYPE_CONTROL_COMMAND)
+
+
+def wire(seq: int, dx: int = 0, dy: int = 0, buttons: int = 0, scroll: int = 0,
+         keyboard_state: bytes = b'\x00' * 10, history: tuple = ()) -> ControlCommand:
+    """经完整编解码得到接收端看到的 ControlCommand"""
+    data = Protocol.build_control_command(seq, 0.0, keyboard_state=keyboard_state,
+                                          mouse_dx=dx, mouse_dy=dy, mouse_buttons=buttons,
+                                          scroll_delta=scroll, history=history)
+    msg_type, parsed_seq, _, payload = Protocol.parse_message(data)
+    assert msg_type == MSG_TYPE_CONTROL_COMMAND
+    assert parsed_seq == seq
+    return ControlCommand.from_bytes(payload)
+
+
+class SenderModel:
+    """发送端冗余历史：每条指令携带前 depth 条的鼠标数据，最近的在前"""
+
+    def __init__(self, depth: int):
+        self.depth = depth
+        self.history = []
+        self.seq = 0
+
+    def next(self, dx: int = 0, dy: int = 0, buttons: int = 0, scroll: int = 0):
+        self.seq += 1
+        cmd = wire(self.seq, dx, dy, buttons, scroll, history=tuple(self.history[:self.depth]))
+        self.history.insert(0, (dx, dy, buttons, scroll))
+        return self.seq, cmd
+
+
+class TestProtocolHistory:
+    """history 字段编解码测试"""
+
+    def test_legacy_37_byte_command(self):
+        """不带冗余的控制指令保持 37 字节，解析为空 history"""
+        data = Protocol.build_control_command(1, 0.0, mouse_dx=-5, mouse_dy=7,
+                                              mouse_buttons=3, scroll_delta=-1)
+        assert len(data) == 37
+        _, _, _, payload = Protocol.parse_message(data)
+        cmd = ControlCommand.from_bytes(payload)
+        assert (cmd.mouse_dx, cmd.mouse_dy, cmd.mouse_buttons, cmd.scroll_delta) == (-5, 7, 3, -1)
+        assert cmd.history == ()
+
+    def test_history_round_trip(self):
+        history = ((1, -2, 1, 0), (300, -300, 0, 5), (0, 0, 2, -3))
+        data = Protocol.build_control_command(9, 0.0, history=history)
+        assert len(data) == 38 + 6 * len(history)
+        assert wire(9, history=history).history == history
+
+    def test_history_truncated_to_max(self):
+        history = tuple((i, 0, 0, 0) for i in range(CONTROL_HISTORY_MAX + 4))
+        assert len(wire(1, history=history).history) == CONTROL_HISTORY_MAX
+
+    def test_short_payload_ignores_partial_history(self):
+        """history 计数大于实际条目（截断的包）时只解析完整条目"""
+        payload = b'\x00' * 10 + b'\x00' * 6 + bytes((3,)) + b'\x01\x00\x00\x00\x00\x00'
+        assert ControlCommand.from_bytes(payload).history == ((1, 0, 0, 0),)
+
+
+class TestControlStateReceiver:
+    """控制状态去重 / 补齐测试"""
+
+    def test_in_order(self):
+        rx = ControlStateReceiver()
+        sender = SenderModel(3)
+        for _ in range(5):
+            assert rx.receive(*sender.next(dx=2, dy=-1))
+        assert (rx.input.mouse_x, rx.input.mouse_y) == (10, -5)
+        assert rx.applied == 5
+        assert rx.recovered == rx.lost == rx.duplicates == 0
+
+    def test_duplicate_not_reapplied(self):
+        rx = ControlStateReceiver()
+        seq, cmd = SenderModel(3).next(dx=10)
+        assert rx.receive(seq, cmd)
+        assert not rx.receive(seq, cmd)
+        assert rx.input.mouse_x == 10
+        assert rx.duplicates == 1
+
+    def test_late_packet_dropped(self):
+        """迟到的旧包不再应用（其数据已由后续包的冗余补齐）"""
+        rx = ControlStateReceiver()
+        sender = SenderModel(3)
+        packets = [sender.next(dx=1 << i) for i in range(3)]
+        rx.receive(*packets[0])
+        rx.receive(*packets[2])
+        assert rx.input.mouse_x == 1 + 2 + 4
+        assert not rx.receive(*packets[1])
+        assert rx.input.mouse_x == 1 + 2 + 4
+        assert rx.recovered == 1
+        assert rx.duplicates == 1
+
+    def test_gap_repair_order(self):
+        """history[i] 对应 seq - 1 - i，按 seq 升序补应用：按键沿计数依赖顺序"""
+        rx = ControlStateReceiver()
+        sender = SenderModel(3)
+        rx.receive(*sender.next(buttons=0))      # seq 1
+        sender.next(dx=5, buttons=1)             # seq 2 丢失：按下
+        sender.next(dx=7, buttons=0)             # seq 3 丢失：抬起
+        seq, cmd = sender.next(dx=11, buttons=1)  # seq 4：再次按下
+        assert cmd.history[0] == (7, 0, 0, 0)
+        assert cmd.history[1] == (5, 0, 1, 0)
+
+        assert rx.receive(seq, cmd)
+        assert rx.input.mouse_x == 5 + 7 + 11
+        assert rx.input.button_presses == 2
+        assert rx.input.button_releases == 1
+        assert rx.input.buttons == 1
+        assert rx.recovered == 2
+        assert rx.lost == 0
+
+    def test_loss_beyond_redundancy_depth(self):
+        rx = ControlStateReceiver()
+        sender = SenderModel(3)
+        rx.receive(*sender.next(dx=1))
+        for i in range(6):
+            sender.next(dx=1 << i)
+        assert rx.receive(*sender.next(dx=0))
+        # 只有最近 3 条可补齐：8 + 16 + 32
+        assert rx.input.mouse_x == 1 + 56
+        assert rx.recovered == 3
+        assert rx.lost == 3
+
+    def test_no_redundancy_counts_all_lost(self):
+        rx = ControlStateReceiver()
+        sender = SenderModel(0)
+        rx.receive(*sender.next())
+        sender.next(dx=4)
+        sender.next(dx=4)
+        rx.receive(*sender.next())
+        assert rx.lost == 2
+        assert rx.recovered == 0
+        assert rx.input.mouse_x == 0
+
+    def test_short_click_recovered(self):
+        """只持续一个包的点击丢失后由冗余补齐，按下 / 抬起沿都被计数"""
+        rx = ControlStateReceiver()
+        sender = SenderModel(1)
+        rx.receive(*sender.next(buttons=0))
+        sender.next(buttons=1)
+        rx.receive(*sender.next(buttons=0))
+        assert rx.input.button_presses == 1
+        assert rx.input.button_releases == 1
+        assert rx.input.buttons == 0
+
+    def test_button_edges_per_bit(self):
+        rx = ControlStateReceiver()
+        sender = SenderModel(0)
+        rx.receive(*sender.next(buttons=0b011))
+        rx.receive(*sender.next(buttons=0b110))
+        rx.receive(*sender.next(buttons=0b000))
+        assert rx.input.button_presses == 3
+        assert rx.input.button_releases == 3
+
+    def test_keyboard_state_latest_only(self):
+        rx = ControlStateReceiver()
+        rx.receive(1, wire(1, keyboard_state=b'\x01' + b'\x00' * 9))
+        rx.receive(3, wire(3, keyboard_state=b'\x02' + b'\x00' * 9))
+        assert rx.input.keyboard_state == b'\x02' + b'\x00' * 9
+
+    def test_seq_reset_accepted(self):
+        """seq 远小于最新值视为客户端重启，而非迟到的包"""
+        rx = ControlStateReceiver()
+        rx.receive(SEQ_RESET_WINDOW + 100, wire(SEQ_RESET_WINDOW + 100, dx=1))
+        assert rx.receive(1, wire(1, dx=2))
+        assert rx.last_seq == 1
+        assert rx.input.mouse_x == 3
+        assert rx.duplicates == 0
+
+    @pytest.mark.parametrize("depth", [1, 3, CONTROL_HISTORY_MAX])
+    def test_random_loss_totals(self, depth):
+        """突发长度不超过冗余深度时，鼠标增量累计与无丢包一致"""
+        rng = random.Random(depth)
+        rx = ControlStateReceiver()
+        sender = SenderModel(depth)
+        total = 0
+        burst = 0
+        for i in range(500):
+            dx = rng.randint(-50, 50)
+            total += dx
+            seq, cmd = sender.next(dx=dx)
+            if 0 < i < 499 and burst < depth and rng.random() < 0.3:
+                burst += 1
+                continue
+            burst = 0
+            rx.receive(seq, cmd)
+        assert rx.recovered > 0
+        assert rx.input.mouse_x == total
+        assert rx.lost == 0
@@ -0,0 +1,142 @@
+"""
+H.264 码流解析单元测试：Exp-Golomb / 恢复点 SEI / 帧扫描
+"""
+
+import random
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from network.h264_decoder import (_read_ue, parse_recovery_point, scan_access_unit,  # noqa: E402
+                                  iter_nal_units, NAL_SEI)
+
+WIDTH, HEIGHT, FPS = 320, 240, 30
+REFRESH_PERIOD = 10
+
+
+def bits_to_bytes(bits: str) -> bytes:
+    """位串 → 字节（末尾补 0）"""
+    bits = bits.ljust((len(bits) + 7) // 8 * 8, '0')
+    return bytes(int(bits[i:i + 8], 2) for i in range(0, len(bits), 8))
+
+
+def recovery_sei(recovery_frame_cnt: int, prefix: bytes = b'') -> bytes:
+    """SEI NAL：可选的前置消息 + 恢复点消息 + rbsp_trailing_bits"""
+    cnt = bin(recovery_frame_cnt + 1)[2:]
+    # recovery_frame_cnt ue(v)，exact_match / broken_link 各 1 位，changing_slice_group_idc 2 位
+    payload = bits_to_bytes('0' * (len(cnt) - 1) + cnt + '0' + '0' + '00')
+    return b'\x06' + prefix + bytes((6, len(payload))) + payload + b'\x80'
+
+
+@pytest.fixture(scope="module")
+def intra_refresh_stream():
+    """x264 帧内刷新编码输出（每帧一个 access unit）"""
+    pytest.importorskip("av")
+    from network.h264_encoder import H264Encoder
+    rng = np.random.default_rng(0)
+    base = rng.integers(0, 255, (HEIGHT, WIDTH, 3), dtype=np.uint8)
+    enc = H264Encoder(WIDTH, HEIGHT, FPS, keyframe_interval=REFRESH_PERIOD, intra_refresh=True)
+    return [b"".join(enc.encode(np.roll(base, i * 4, axis=1))) for i in range(2 * REFRESH_PERIOD + 5)]
+
+
+class TestReadUe:
+    """Exp-Golomb 解码测试"""
+
+    @pytest.mark.parametrize("bits,value", [
+        ("1", 0), ("010", 1), ("011", 2), ("00100", 3), ("0001010", 9),
+        ("000000011111111", 254),
+    ])
+    def test_values(self, bits, value):
+        assert _read_ue(bits_to_bytes(bits), 0) == (value, len(bits))
+
+    def test_consecutive_codes(self):
+        data = bits_to_bytes("1" + "011" + "00101")
+        value, pos = _read_ue(data, 0)
+        assert (value, pos) == (0, 1)
+        value, pos = _read_ue(data, pos)
+        assert (value, pos) == (2, 4)
+        assert _read_ue(data, pos) == (4, 9)
+
+    @pytest.mark.parametrize("data,bit_pos", [
+        (b"", 0), (b"\x00", 0), (b"\x00\x01", 0), (b"\x01", 4), (b"\xff", 8),
+    ])
+    def test_truncated_returns_none(self, data, bit_pos):
+        assert _read_ue(data, bit_pos) == (None, bit_pos)
+
+
+class TestParseRecoveryPoint:
+    """恢复点 SEI 解析测试"""
+
+    @pytest.mark.parametrize("cnt", [0, 1, 9, 29, 300])
+    def test_recovery_frame_cnt(self, cnt):
+        assert parse_recovery_point(recovery_sei(cnt)) == cnt
+
+    def test_after_other_messages(self):
+        """跳过前置的其他 SEI 消息（含 0xFF 扩展的类型 / 长度）"""
+        user_data = bytes((5, 3)) + b'abc'
+        extended = b'\xff' + bytes((1, 0xff, 2)) + b'x' * 257
+        assert parse_recovery_point(recovery_sei(29, user_data + extended)) == 29
+
+    def test_other_sei_only(self):
+        assert parse_recovery_point(b'\x06' + bytes((5, 3)) + b'abc' + b'\x80') is None
+
+    def test_truncated_returns_none(self):
+        sei = recovery_sei(29, bytes((5, 3)) + b'abc')
+        payload_end = len(sei) - 1
+        for n in range(payload_end):
+            assert parse_recovery_point(sei[:n]) is None
+        assert parse_recovery_point(sei[:payload_end]) == 29
+
+    def test_emulation_prevention_removed(self):
+        """负载中的防竞争字节去除后再解析"""
+        # payload_size 按去除防竞争字节后的长度计
+        user_data = bytes((5, 4)) + b'\x00\x00\x03\x01\x15'
+        sei = b'\x06' + user_data + bytes((6, 1)) + b'\x15' + b'\x80'
+        assert parse_recovery_point(sei) == 9
+
+    def test_garbage_never_raises(self):
+        rng = random.Random(0)
+        for _ in range(2000):
+            data = bytes(rng.randrange(256) for _ in range(rng.randrange(12)))
+            result = parse_recovery_point(data)
+            assert result is None or result >= 0
+
+
+class TestScanAccessUnit:
+    """帧扫描测试（x264 帧内刷新输出）"""
+
+    def test_recovery_points(self, intra_refresh_stream):
+        results = [scan_access_unit(data) for data in intra_refresh_stream]
+        # 只有首帧为 IDR，之后每个刷新周期起点带恢复点 SEI
+        assert results[0] == (True, None)
+        assert [i for i, (idr, _) in enumerate(results) if idr] == [0]
+        points = {i: cnt for i, (_, cnt) in enumerate(results) if cnt is not None}
+        assert list(points) == [REFRESH_PERIOD, 2 * REFRESH_PERIOD]
+        # recovery_frame_cnt：刷新周期内的后续帧数
+        assert set(points.values()) == {REFRESH_PERIOD - 1}
+
+    def test_real_sei_truncated(self, intra_refresh_stream):
+        sei = next(nal for nal_type, nal in iter_nal_units(intra_refresh_stream[REFRESH_PERIOD])
+                   if nal_type == NAL_SEI)
+        assert parse_recovery_point(sei) == REFRESH_PERIOD - 1
+        for n in range(len(sei)):
+            assert parse_recovery_point(sei[:n]) in (None, REFRESH_PERIOD - 1)
+        # 负载之前截断：没有恢复点
+        assert parse_recovery_point(sei[:3]) is None
+
+    def test_truncated_access_unit(self, intra_refresh_stream):
+        data = intra_refresh_stream[REFRESH_PERIOD]
+        for n in range(0, 64):
+            is_idr, cnt = scan_access_unit(data[:n])
+            assert not is_idr
+            assert cnt in (None, REFRESH_PERIOD - 1)
+
+    def test_garbage_never_raises(self):
+        rng = random.Random(1)
+        for _ in range(500):
+            body = bytes(rng.randrange(256) for _ in range(rng.randrange(40)))
+            data = b'\x00\x00\x01\x06' + body + b'\x00\x00\x01\x65' + body
+            _, cnt = scan_access_unit(data)
+            assert cnt is None or cnt >= 0
+        assert scan_access_unit(b'') == (False, None)
+        assert scan_access_unit(b'\x00\x00\x01') == (False, None)
@@ -0,0 +1,226 @@
+"""
+H264Encoder 单元测试：YUV 输入 / 码率在线修改 / NAL 对齐分片（需要 PyAV）
+"""
+
+import pytest
+
+np = pytest.importorskip("numpy")
+av = pytest.importorskip("av")
+
+from network.h264_encoder import (H264Encoder, packetize_access_unit,  # noqa: E402
+                                  split_i420, split_nv12)
+
+WIDTH, HEIGHT, FPS = 320, 240, 30
+
+
+def i420_frame(shift: int) -> np.ndarray:
+    """紧凑 I420 测试帧 (HEIGHT * 3/2, WIDTH)：平滑渐变，U / V 平面内容不同"""
+    y, x = np.mgrid[0:HEIGHT, 0:WIDTH]
+    luma = (x + y + shift) % 256
+    cy, cx = np.mgrid[0:HEIGHT // 2, 0:WIDTH // 2]
+    u = 64 + (cx + shift) % 128
+    v = 192 - (cy + shift) % 128
+    return np.concatenate([luma.ravel(), u.ravel(), v.ravel()]).astype(np.uint8).reshape(-1, WIDTH)
+
+
+def i420_to_nv12(frame: np.ndarray) -> np.ndarray:
+    u = frame[HEIGHT:HEIGHT + HEIGHT // 4].reshape(HEIGHT // 2, WIDTH // 2)
+    v = frame[HEIGHT + HEIGHT // 4:].reshape(HEIGHT // 2, WIDTH // 2)
+    uv = np.stack([u, v], axis=-1).reshape(HEIGHT // 2, WIDTH)
+    return np.concatenate([frame[:HEIGHT], uv])
+
+
+def mean_error(a, b) -> float:
+    return float(np.abs(a.astype(np.int16) - b.astype(np.int16)).mean())
+
+
+def nal(nal_type: int, size: int, start_code: bytes = b'\x00\x00\x00\x01') -> bytes:
+    """起始码 + NAL 头 + 不含起始码模式的负载，总长 size"""
+    body = bytes((0x60 | nal_type,)) + bytes(i % 251 + 1 for i in range(size - len(start_code) - 1))
+    return start_code + body
+
+
+def start_code_len(chunk: bytes) -> int:
+    if chunk.startswith(b'\x00\x00\x00\x01'):
+        return 4
+    return 3 if chunk.startswith(b'\x00\x00\x01') else 0
+
+
+def has_start_code(chunk: bytes) -> bool:
+    return start_code_len(chunk) > 0
+
+
+def check_chunks(data: bytes, chunks: list, max_size: int):
+    """拼接还原、大小上限；不以起始码开头的分片只能是超长 NAL 的后续部分"""
+    assert b"".join(chunks) == data
+    for prev, chunk in zip([None] + chunks, chunks):
+        assert 0 < len(chunk) <= max_size
+        if not has_start_code(chunk):
+            # 前一片是同一个 NAL 的满长部分
+            assert prev is not None and len(prev) == max_size
+            assert b'\x00\x00\x01' not in prev[start_code_len(prev):]
+
+
+def encode_kbps(enc: H264Encoder, frames: list, count: int) -> float:
+    total = 0
+    for i in range(count):
+        total += sum(len(p) for p in enc.encode(frames[(enc.pts + i) % len(frames)]))
+    return total * 8 * FPS / count / 1000
+
+
+@pytest.fixture
+def frames():
+    rng = np.random.default_rng(0)
+    base = rng.integers(0, 255, (HEIGHT, WIDTH, 3), dtype=np.uint8)
+    return [np.roll(base, i * 4, axis=1) for i in range(16)]
+
+
+class TestH264Reconfigure:
+
+    def test_in_place_below_ceiling(self, frames):
+        enc = H264Encoder(WIDTH, HEIGHT, FPS, bitrate=1_000_000, max_bitrate=1_000_000)
+        encode_kbps(enc, frames, 30)
+        assert enc.reconfigure(bitrate=250_000)
+        assert enc.reopens == 0
+        # 在线修改确实生效：输出码率跟随新目标
+        assert encode_kbps(enc, frames, 60) < 400
+        assert enc.reconfigure(bitrate=1_000_000)
+        assert encode_kbps(enc, frames, 60) > 600
+
+    def test_above_ceiling_reopens(self, frames):
+        enc = H264Encoder(WIDTH, HEIGHT, FPS, bitrate=500_000)
+        encode_kbps(enc, frames, 5)
+        assert not enc.reconfigure(bitrate=1_000_000)
+        assert enc.reopens == 1
+        # 新上限之下又可在线修改
+        assert enc.reconfigure(bitrate=800_000)
+        assert enc.reopens == 1
+
+    @pytest.mark.parametrize("intra_refresh", [False, True])
+    def test_reopen_flags_next_frame(self, frames, intra_refresh):
+        """重开后的首帧（IDR）标记 last_reopened；在线修改与帧内刷新的强制 I 帧不标记"""
+        enc = H264Encoder(WIDTH, HEIGHT, FPS, bitrate=500_000, intra_refresh=intra_refresh)
+        enc.encode(frames[0])
+        assert enc.last_reopened
+        enc.encode(frames[1])
+        assert not enc.last_reopened
+        assert enc.reconfigure(bitrate=400_000)
+        enc.encode(frames[2])
+        assert not enc.last_reopened
+        if intra_refresh:
+            enc.encode(frames[3], force_keyframe=True)
+            assert not enc.last_reopened
+
+        assert not enc.reconfigure(bitrate=1_000_000)
+        packets = enc.encode(frames[4])
+        assert enc.last_reopened
+        # 重开后的首帧可独立解码
+        dec = av.CodecContext.create('h264', 'r')
+        decoded = dec.decode(av.Packet(b"".join(packets))) + dec.decode(None)
+        assert len(decoded) == 1
+        enc.encode(frames[5])
+        assert not enc.last_reopened
+
+    def test_raising_max_bitrate_allows_in_place(self, frames):
+        enc = H264Encoder(WIDTH, HEIGHT, FPS, bitrate=500_000)
+        assert enc.reconfigure(max_bitrate=2_000_000)
+        assert not enc.reconfigure(bitrate=1_500_000)
+        assert enc.reconfigure(bitrate=1_000_000)
+
+
+class TestH264EncodeYuv:
+    """encode_yuv 输入路径测试"""
+
+    @pytest.mark.parametrize("pix_fmt", ["yuv420p", "nv12"])
+    @pytest.mark.parametrize("packed", [True, False])
+    def test_encode_and_decode(self, pix_fmt, packed):
+        """平面元组与紧凑数组输入均可编码，解码结果与输入 I420 一致"""
+        enc = H264Encoder(WIDTH, HEIGHT, FPS, bitrate=4_000_000, pix_fmt=pix_fmt)
+        dec = av.CodecContext.create('h264', 'r')
+        decoded = []
+        sources = [i420_frame(i * 8) for i in range(5)]
+        for src in sources:
+            data = src if pix_fmt == 'yuv420p' else i420_to_nv12(src)
+            if not packed:
+                split = split_i420 if pix_fmt == 'yuv420p' else split_nv12
+                data = tuple(np.ascontiguousarray(p) for p in split(data, WIDTH, HEIGHT))
+            packets = enc.encode_yuv(data)
+            assert packets
+            decoded += dec.decode(av.Packet(b"".join(packets)))
+        decoded += dec.decode(None)
+
+        assert len(decoded) == len(sources)
+        for frame, src in zip(decoded, sources):
+            assert (frame.width, frame.height) == (WIDTH, HEIGHT)
+            image = frame.to_ndarray(format='yuv420p')
+            assert mean_error(image[:HEIGHT], src[:HEIGHT]) < 4
+            assert mean_error(image[HEIGHT:], src[HEIGHT:]) < 4
+
+    def test_reused_frame_not_stuck_keyframe(self):
+        """复用输入帧：强制关键帧只作用于当帧"""
+        enc = H264Encoder(WIDTH, HEIGHT, FPS, keyframe_interval=1000, pix_fmt='nv12')
+        src = i420_to_nv12(i420_frame(0))
+        first = sum(len(p) for p in enc.encode_yuv(src))
+        forced = sum(len(p) for p in enc.encode_yuv(src, force_keyframe=True))
+        after = sum(len(p) for p in enc.encode_yuv(src))
+        assert forced > after * 4
+        assert first > after * 4
+
+
+class TestPacketizeAccessUnit:
+    """packetize_access_unit 测试"""
+
+    def test_small_nals_grouped(self):
+        data = nal(7, 20) + nal(8, 8) + nal(5, 300) + nal(5, 300)
+        chunks = packetize_access_unit(data, 400)
+        check_chunks(data, chunks, 400)
+        # SPS + PPS + 第一个 slice 合为一片，第二个 slice 单独成片
+        assert [len(c) for c in chunks] == [328, 300]
+
+    def test_mixed_start_codes(self):
+        """3 字节与 4 字节起始码混用：4 字节起始码的前导 0 归入下一个 NAL"""
+        three = b'\x00\x00\x01'
+        parts = [nal(7, 20), nal(8, 8, three), nal(5, 300, three), nal(1, 250), nal(1, 120, three)]
+        data = b"".join(parts)
+        chunks = packetize_access_unit(data, 300)
+        check_chunks(data, chunks, 300)
+        assert chunks == [parts[0] + parts[1], parts[2], parts[3], parts[4]]
+
+    def test_oversized_nal_split(self):
+        parts = [nal(7, 20), nal(5, 1000), nal(1, 50, b'\x00\x00\x01')]
+        data = b"".join(parts)
+        chunks = packetize_access_unit(data, 300)
+        check_chunks(data, chunks, 300)
+        # 超长 NAL 之前的分片先结束；超长 NAL 拆为 300 + 300 + 300 + 100
+        assert [len(c) for c in chunks] == [20, 300, 300, 300, 100, 50]
+        assert [has_start_code(c) for c in chunks] == [True, True, False, False, False, True]
+
+    def test_no_leading_start_code(self):
+        """数据不以起始码开头时，开头部分单独作为一个 NAL"""
+        data = b'\x65' + b'\x11' * 30 + nal(1, 40)
+        chunks = packetize_access_unit(data, 64)
+        assert b"".join(chunks) == data
+        assert chunks == [data[:31], data[31:]]
+
+    def test_no_start_code_at_all(self):
+        data = b'\x11' * 250
+        chunks = packetize_access_unit(data, 100)
+        assert [len(c) for c in chunks] == [100, 100, 50]
+        assert b"".join(chunks) == data
+
+    @pytest.mark.parametrize("slice_max_size", [0, 600])
+    def test_x264_access_units(self, frames, slice_max_size):
+        """真实编码输出：还原一致、分片可解码"""
+        enc = H264Encoder(WIDTH, HEIGHT, FPS, bitrate=2_000_000, slice_max_size=slice_max_size)
+        dec = av.CodecContext.create('h264', 'r')
+        decoded = []
+        for i in range(4):
+            data = b"".join(enc.encode(frames[i]))
+            chunks = packetize_access_unit(data, 1000)
+            check_chunks(data, chunks, 1000)
+            if slice_max_size:
+                # slice 不超过分片大小：每个分片都以起始码开头
+                assert all(has_start_code(c) for c in chunks)
+            decoded += dec.decode(av.Packet(b"".join(chunks)))
+        decoded += dec.decode(None)
+        assert len(decoded) == 4
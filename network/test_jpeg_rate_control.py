@@ -0,0 +1,114 @@
+"""
+JpegRateController 单元测试
+"""
+
+import math
+import random
+import pytest
+from network.jpeg_rate_control import JpegRateController
+
+
+class Scene:
+    """合成场景：ln(size) = a + b × quality（可加噪声）"""
+
+    def __init__(self, a: float, b: float, noise: float = 0.0, seed: int = 0):
+        self.a = a
+        self.b = b
+        self.noise = noise
+        self._rng = random.Random(seed)
+
+    def size(self, quality: int) -> int:
+        return int(math.exp(self.a + self.b * quality + self._rng.gauss(0.0, self.noise)))
+
+    def quality_for(self, size: float) -> float:
+        return (math.log(size) - self.a) / self.b
+
+
+class TestJpegRateConvergence:
+    """模型求解测试"""
+
+    def test_one_step_convergence(self):
+        """斜率与先验一致时，第一帧观测后即求出达到目标的质量"""
+        scene = Scene(a=8.0, b=0.025)
+        target = scene.size(70)
+        rc = JpegRateController(target, quality=40, slope=0.025)
+        assert rc.predict_size(40) is None
+
+        q = rc.update(40, scene.size(40))
+        assert abs(q - 70) <= 1
+        assert scene.size(q) == pytest.approx(target, rel=0.05)
+        assert rc.predict_size(40) == pytest.approx(scene.size(40), rel=0.01)
+
+    def test_target_change_one_step(self):
+        scene = Scene(a=8.0, b=0.025)
+        rc = JpegRateController(scene.size(60), quality=60)
+        q = rc.update(60, scene.size(60))
+        rc.set_target(scene.size(30))
+        q = rc.update(q, scene.size(q))
+        assert abs(q - 30) <= 1
+        assert rc.scene_cuts == 0
+
+    def test_slope_learned_from_quality_span(self):
+        """场景斜率与先验不同时，质量跨度足够后拟合出真实斜率"""
+        scene = Scene(a=7.0, b=0.045)
+        rc = JpegRateController(scene.size(50), quality=50, slope=0.025)
+        q = 50
+        for i in range(40):
+            rc.set_target(scene.size(30 if i % 2 else 70))
+            q = rc.update(q, scene.size(q))
+        assert rc.slope == pytest.approx(0.045, abs=0.003)
+        rc.set_target(scene.size(55))
+        q = rc.update(q, scene.size(q))
+        assert abs(q - 55) <= 1
+
+    def test_noise_does_not_trigger_scene_cut(self):
+        scene = Scene(a=8.0, b=0.025, noise=0.05)
+        rc = JpegRateController(scene.size(60), quality=60)
+        q = 60
+        for _ in range(200):
+            q = rc.update(q, scene.size(q))
+        assert rc.scene_cuts == 0
+        assert abs(q - 60) <= 3
+
+
+class TestJpegRateSceneCut:
+    """场景切换测试"""
+
+    def test_scene_cut_resets_model(self):
+        scene = Scene(a=8.0, b=0.025)
+        target = scene.size(60)
+        rc = JpegRateController(target, quality=60)
+        q = 60
+        for _ in range(10):
+            q = rc.update(q, scene.size(q))
+        assert rc.scene_cuts == 0
+
+        # 画面复杂度突增（同一质量下帧大小 × e）
+        scene.a += 1.0
+        q = rc.update(q, scene.size(q))
+        assert rc.scene_cuts == 1
+        assert rc.slope == rc.prior_slope
+        # 切换后下一帧即按新场景求解
+        assert abs(q - scene.quality_for(target)) <= 1
+        q = rc.update(q, scene.size(q))
+        assert rc.scene_cuts == 1
+        assert scene.size(q) == pytest.approx(target, rel=0.05)
+
+
+class TestJpegRateClamp:
+    """质量范围限制测试"""
+
+    def test_clamped_to_quality_max(self):
+        scene = Scene(a=8.0, b=0.025)
+        rc = JpegRateController(scene.size(200), quality=50, quality_min=15, quality_max=85)
+        assert rc.update(50, scene.size(50)) == 85
+
+    def test_clamped_to_quality_min(self):
+        scene = Scene(a=8.0, b=0.025)
+        rc = JpegRateController(scene.size(-100), quality=50, quality_min=15, quality_max=85)
+        assert rc.update(50, scene.size(50)) == 15
+
+    def test_tiny_target_still_valid(self):
+        rc = JpegRateController(0, quality=50)
+        assert rc.target_frame_bytes == 1
+        assert rc.update(50, 1000) == rc.quality_min
@@ -0,0 +1,130 @@
+"""
+条带化 JPEG 单元测试（需要 OpenCV）
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+np = pytest.importorskip("numpy")
+pytest.importorskip("cv2")
+
+from network.jpeg_tiles import (TILE_HEADER, STRIPE_ALIGN, stripe_bounds,  # noqa: E402
+                                encode_tiles, packetize_tiles, parse_tiles,
+                                assemble_partial_tiles, decode_tiles)
+
+HEIGHT, WIDTH = 240, 320
+STRIPES = 4
+CHUNK = 1200
+
+
+@pytest.fixture
+def frame():
+    """带纹理的测试帧（每个条带编码后超过一个分片）"""
+    rng = np.random.default_rng(0)
+    y, x = np.mgrid[0:HEIGHT, 0:WIDTH]
+    img = np.stack([x % 256, y % 256, (x + y) % 256], axis=-1).astype(np.uint8)
+    return np.clip(img + rng.integers(0, 40, img.shape), 0, 255).astype(np.uint8)
+
+
+def stripe_of_chunks(chunks: list) -> list:
+    """每个分片所属的条带序号"""
+    owners, current = [], -1
+    for chunk in chunks:
+        if len(chunk) > TILE_HEADER.size and chunk[0] == STRIPES:
+            current = TILE_HEADER.unpack_from(chunk, 0)[1]
+        owners.append(current)
+    return owners
+
+
+def mean_error(a, b) -> float:
+    return float(np.abs(a.astype(np.int16) - b.astype(np.int16)).mean())
+
+
+class TestStripeBounds:
+
+    def test_aligned_and_covering(self):
+        bounds = stripe_bounds(HEIGHT, STRIPES)
+        assert len(bounds) == STRIPES
+        assert bounds[0][0] == 0 and bounds[-1][1] == HEIGHT
+        for (_, y1), (y0, _) in zip(bounds, bounds[1:]):
+            assert y1 == y0
+            assert y0 % STRIPE_ALIGN == 0
+
+    def test_small_frame_single_stripe(self):
+        assert stripe_bounds(10, 8) == [(0, 10)]
+
+
+class TestTilesRoundTrip:
+
+    def test_full_round_trip(self, frame):
+        data = encode_tiles(frame, STRIPES, 90)
+        chunks = packetize_tiles(data, CHUNK)
+        assert len(chunks) > STRIPES
+        assert b"".join(chunks) == data
+
+        received = dict(enumerate(chunks))
+        assert assemble_partial_tiles(received, len(chunks)) == data
+        records = parse_tiles(data)
+        assert [r[0] for r in records] == list(range(STRIPES))
+        image = decode_tiles(records, None)
+        assert image.shape == frame.shape
+        assert mean_error(image, frame) < 16
+
+    def test_parallel_encode_decode_matches(self, frame):
+        with ThreadPoolExecutor(max_workers=STRIPES) as pool:
+            data = encode_tiles(frame, STRIPES, 80, pool)
+            image = decode_tiles(parse_tiles(data), None, pool)
+        assert data == encode_tiles(frame, STRIPES, 80)
+        assert np.array_equal(image, decode_tiles(parse_tiles(data), None))
+
+    @pytest.mark.parametrize("lost_first", [True, False])
+    def test_lost_chunk_loses_only_its_stripe(self, frame, lost_first):
+        """丢失一个分片（条带首分片或后续分片）只损失所在条带，其余条带照常解码"""
+        data = encode_tiles(frame, STRIPES, 90)
+        chunks = packetize_tiles(data, CHUNK)
+        owners = stripe_of_chunks(chunks)
+        lost_stripe = 2
+        indices = [i for i, owner in enumerate(owners) if owner == lost_stripe]
+        assert len(indices) > 1
+        drop = indices[0] if lost_first else indices[1]
+
+        received = {i: c for i, c in enumerate(chunks) if i != drop}
+        partial = assemble_partial_tiles(received, len(chunks))
+        records = parse_tiles(partial)
+        assert [r[0] for r in records] == [i for i in range(STRIPES) if i != lost_stripe]
+
+        previous = np.full_like(frame, 77)
+        image = decode_tiles(records, previous.copy())
+        y0, y1 = stripe_bounds(HEIGHT, STRIPES)[lost_stripe]
+        # 丢失的条带保留上一帧内容，其余条带为新画面
+        assert np.array_equal(image[y0:y1], previous[y0:y1])
+        assert mean_error(image[:y0], frame[:y0]) < 16
+        assert mean_error(image[y1:], frame[y1:]) < 16
+
+
+class TestParseTiles:
+
+    def test_skips_fec_zero_padding(self, frame):
+        """FEC 恢复的分片补零到分片大小，解析时跳过"""
+        data = encode_tiles(frame, STRIPES, 90)
+        chunks = packetize_tiles(data, CHUNK)
+        padded = b"".join(chunk.ljust(CHUNK, b'\x00') for chunk in chunks)
+        assert len(padded) > len(data)
+        records = parse_tiles(padded)
+        assert [r[0] for r in records] == list(range(STRIPES))
+        assert records == parse_tiles(data)
+
+    def test_truncated_record_dropped(self, frame):
+        data = encode_tiles(frame, STRIPES, 90)
+        records = parse_tiles(data[:-10])
+        assert [r[0] for r in records] == list(range(STRIPES - 1))
+
+    def test_garbage_stops_parsing(self, frame):
+        data = encode_tiles(frame, 2, 90)
+        first_len = TILE_HEADER.size + TILE_HEADER.unpack_from(data, 0)[5]
+        corrupted = data[:first_len] + b'\x07garbage' + data[first_len:]
+        assert [r[0] for r in parse_tiles(corrupted)] == [0]
+
+    def test_decode_empty(self):
+        assert decode_tiles([], None) is None
@@ -0,0 +1,114 @@
+"""
+PacketPacer 单元测试
+"""
+
+import threading
+import time
+import pytest
+from network.pacer import PacketPacer
+
+ADDR = ("127.0.0.1", 5000)
+
+
+class Recorder:
+    """记录发送时刻的 send_fn"""
+
+    def __init__(self, expected: int = 0):
+        self.sent = []
+        self.expected = expected
+        self.done = threading.Event()
+
+    def __call__(self, packet: bytes, addr):
+        self.sent.append((time.perf_counter(), packet, addr))
+        if len(self.sent) >= self.expected:
+            self.done.set()
+
+
+class TestPacerRate:
+    """发送速率 / 清空期限测试（不启动发送线程）"""
+
+    def test_idle_rate_is_base_rate(self):
+        pacer = PacketPacer(Recorder(), target_bitrate_kbps=800, fps=30, pacing_factor=1.5)
+        assert pacer._current_rate() == pytest.approx(800 * 1000 / 8 * 1.5)
+
+    def test_backlog_raises_rate_to_meet_deadline(self):
+        pacer = PacketPacer(Recorder(), target_bitrate_kbps=100, fps=30, spread_fraction=0.5)
+        pacer.enqueue_frame([b'x' * 1000] * 50, ADDR)
+        deadline = pacer._drain_deadline
+        assert pacer.queued_bytes == 50000
+        # 期限前 10ms：需按 积压 / 剩余时间 发送
+        assert pacer._current_rate(deadline - 0.01) == pytest.approx(50000 / 0.01)
+        # 期限已过：按 1ms 计
+        assert pacer._current_rate(deadline + 0.5) == pytest.approx(50000 / 0.001)
+
+    def test_deadline_is_spread_fraction_of_frame_interval(self):
+        pacer = PacketPacer(Recorder(), target_bitrate_kbps=1000, fps=20, spread_fraction=0.5)
+        before = time.perf_counter()
+        pacer.enqueue_frame([b'x' * 100], ADDR)
+        after = time.perf_counter()
+        assert before + 0.025 <= pacer._drain_deadline <= after + 0.025
+
+    def test_configure_updates_base_rate(self):
+        pacer = PacketPacer(Recorder(), target_bitrate_kbps=1000, fps=30, pacing_factor=1.0)
+        pacer.configure(2000, 60)
+        assert pacer._current_rate() == pytest.approx(2000 * 1000 / 8)
+
+    def test_flush_drops_queue(self):
+        pacer = PacketPacer(Recorder(), target_bitrate_kbps=1000, fps=30)
+        pacer.enqueue_frame([b'x' * 100] * 5, ADDR)
+        pacer.enqueue_retransmit([b'r' * 100], ADDR)
+        pacer.flush()
+        assert pacer.queued_bytes == 0
+        assert pacer._current_rate() == pytest.approx(pacer._base_rate)
+
+
+class TestPacerSend:
+    """发送线程测试"""
+
+    def test_large_frame_drains_near_deadline(self):
+        """低基础速率下的大帧仍在 spread_fraction × 帧间隔 附近发完，而非按基础速率拖数秒"""
+        rec = Recorder(expected=50)
+        # 基础速率 18.75 KB/s，50 KB 按基础速率需约 2.7 秒；清空期限约 16.7 ms
+        pacer = PacketPacer(rec, target_bitrate_kbps=100, fps=30, spread_fraction=0.5)
+        pacer.start()
+        try:
+            start = time.perf_counter()
+            pacer.enqueue_frame([b'x' * 1000] * 50, ADDR)
+            assert rec.done.wait(1.0)
+        finally:
+            pacer.stop()
+        elapsed = rec.sent[-1][0] - start
+        assert elapsed < 0.2
+        # 令牌桶仍在摊开发送，而非一次性写出
+        assert elapsed > 0.005
+        assert pacer.packets_sent == 50
+        assert pacer.queued_bytes == 0
+
+    def test_retransmit_sent_first(self):
+        rec = Recorder(expected=4)
+        pacer = PacketPacer(rec, target_bitrate_kbps=8000, fps=30)
+        pacer.enqueue_frame([b'm1', b'm2', b'm3'], ADDR)
+        pacer.enqueue_retransmit([b'rt'], ADDR)
+        pacer.start()
+        try:
+            assert rec.done.wait(1.0)
+        finally:
+            pacer.stop()
+        assert [pkt for _, pkt, _ in rec.sent] == [b'rt', b'm1', b'm2', b'm3']
+        assert pacer.retransmits_sent == 1
+
+    def test_send_errors_counted(self):
+        def failing_send(packet, addr):
+            raise OSError("unreachable")
+
+        pacer = PacketPacer(failing_send, target_bitrate_kbps=8000, fps=30)
+        pacer.start()
+        try:
+            pacer.enqueue_frame([b'x'] * 3, ADDR)
+            deadline = time.perf_counter() + 1.0
+            while pacer.send_errors < 3 and time.perf_counter() < deadline:
+                time.sleep(0.005)
+        finally:
+            pacer.stop()
+        assert pacer.send_errors == 3
+        assert pacer.packets_sent == 0
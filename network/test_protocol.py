@@ -0,0 +1,47 @@
+"""
+Protocol 单元测试
+"""
+
+import pytest
+from network.protocol import (Protocol, VIDEO_FEEDBACK_ENTRY, VIDEO_FEEDBACK_MAX_ENTRIES)
+
+
+class TestVideoFeedback:
+    """传输层反馈编解码测试"""
+
+    def test_round_trip_max_entries(self):
+        """满载反馈（VIDEO_FEEDBACK_MAX_ENTRIES 条）往返不丢条目"""
+        base_t = 12345.678
+        arrivals = [(1000 + i // 10, i % 10, base_t + i * 0.000731)
+                    for i in range(VIDEO_FEEDBACK_MAX_ENTRIES)]
+        data = Protocol.build_video_feedback(7, base_t + 0.05, arrivals)
+
+        assert len(data) == 31 + VIDEO_FEEDBACK_MAX_ENTRIES * VIDEO_FEEDBACK_ENTRY.size
+        # 超过 1KB，接收端需按完整数据报大小接收
+        assert len(data) > 1024
+
+        seq, report_t, parsed = Protocol.parse_video_feedback(data)
+        assert seq == 7
+        assert report_t == pytest.approx(base_t + 0.05)
+        assert len(parsed) == VIDEO_FEEDBACK_MAX_ENTRIES
+        for (frame_id, chunk_idx, t), (p_frame, p_chunk, p_t) in zip(arrivals, parsed):
+            assert (p_frame, p_chunk) == (frame_id, chunk_idx)
+            assert p_t == pytest.approx(t, abs=1e-6)
+
+    def test_truncated_report_rejected(self):
+        """截断的反馈 CRC 校验失败"""
+        arrivals = [(1, i, 1.0 + i * 0.001) for i in range(VIDEO_FEEDBACK_MAX_ENTRIES)]
+        data = Protocol.build_video_feedback(1, 1.1, arrivals)
+        with pytest.raises(ValueError):
+            Protocol.parse_video_feedback(data[:1024])
+
+    def test_excess_entries_truncated_to_max(self):
+        """超出上限的条目不写入本条反馈"""
+        arrivals = [(1, i, 1.0) for i in range(VIDEO_FEEDBACK_MAX_ENTRIES + 5)]
+        _, _, parsed = Protocol.parse_video_feedback(Protocol.build_video_feedback(1, 1.0, arrivals))
+        assert len(parsed) == VIDEO_FEEDBACK_MAX_ENTRIES
+
+    def test_empty_report(self):
+        _, report_t, parsed = Protocol.parse_video_feedback(Protocol.build_video_feedback(3, 2.5, []))
+        assert report_t == pytest.approx(2.5)
+        assert parsed == []
@@ -0,0 +1,111 @@
+"""
+RetransmitCache 单元测试
+"""
+
+import pytest
+from network.retransmit_cache import RetransmitCache
+
+
+def frame(n: int, size: int = 100) -> list:
+    """n 个分片，内容带分片序号便于核对"""
+    return [bytes((i,)) * size for i in range(n)]
+
+
+class TestCacheRetention:
+    """保留时长 / 过期淘汰测试"""
+
+    def test_retention_follows_rtt(self):
+        cache = RetransmitCache(nack_window=0.15, rtt_factor=4.0,
+                                min_retention=0.15, max_retention=1.0)
+        cache.set_rtt(0.05)
+        assert cache.retention == pytest.approx(0.35)
+        cache.set_rtt(None)
+        assert cache.retention == pytest.approx(0.15)
+        cache.set_rtt(2.0)
+        assert cache.retention == pytest.approx(1.0)
+
+    def test_expired_frames_evicted(self):
+        cache = RetransmitCache(min_retention=0.2)
+        cache.put(1, frame(3), now=10.0)
+        cache.put(2, frame(3), now=10.1)
+        assert len(cache) == 2
+        # 帧 1 超出保留时长，帧 2 仍在窗口内
+        cache.put(3, frame(3), now=10.25)
+        assert len(cache) == 2
+        assert cache.get(1, [0]) == []
+        assert cache.get(2, [0]) == [frame(3)[0]]
+        assert cache.evicted_expired == 1
+        assert cache.evicted_budget == 0
+
+    def test_newest_frame_kept_after_expiry(self):
+        cache = RetransmitCache(min_retention=0.1)
+        cache.put(1, frame(2), now=0.0)
+        cache.put(2, frame(2), now=5.0)
+        assert len(cache) == 1
+        assert cache.get(2, [1]) == [frame(2)[1]]
+        assert cache.queued_bytes == 200
+
+
+class TestCacheBudget:
+    """字节预算测试"""
+
+    def test_oldest_evicted_over_budget(self):
+        cache = RetransmitCache(max_bytes=1000, min_retention=10.0, max_retention=10.0)
+        for key in range(5):
+            cache.put(key, frame(3), now=0.0)
+        # 每帧 300B，预算 1000B 内最多保留 3 帧
+        assert len(cache) == 3
+        assert cache.queued_bytes == 900
+        assert cache.evicted_budget == 2
+        assert cache.evicted_expired == 0
+        assert cache.get(1, [0]) == []
+        assert cache.get(2, [0]) == [frame(3)[0]]
+
+    def test_newest_frame_kept_over_budget(self):
+        """单帧超过预算时仍保留最新一帧"""
+        cache = RetransmitCache(max_bytes=500, min_retention=10.0, max_retention=10.0)
+        cache.put(1, frame(2), now=0.0)
+        cache.put(2, frame(10), now=0.0)
+        assert len(cache) == 1
+        assert cache.queued_bytes == 1000
+        assert cache.get(2, [9]) == [frame(10)[9]]
+
+    def test_duplicate_put_ignored(self):
+        cache = RetransmitCache()
+        cache.put(1, frame(2), now=0.0)
+        cache.put(1, frame(5), now=0.0)
+        assert len(cache) == 1
+        assert cache.queued_bytes == 200
+
+    def test_clear(self):
+        cache = RetransmitCache()
+        cache.put(1, frame(2), now=0.0)
+        cache.clear()
+        assert len(cache) == 0
+        assert cache.queued_bytes == 0
+        assert cache.get(1, [0]) == []
+
+
+class TestCacheLookup:
+    """查找与命中统计测试"""
+
+    def test_hits_and_misses(self):
+        cache = RetransmitCache()
+        packets = frame(4)
+        cache.put(("L0", 7), packets, now=0.0)
+        assert cache.get(("L0", 7), [3, 1]) == [packets[3], packets[1]]
+        assert (cache.hits, cache.misses) == (2, 0)
+        # 索引越界的分片计入未命中
+        assert cache.get(("L0", 7), [2, 4]) == [packets[2]]
+        assert (cache.hits, cache.misses) == (3, 1)
+        # 未缓存的帧：请求的分片全部未命中
+        assert cache.get(("L1", 7), [0, 1]) == []
+        assert (cache.hits, cache.misses) == (3, 3)
+        assert cache.hit_rate == pytest.approx(0.5)
+
+    def test_empty_stats(self):
+        cache = RetransmitCache()
+        assert cache.hit_rate == 1.0
+        stats = cache.get_stats()
+        assert stats['rtx_cache_frames'] == 0
+        assert stats['rtx_cache_hits'] == stats['rtx_cache_misses'] == 0
@@ -0,0 +1,102 @@
+"""控制发送调度 - 绝对截止时间节拍（粗睡眠 + 末段自旋），统计发送时刻抖动"""
+
+import time
+from typing import List, Optional
+
+from logic.latency_histogram import WindowedLatencyHistogram
+
+MAX_SEND_RATE = 1000
+# 截止前最后一段自旋等待（秒），覆盖内核 timer slack 与唤醒延迟
+DEFAULT_SPIN = 0.0002
+# 抖动直方图区间上界（微秒）
+JITTER_BUCKETS_US = (10, 20, 50, 100, 200, 500, 1000, 2000, 5000)
+
+
+class DeadlineScheduler:
+    """
+    固定频率发送节拍
+
+    - 第 k 个节拍的截止时间为 start + k × period（绝对时间），唤醒延迟不会累积为周期漂移；
+      落后超过一个周期时跳过错过的节拍（计入 missed），不补发
+    - wait() 睡到发送节拍与调用方给出的其他截止时间（重传检查）中较早者，
+      先 time.sleep 到截止前 spin 秒（Linux 上为 clock_nanosleep），再自旋到截止时刻
+    - 每个发送节拍的实际唤醒时刻 - 截止时刻记入抖动直方图
+
+    其他 Python 线程持续占用 GIL 时，唤醒后取回 GIL 最长需 sys.getswitchinterval()
+    （默认 5 ms），此时抖动由 GIL 切换间隔决定而非定时精度。
+    """
+
+    def __init__(self, rate_hz: float, spin: float = DEFAULT_SPIN):
+        self.spin = spin
+        self.rate = 0.0
+        self.period = 0.0
+        self.set_rate(rate_hz)
+        self._next: Optional[float] = None
+
+        self.jitter = WindowedLatencyHistogram()
+        self.ticks = 0
+        self.missed = 0
+        self.wakeups = 0
+
+    def set_rate(self, rate_hz: float):
+        """修改发送频率（1 ~ MAX_SEND_RATE Hz），从下一个节拍之后生效"""
+        self.rate = max(1.0, min(float(MAX_SEND_RATE), float(rate_hz)))
+        self.period = 1.0 / self.rate
+
+    def start(self, now: Optional[float] = None):
+        """以 now 为基准，第一个节拍在一个周期之后"""
+        self._next = (time.perf_counter() if now is None else now) + self.period
+
+    @property
+    def next_deadline(self) -> Optional[float]:
+        return self._next
+
+    def sleep_until(self, deadline: float) -> float:
+        """睡到 deadline（perf_counter 时间），返回实际醒来时刻"""
+        remaining = deadline - time.perf_counter()
+        if remaining > self.spin:
+            time.sleep(remaining - self.spin)
+        now = time.perf_counter()
+        while now < deadline:
+            now = time.perf_counter()
+        return now
+
+    def wait(self, other_deadline: Optional[float] = None) -> bool:
+        """等待下一个事件，发送节拍到达返回 True，先到达的是 other_deadline 返回 False"""
+        if self._next is None:
+            self.start()
+        deadline = self._next if other_deadline is None else min(self._next, other_deadline)
+        now = self.sleep_until(deadline)
+        self.wakeups += 1
+        if now < self._next:
+            return False
+
+        self.jitter.record(now - self._next)
+        self.ticks += 1
+        self._next += self.period
+        if now >= self._next:
+            skipped = int((now - self._next) / self.period) + 1
+            self.missed += skipped
+            self._next += skipped * self.period
+        return True
+
+    def get_statistics(self) -> dict:
+        """发送节拍统计：频率、抖动分位数（µs）、直方图（JITTER_BUCKETS_US 各区间计数）"""
+        window = self.jitter.windowed()
+        stats = {
+            "tx_rate_hz": self.rate,
+            "tx_ticks": self.ticks,
+            "tx_missed_ticks": self.missed,
+            "tx_wakeups": self.wakeups,
+            "tx_jitter_hist": self.jitter_histogram(window),
+        }
+        for p, value in window.percentiles((50.0, 99.0, 99.9)).items():
+            stats[f"tx_jitter_p{p:g}_us".replace(".", "")] = value * 1e6
+        if window.max_us is not None:
+            stats["tx_jitter_max_us"] = float(window.max_us)
+        return stats
+
+    def jitter_histogram(self, window=None) -> List[int]:
+        if window is None:
+            window = self.jitter.windowed()
+        return window.bucket_counts([edge / 1e6 for edge in JITTER_BUCKETS_US])
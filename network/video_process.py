@@ -8,10 +8,13 @@ import logging
 import numpy as np
 from typing import Optional
 from config import Config
+from logic.frame_tracer import FrameTrace
 
 logger = logging.getLogger(__name__)
 
-_HEADER = 8  # [frame_counter:4][padding:4]
+_COUNTER_SIZE = 8  # [frame_counter:4][padding:4]
+_TRACE_OFFSET = _COUNTER_SIZE  # 每个帧缓冲对应一个 FrameTrace 槽
+_HEADER = _COUNTER_SIZE + FrameTrace.SHM_SIZE * 2
 _FRAME_SIZE = Config.RENDER_WIDTH * Config.RENDER_HEIGHT * 3
 
 
@@ -32,12 +35,16 @@ def _receiver_main(port, server_addr, shm_name, stats_q, stop_evt):
 
     try:
         while not stop_evt.is_set():
-            frame = receiver.get_latest_frame()
+            frame, trace = receiver.get_latest_frame_with_trace()
             if frame is not None and isinstance(frame, np.ndarray):
                 if frame.shape == (h, w, 3):
                     buf_idx = frame_counter % 2
                     offset = _HEADER + buf_idx * _FRAME_SIZE
                     shm.buf[offset:offset + _FRAME_SIZE] = frame.tobytes()
+                    if trace is None:
+                        trace = FrameTrace()
+                    trace.published = time.perf_counter()
+                    trace.pack_into(shm.buf, _TRACE_OFFSET + buf_idx * FrameTrace.SHM_SIZE)
                     frame_counter += 1
                     struct.pack_into("=I", shm.buf, 0, frame_counter)
 
@@ -71,6 +78,7 @@ class VideoReceiverProcess:
         self._stop_evt: Optional[multiprocessing.Event] = None
         self._last_counter = 0
         self._last_stats: dict = {}
+        self.latest_trace: Optional[FrameTrace] = None  # get_latest_frame 返回帧的追踪信息
 
     def start(self):
         if self.is_running:
@@ -121,6 +129,8 @@ class VideoReceiverProcess:
             return None
         self._last_counter = counter
         read_idx = (counter - 1) % 2
+        self.latest_trace = FrameTrace.unpack_from(
+            self._shm.buf, _TRACE_OFFSET + read_idx * FrameTrace.SHM_SIZE)
         offset = _HEADER + read_idx * _FRAME_SIZE
         frame = np.frombuffer(
             bytes(self._shm.buf[offset:offset + _FRAME_SIZE]),
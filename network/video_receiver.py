@@ -6,18 +6,26 @@ import socket
 import queue
 import logging
 import time
+import os
 import numpy as np
 import cv2
 from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from typing import Optional, Callable, Dict
 from config import Config
-from network.protocol import Protocol
+from network.protocol import (Protocol, MAGIC, VIDEO_HEADER, VIDEO_HEADER_TRACE,
+                              VIDEO_FEEDBACK_MAX_ENTRIES, MSG_TYPE_LAYER_INFO)
 from network.fec import FECDecoder, FEC_AVAILABLE
-from network.h264_decoder import H264Decoder, H264_AVAILABLE
+from network.h264_decoder import H264Decoder, H264_AVAILABLE, scan_access_unit
+from network.jpeg_tiles import parse_tiles, assemble_partial_tiles, decode_tiles
+from logic.frame_tracer import FrameTrace
 
 
 logger = logging.getLogger(__name__)
 
+# 视频端口上的控制消息（层信息）以 Magic 开头，CRC 校验排除与分片头的误判
+_MAGIC_BYTES = struct.pack('=H', MAGIC)
+
 
 class VideoReceiver:
     """视频接收 - 分片重组 + 渲染队列"""
@@ -41,6 +49,11 @@ class VideoReceiver:
         self._nack_timeout = 0.05  # 50ms 后检测不完整帧
         self._nack_max_retries = 2
 
+        # 传输层反馈：[(frame_id, chunk_idx, arrival_t)]，定期上报给机载端做拥塞控制
+        self._arrivals: list = []
+        self._feedback_seq = 0
+        self._last_feedback_time = 0.0
+
         # FEC 解码器
         self._fec_decoder = FECDecoder(Config.FEC_REDUNDANCY) if FEC_AVAILABLE else None
         self._frame_fec_info: Dict[int, tuple] = {}  # {frame_id: (orig_chunks, total_with_fec)}
@@ -50,6 +63,34 @@ class VideoReceiver:
         self._h264_decoder = H264Decoder() if H264_AVAILABLE else None
         self._frame_codec: Dict[int, int] = {}  # {frame_id: codec_flag}
 
+        # 条带化 JPEG：并行解码各条带，合成到持久画布（丢失的条带保留上一帧内容）
+        self._tile_pool: Optional[ThreadPoolExecutor] = None
+        self._tile_canvas: Optional[np.ndarray] = None
+
+        # 参考帧丢失后的恢复追踪：等待 IDR，或恢复点 SEI + recovery_frame_cnt 帧（intra-refresh）
+        self._recovery_pending = False
+        self._recovery_since = 0.0
+        self._recovery_countdown: Optional[int] = None
+        self.recoveries = 0
+        self._last_recovery_ms = 0.0
+
+        # 关键帧请求（PLI）
+        self._keyframe_request_seq = 0
+        self._last_keyframe_request = 0.0
+        self.keyframe_requests_sent = 0
+
+        # 多分辨率层：机载端通告 [(width, height, kbps)]，按窗口与丢包选择订阅层
+        self._layers: list = []
+        self._layer = 0
+        self._requested_layer: Optional[int] = None
+        self._layer_select_seq = 0
+        self._last_layer_select = 0.0
+        self._last_layer_loss = time.time()
+        self.layer_switches = 0
+
+        # 帧延迟追踪 {frame_id: FrameTrace}
+        self._frame_trace: Dict[int, FrameTrace] = {}
+
         # 回调
         self.on_frame_received: Optional[Callable] = None
         self.on_error: Optional[Callable] = None
@@ -65,6 +106,7 @@ class VideoReceiver:
         self._last_encode_time_ms = 0.0
         self.decode_errors = 0
         self.crc_errors = 0
+        self.partial_frames = 0
 
         # 滑动窗口丢包率（基于 frame_id 连续性）
         self._frame_events: deque = deque(maxlen=500)  # (time, expected, received)
@@ -84,6 +126,11 @@ class VideoReceiver:
             self._frame_buffer.clear()
             self._frame_info.clear()
             self._last_completed_frame_id = 0
+            self._arrivals = []
+        self._layers = []
+        self._layer = 0
+        self._requested_layer = None
+        self._tile_canvas = None
         threading.Thread(target=self._rx_thread, daemon=True).start()
         logger.info(f"VideoReceiver started (port: {self.port})")
 
@@ -146,13 +193,24 @@ class VideoReceiver:
                 except Exception as e:
                     if self.is_running:
                         logger.error(f"Receive error: {e}")
-                # 每次循环检查不完整帧
+                # 每次循环检查不完整帧、上报传输层反馈、恢复前重发关键帧请求
                 self._check_incomplete_frames()
+                self._send_transport_feedback()
+                self._request_keyframe_if_needed()
+                self._adapt_layer()
         except Exception as e:
             logger.error(f"RX thread error: {e}")
 
     def _process_packet(self, data: bytes):
         """处理分片包 - 支持旧格式(12B头)和新格式(15B头含FEC)"""
+        arrival_t = time.perf_counter()
+        if data[:2] == _MAGIC_BYTES and len(data) >= 15 and data[3] == MSG_TYPE_LAYER_INFO:
+            try:
+                _, current, layers = Protocol.parse_layer_info(data)
+                self._on_layer_info(current, layers)
+                return
+            except ValueError:
+                pass  # 恰好以 Magic 开头的视频分片
         with self._stats_lock:
             self.packets_received += 1
             self.bytes_received += len(data)
@@ -162,54 +220,20 @@ class VideoReceiver:
                 self.crc_errors += 1
             return
 
-        # 尝试新格式 20B: [frame_id:4][total:2][idx:2][size:4][fec_flag:1][orig_chunks:2][codec:1][encode_ms:4]
-        if len(data) >= 20:
-            frame_id, total_chunks, chunk_idx, chunk_size, fec_flag, orig_chunks, codec_flag, encode_ms = \
-                struct.unpack("=IHHIBHBf", data[:20])
-            if fec_flag <= 1 and orig_chunks <= total_chunks and chunk_size <= len(data) - 20:
-                payload = data[20:20 + chunk_size]
-                has_fec = True
-                with self._stats_lock:
-                    self._last_encode_time_ms = encode_ms
-            else:
-                # 回退 16B 格式
-                frame_id, total_chunks, chunk_idx, chunk_size, fec_flag, orig_chunks, codec_flag = \
-                    struct.unpack("=IHHIBHB", data[:16])
-                if fec_flag <= 1 and orig_chunks <= total_chunks and chunk_size <= len(data) - 16:
-                    payload = data[16:16 + chunk_size]
-                    has_fec = True
-                else:
-                    frame_id, total_chunks, chunk_idx, chunk_size = struct.unpack("=IHHI", data[:12])
-                    payload = data[12:12 + chunk_size]
-                    has_fec = False
-                    orig_chunks = total_chunks
-                    fec_flag = 0
-                    codec_flag = 0
-        elif len(data) >= 16:
-            frame_id, total_chunks, chunk_idx, chunk_size, fec_flag, orig_chunks, codec_flag = \
-                struct.unpack("=IHHIBHB", data[:16])
-            if fec_flag <= 1 and orig_chunks <= total_chunks and chunk_size <= len(data) - 16:
-                payload = data[16:16 + chunk_size]
-                has_fec = True
-            else:
-                # 回退旧格式
-                frame_id, total_chunks, chunk_idx, chunk_size = struct.unpack("=IHHI", data[:12])
-                payload = data[12:12 + chunk_size]
-                has_fec = False
-                orig_chunks = total_chunks
-                fec_flag = 0
-                codec_flag = 0
-        else:
-            frame_id, total_chunks, chunk_idx, chunk_size = struct.unpack("=IHHI", data[:12])
-            payload = data[12:12 + chunk_size]
-            has_fec = False
-            orig_chunks = total_chunks
-            fec_flag = 0
-            codec_flag = 0
+        (frame_id, total_chunks, chunk_idx, fec_flag, orig_chunks, codec_flag,
+         has_fec, payload, air_ts) = self._parse_header(data)
+
+        with self._stats_lock:
+            # 正常情况下攒满一条反馈即发出；上限仅在反馈发送停滞时防止无限增长
+            if len(self._arrivals) < VIDEO_FEEDBACK_MAX_ENTRIES * 16:
+                self._arrivals.append((frame_id, chunk_idx, arrival_t))
 
         completed_frame_data = None
         completed_frame_codec = 0
         completed_frame_id = 0
+        completed_trace = None
+        reference_lost = False
+        partial_data = []
 
         with self._buffer_lock:
             if frame_id <= self._last_completed_frame_id:
@@ -220,6 +244,10 @@ class VideoReceiver:
                 self._frame_info[frame_id] = total_chunks
                 self._frame_first_seen[frame_id] = time.time()
                 self._frame_codec[frame_id] = codec_flag
+                trace = FrameTrace(frame_id=frame_id, first_packet=time.perf_counter())
+                if air_ts:
+                    trace.capture, trace.encode_done, trace.first_send = air_ts
+                self._frame_trace[frame_id] = trace
                 if has_fec:
                     self._frame_fec_info[frame_id] = (orig_chunks, total_chunks)
                     self._chunk_sizes[frame_id] = {}
@@ -238,39 +266,113 @@ class VideoReceiver:
                     completed_frame_data = frame_data
                     completed_frame_codec = self._frame_codec.get(frame_id, 0)
                     completed_frame_id = frame_id
+                    completed_trace = self._frame_trace.get(frame_id)
+                    if completed_trace:
+                        completed_trace.reassembled = time.perf_counter()
                     prev_id = self._last_completed_frame_id
                     self._last_completed_frame_id = frame_id
 
                     now = time.time()
                     skipped = max(0, frame_id - prev_id - 1) if prev_id > 0 else 0
+                    reference_lost = skipped > 0 and completed_frame_codec == 1
                     with self._stats_lock:
                         self._frame_events.append((now, 1 + skipped, 1))
 
                     stale = [fid for fid in self._frame_buffer if fid <= frame_id]
-                    for fid in stale:
-                        del self._frame_buffer[fid]
-                        self._frame_info.pop(fid, None)
-                        self._frame_first_seen.pop(fid, None)
-                        self._nack_count.pop(fid, None)
-                        self._frame_fec_info.pop(fid, None)
-                        self._chunk_sizes.pop(fid, None)
-                        self._frame_codec.pop(fid, None)
+                    for fid in sorted(stale):
+                        if fid < frame_id and self._frame_codec.get(fid) == 1:
+                            partial = self._assemble_partial(fid)
+                            if partial:
+                                partial_data.append((partial, self._frame_trace.get(fid)))
+                        self._discard_frame(fid)
 
         # 解码和 ACK 在锁外执行，避免阻塞后续包的接收
         if completed_frame_data is not None:
+            if reference_lost:
+                self._mark_reference_loss()
             self._send_video_ack(completed_frame_id)
-            self._decode_and_enqueue(completed_frame_data, completed_frame_codec)
+            # 先按顺序解码不完整帧中到达的 slice，保持参考帧尽量完整
+            for partial, trace in partial_data:
+                with self._stats_lock:
+                    self.partial_frames += 1
+                self._decode_and_enqueue(partial, 1, trace)
+            self._decode_and_enqueue(completed_frame_data, completed_frame_codec, completed_trace)
+
+    def _discard_frame(self, frame_id: int):
+        """删除一帧的重组状态（在 _buffer_lock 内调用）"""
+        self._frame_buffer.pop(frame_id, None)
+        self._frame_info.pop(frame_id, None)
+        self._frame_first_seen.pop(frame_id, None)
+        self._nack_count.pop(frame_id, None)
+        self._frame_fec_info.pop(frame_id, None)
+        self._chunk_sizes.pop(frame_id, None)
+        self._frame_codec.pop(frame_id, None)
+        self._frame_trace.pop(frame_id, None)
+
+    def _drop_frames_through(self, frame_id: int):
+        """放弃 frame_id 及之前所有未完成的帧（在 _buffer_lock 内调用），计入丢帧"""
+        prev_id = self._last_completed_frame_id
+        self._last_completed_frame_id = frame_id
+        skipped = frame_id - prev_id - 1 if prev_id > 0 else 0
+        with self._stats_lock:
+            self._frame_events.append((time.time(), 1 + max(0, skipped), 0))
+        for fid in [fid for fid in self._frame_buffer if fid <= frame_id]:
+            self._discard_frame(fid)
+
+    def _parse_header(self, data: bytes) -> tuple:
+        """解析分片头 — 按 44B(含时间戳) → 20B → 16B → 12B 顺序尝试
+
+        chunk_size 必须与剩余负载长度吻合，短格式的包不会被误判为长格式。
+
+        Returns:
+            (frame_id, total_chunks, chunk_idx, fec_flag, orig_chunks, codec_flag,
+             has_fec, payload, air_ts)，air_ts 为 (capture, encode_done, first_send) 或 None
+        """
+        if len(data) >= VIDEO_HEADER_TRACE.size:
+            (frame_id, total_chunks, chunk_idx, chunk_size, fec_flag, orig_chunks, codec_flag,
+             encode_ms, capture_t, encode_done_t, first_send_t) = VIDEO_HEADER_TRACE.unpack_from(data)
+            if (fec_flag <= 1 and orig_chunks <= total_chunks
+                    and chunk_size == len(data) - VIDEO_HEADER_TRACE.size):
+                with self._stats_lock:
+                    self._last_encode_time_ms = encode_ms
+                payload = data[VIDEO_HEADER_TRACE.size:]
+                return (frame_id, total_chunks, chunk_idx, fec_flag, orig_chunks, codec_flag,
+                        True, payload, (capture_t, encode_done_t, first_send_t))
 
-    def _enqueue_frame(self, frame):
-        """放入渲染队列"""
+        if len(data) >= VIDEO_HEADER.size:
+            frame_id, total_chunks, chunk_idx, chunk_size, fec_flag, orig_chunks, codec_flag, encode_ms = \
+                VIDEO_HEADER.unpack_from(data)
+            if fec_flag <= 1 and orig_chunks <= total_chunks and chunk_size <= len(data) - 20:
+                with self._stats_lock:
+                    self._last_encode_time_ms = encode_ms
+                return (frame_id, total_chunks, chunk_idx, fec_flag, orig_chunks, codec_flag,
+                        True, data[20:20 + chunk_size], None)
+
+        if len(data) >= 16:
+            frame_id, total_chunks, chunk_idx, chunk_size, fec_flag, orig_chunks, codec_flag = \
+                struct.unpack("=IHHIBHB", data[:16])
+            if fec_flag <= 1 and orig_chunks <= total_chunks and chunk_size <= len(data) - 16:
+                return (frame_id, total_chunks, chunk_idx, fec_flag, orig_chunks, codec_flag,
+                        True, data[16:16 + chunk_size], None)
+
+        # 旧格式 12B
+        frame_id, total_chunks, chunk_idx, chunk_size = struct.unpack("=IHHI", data[:12])
+        return (frame_id, total_chunks, chunk_idx, 0, total_chunks, 0,
+                False, data[12:12 + chunk_size], None)
+
+    def _enqueue_frame(self, frame, trace: Optional[FrameTrace] = None):
+        """放入渲染队列（附带帧追踪）"""
+        if trace is not None:
+            trace.decoded = time.perf_counter()
+        item = (frame, trace)
         try:
-            self.render_queue.put_nowait(frame)
+            self.render_queue.put_nowait(item)
         except queue.Full:
             try:
                 self.render_queue.get_nowait()
             except queue.Empty:
                 pass
-            self.render_queue.put_nowait(frame)
+            self.render_queue.put_nowait(item)
             with self._stats_lock:
                 self.frames_dropped += 1
 
@@ -278,6 +380,32 @@ class VideoReceiver:
             self.frames_received += 1
             self._last_frame_time = time.time()
 
+    def _assemble_partial(self, frame_id: int) -> Optional[bytes]:
+        """
+        不完整 H.264 帧：按序拼接到达的 data 分片（在 _buffer_lock 内调用）
+
+        分片按 NAL 边界对齐，以起始码开头的分片可独立解码；不以起始码开头的是超长
+        NAL 的后续部分，只有前一分片也在时才保留。
+        """
+        received = self._frame_buffer.get(frame_id)
+        if not received:
+            return None
+        fec_info = self._frame_fec_info.get(frame_id)
+        n_data = fec_info[0] if fec_info else self._frame_info.get(frame_id, 0)
+        parts = []
+        prev_kept = False
+        for idx in range(n_data):
+            chunk = received.get(idx)
+            if chunk is None:
+                prev_kept = False
+                continue
+            if chunk.startswith(b'\x00\x00\x01') or chunk.startswith(b'\x00\x00\x00\x01') or prev_kept:
+                parts.append(chunk)
+                prev_kept = True
+            else:
+                prev_kept = False
+        return b"".join(parts) if parts else None
+
     def _try_reassemble(self, frame_id: int, orig_chunks: int, total_chunks: int, has_fec: bool) -> Optional[bytes]:
         """尝试重组帧数据，必要时使用 FEC 恢复"""
         received = self._frame_buffer[frame_id]
@@ -296,7 +424,8 @@ class VideoReceiver:
 
         return None
 
-    def _decode_and_enqueue(self, frame_data: bytes, codec: int = 0):
+    def _decode_and_enqueue(self, frame_data: bytes, codec: int = 0,
+                            trace: Optional[FrameTrace] = None):
         """解码帧数据并放入渲染队列"""
         decode_start = time.perf_counter()
 
@@ -305,10 +434,18 @@ class VideoReceiver:
             if not frames:
                 with self._stats_lock:
                     self.decode_errors += 1
+                self._mark_reference_loss()
+            else:
+                self._update_recovery(*scan_access_unit(frame_data))
             for frame in frames:
                 if frame.shape[1] != Config.RENDER_WIDTH or frame.shape[0] != Config.RENDER_HEIGHT:
                     frame = cv2.resize(frame, (Config.RENDER_WIDTH, Config.RENDER_HEIGHT))
-                self._enqueue_frame(frame)
+                self._enqueue_frame(frame, trace)
+            self._last_decode_time_ms = (time.perf_counter() - decode_start) * 1000
+            return
+
+        if codec == 2:
+            self._decode_tiles(frame_data, trace)
             self._last_decode_time_ms = (time.perf_counter() - decode_start) * 1000
             return
 
@@ -317,26 +454,155 @@ class VideoReceiver:
         if len(frame_data) == expected_raw:
             frame = np.frombuffer(frame_data, dtype=np.uint8).reshape(
                 (Config.RENDER_HEIGHT, Config.RENDER_WIDTH, 3))
-            self._enqueue_frame(frame)
+            self._enqueue_frame(frame, trace)
         else:
             jpg_arr = np.frombuffer(frame_data, dtype=np.uint8)
             frame = cv2.imdecode(jpg_arr, cv2.IMREAD_COLOR)
             if frame is not None:
                 if frame.shape[1] != Config.RENDER_WIDTH or frame.shape[0] != Config.RENDER_HEIGHT:
                     frame = cv2.resize(frame, (Config.RENDER_WIDTH, Config.RENDER_HEIGHT))
-                self._enqueue_frame(frame)
+                self._enqueue_frame(frame, trace)
             else:
                 with self._stats_lock:
                     self.decode_errors += 1
 
         self._last_decode_time_ms = (time.perf_counter() - decode_start) * 1000
 
+    def _decode_tiles(self, frame_data: bytes, trace: Optional[FrameTrace] = None):
+        """条带化 JPEG：并行解码条带并合成（不完整帧只含到达的条带）"""
+        records = parse_tiles(frame_data)
+        if self._tile_pool is None:
+            self._tile_pool = ThreadPoolExecutor(max(1, min(8, os.cpu_count() or 1)),
+                                                 thread_name_prefix="jpeg-tile")
+        canvas = decode_tiles(records, self._tile_canvas, self._tile_pool)
+        if canvas is None:
+            with self._stats_lock:
+                self.decode_errors += 1
+            return
+        self._tile_canvas = canvas
+        if canvas.shape[1] != Config.RENDER_WIDTH or canvas.shape[0] != Config.RENDER_HEIGHT:
+            frame = cv2.resize(canvas, (Config.RENDER_WIDTH, Config.RENDER_HEIGHT))
+        else:
+            frame = canvas.copy()  # 画布会被后续条带就地更新
+        self._enqueue_frame(frame, trace)
+
+    def _mark_reference_loss(self):
+        """参考链断裂（帧缺失或解码失败），之后的画面在恢复前可能有残影，立即请求关键帧"""
+        with self._stats_lock:
+            first_loss = not self._recovery_pending
+            if first_loss:
+                self._recovery_pending = True
+                self._recovery_since = time.perf_counter()
+            self._recovery_countdown = None
+        if first_loss:
+            self._request_keyframe_if_needed()
+
+    def _request_keyframe_if_needed(self):
+        """参考链断裂且尚未恢复时发送关键帧请求（按 KEYFRAME_REQUEST_INTERVAL 限频）"""
+        if not self.server_addr or not self.socket or not self._recovery_pending:
+            return
+        now = time.perf_counter()
+        if now - self._last_keyframe_request < Config.KEYFRAME_REQUEST_INTERVAL:
+            return
+        self._last_keyframe_request = now
+        self._keyframe_request_seq += 1
+        try:
+            data = Protocol.build_keyframe_request(self._keyframe_request_seq,
+                                                   self._last_completed_frame_id)
+            self.socket.sendto(data, self.server_addr)
+            with self._stats_lock:
+                self.keyframe_requests_sent += 1
+            logger.debug(f"Keyframe request sent (last frame {self._last_completed_frame_id})")
+        except Exception as e:
+            logger.debug(f"Keyframe request send failed: {e}")
+
+    def _on_layer_info(self, current: int, layers: list):
+        """机载端通告的层列表与当前层"""
+        with self._stats_lock:
+            if self._layers and current != self._layer and current < len(layers):
+                self.layer_switches += 1
+                logger.info(f"Video layer switched: L{self._layer} -> L{current} "
+                            f"({layers[current][0]}x{layers[current][1]})")
+            self._layers = layers
+            self._layer = current
+        if self._requested_layer == current:
+            self._requested_layer = None
+
+    def _fit_layer(self) -> int:
+        """适配渲染窗口的最低分辨率层（分辨率不低于窗口，否则取层 0）"""
+        fit = 0
+        for index, (width, height, _) in enumerate(self._layers):
+            if width >= Config.RENDER_WIDTH and height >= Config.RENDER_HEIGHT:
+                fit = index
+        return fit
+
+    def _adapt_layer(self):
+        """按窗口与丢包选择订阅层：丢包降层、持续无丢包升层（不超过适配窗口的层）"""
+        if not self.server_addr or not self.socket or not self._layers:
+            return
+        now = time.time()
+        with self._stats_lock:
+            loss = self._calc_recent_loss(1.0)
+        if loss > Config.SIMULCAST_DOWNGRADE_LOSS:
+            self._last_layer_loss = now
+        if now - self._last_layer_select < Config.SIMULCAST_SWITCH_INTERVAL:
+            return
+
+        target = self._requested_layer  # 未确认的请求按间隔重发
+        if target is None:
+            fit = self._fit_layer()
+            if self._layer < fit:
+                target = fit
+            elif loss > Config.SIMULCAST_DOWNGRADE_LOSS and self._layer < len(self._layers) - 1:
+                target = self._layer + 1
+            elif self._layer > fit and now - self._last_layer_loss >= Config.SIMULCAST_UPGRADE_HOLD:
+                target = self._layer - 1
+            else:
+                return
+        self.select_layer(target)
+
+    def select_layer(self, layer: int):
+        """请求切换到指定层（0 为最高分辨率），机载端在该层的下一个 IDR 处切换"""
+        if not self.server_addr or not self.socket:
+            return
+        self._requested_layer = layer
+        self._last_layer_select = time.time()
+        self._layer_select_seq += 1
+        try:
+            self.socket.sendto(Protocol.build_layer_select(self._layer_select_seq, layer),
+                               self.server_addr)
+            logger.debug(f"Layer select sent: L{self._layer} -> L{layer}")
+        except Exception as e:
+            logger.debug(f"Layer select send failed: {e}")
+
+    def _update_recovery(self, is_idr: bool, recovery_cnt: Optional[int]):
+        """根据已解码帧的 IDR / 恢复点信息推进恢复状态"""
+        with self._stats_lock:
+            if not self._recovery_pending:
+                return
+            if is_idr:
+                self._recovery_countdown = 0
+            elif recovery_cnt is not None and self._recovery_countdown is None:
+                # 丢失之后出现的恢复点：再解码 recovery_frame_cnt 帧后画面完整
+                self._recovery_countdown = recovery_cnt
+            elif self._recovery_countdown is not None:
+                self._recovery_countdown -= 1
+            if self._recovery_countdown is not None and self._recovery_countdown <= 0:
+                self._recovery_pending = False
+                self._recovery_countdown = None
+                self._last_recovery_ms = (time.perf_counter() - self._recovery_since) * 1000
+                self.recoveries += 1
+
     def get_latest_frame(self):
         """获取最新帧（numpy array 或 None）"""
+        return self.get_latest_frame_with_trace()[0]
+
+    def get_latest_frame_with_trace(self) -> tuple:
+        """获取最新帧及其追踪信息，返回 (frame, FrameTrace) 或 (None, None)"""
         try:
             return self.render_queue.get_nowait()
         except queue.Empty:
-            return None
+            return None, None
 
     def get_statistics(self) -> dict:
         with self._stats_lock:
@@ -352,6 +618,14 @@ class VideoReceiver:
                 "decode_errors": self.decode_errors,
                 "crc_errors": self.crc_errors,
                 "keyframe_interval": 30,
+                "awaiting_recovery": self._recovery_pending,
+                "recovery_time_ms": self._last_recovery_ms,
+                "recoveries": self.recoveries,
+                "keyframe_requests_sent": self.keyframe_requests_sent,
+                "partial_frames": self.partial_frames,
+                "video_layer": self._layer,
+                "video_layers": len(self._layers),
+                "layer_switches": self.layer_switches,
             }
 
     def _calc_recent_loss(self, window: float = 1.0) -> float:
@@ -378,12 +652,36 @@ class VideoReceiver:
         except Exception as e:
             logger.debug(f"Video ACK send failed: {e}")
 
+    def _send_transport_feedback(self):
+        """按 VIDEO_FEEDBACK_INTERVAL 上报各分片到达时间；攒满一条反馈的条目数时立即上报，
+        高码率下每个间隔可发出多条，不会因丢弃到达记录而被机载端误判为丢包"""
+        if not self.server_addr or not self.socket:
+            return
+        now = time.perf_counter()
+        if (now - self._last_feedback_time < Config.VIDEO_FEEDBACK_INTERVAL
+                and len(self._arrivals) < VIDEO_FEEDBACK_MAX_ENTRIES):
+            return
+        self._last_feedback_time = now
+        with self._stats_lock:
+            arrivals, self._arrivals = self._arrivals, []
+        for i in range(0, len(arrivals), VIDEO_FEEDBACK_MAX_ENTRIES):
+            self._feedback_seq += 1
+            try:
+                data = Protocol.build_video_feedback(
+                    self._feedback_seq, time.perf_counter(),
+                    arrivals[i:i + VIDEO_FEEDBACK_MAX_ENTRIES])
+                self.socket.sendto(data, self.server_addr)
+            except Exception as e:
+                logger.debug(f"Video feedback send failed: {e}")
+
     def _check_incomplete_frames(self):
         """检查超时的不完整帧，发送 NACK"""
         if not self.server_addr or not self.socket:
             return
         now = time.time()
         nacks_to_send = []
+        abandoned = False
+        partial_tiles = []
         with self._buffer_lock:
             for frame_id in list(self._frame_buffer.keys()):
                 if frame_id <= self._last_completed_frame_id:
@@ -394,6 +692,19 @@ class VideoReceiver:
                     continue
                 nack_count = self._nack_count.get(frame_id, 0)
                 if nack_count >= self._nack_max_retries:
+                    given_up = elapsed >= self._nack_timeout * (self._nack_max_retries + 1)
+                    codec = self._frame_codec.get(frame_id)
+                    # 重传用尽仍不完整：H.264 参考链已断，无需等到下一帧完成再发现
+                    if codec == 1 and given_up:
+                        abandoned = True
+                    elif codec == 2 and given_up:
+                        # 条带化 JPEG：显示已到达的条带，之前的帧随之作废
+                        fec_info = self._frame_fec_info.get(frame_id)
+                        n_data = fec_info[0] if fec_info else self._frame_info.get(frame_id, 0)
+                        partial = assemble_partial_tiles(self._frame_buffer[frame_id], n_data)
+                        if partial:
+                            partial_tiles.append((partial, self._frame_trace.get(frame_id)))
+                        self._drop_frames_through(frame_id)
                     continue
                 total = self._frame_info.get(frame_id, 0)
                 if total == 0:
@@ -410,3 +721,9 @@ class VideoReceiver:
                 self.socket.sendto(nack_data, self.server_addr)
             except Exception:
                 pass
+        if abandoned:
+            self._mark_reference_loss()
+        for partial, trace in partial_tiles:
+            with self._stats_lock:
+                self.partial_frames += 1
+            self._decode_tiles(partial, trace)
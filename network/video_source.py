@@ -0,0 +1,290 @@
+"""机载端视频源 - 测试卡、循环文件、图片序列、V4L2 设备，支持 H.264 直通"""
+
+import glob
+import logging
+import os
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from typing import Callable, Optional
+
+import cv2
+import numpy as np
+
+from network.h264_encoder import split_i420
+
+logger = logging.getLogger(__name__)
+
+try:
+    import av
+    PYAV_AVAILABLE = True
+except ImportError:
+    PYAV_AVAILABLE = False
+
+
+@dataclass
+class SourceFrame:
+    """视频源输出的一帧：原始画面（BGR 或 I420）或已编码的 H.264 access unit（直通）"""
+    image: Optional[np.ndarray] = None
+    yuv: Optional[np.ndarray] = None   # 紧凑 I420 (height * 3/2, width)，prefer_yuv 时由支持的源提供
+    data: bytes = b""                  # Annex B 字节流，直通时有效
+    keyframe: bool = False
+    enhanced: bool = False             # 源已应用画面增强，采集线程不再重复处理
+
+
+def resize_i420(frame: np.ndarray, width: int, height: int) -> np.ndarray:
+    """逐平面缩放紧凑 I420 数组"""
+    src_h = frame.shape[0] * 2 // 3
+    src_w = frame.shape[1]
+    out = np.empty((height * 3 // 2, width), dtype=np.uint8)
+    for src, dst in zip(split_i420(frame, src_w, src_h), split_i420(out, width, height)):
+        dst[:] = cv2.resize(src, (dst.shape[1], dst.shape[0]), interpolation=cv2.INTER_AREA)
+    return out
+
+
+class VideoSource(ABC):
+    """
+    视频源基类
+
+    read() 返回下一帧，源结束或暂时无帧时返回 None。
+    live=False 的源由采集线程按目标帧率节拍读取；live=True 的源（采集设备）
+    read() 按设备自身节拍阻塞。passthrough=True 的源输出 H.264，跳过编码。
+    """
+
+    name = "source"
+    live = False
+    passthrough = False
+
+    def __init__(self):
+        self.width = 0
+        self.height = 0
+        # 编码端为 H.264 时由采集线程置位：支持的源直接输出 I420，省去 BGR ↔ YUV 转换
+        self.prefer_yuv = False
+
+    @abstractmethod
+    def read(self) -> Optional[SourceFrame]: ...
+
+    def close(self):
+        pass
+
+    def describe(self) -> str:
+        mode = "h264 passthrough" if self.passthrough else "raw"
+        return f"{self.name} {self.width}x{self.height} ({mode})"
+
+
+class TestPatternSource(VideoSource):
+    """
+    合成测试卡 — render_fn(index) 生成第 index 帧（BGR），render_yuv_fn 直接生成 I420
+
+    enhanced=True 表示渲染函数已应用画面增强。
+    """
+
+    name = "test"
+
+    def __init__(self, render_fn: Callable[[int], np.ndarray], width: int, height: int,
+                 render_yuv_fn: Optional[Callable[[int], np.ndarray]] = None,
+                 enhanced: bool = False):
+        super().__init__()
+        self._render = render_fn
+        self._render_yuv = render_yuv_fn
+        self.enhanced = enhanced
+        self.width = width
+        self.height = height
+        self._index = 0
+
+    def read(self) -> Optional[SourceFrame]:
+        self._index += 1
+        if self.prefer_yuv and self._render_yuv:
+            return SourceFrame(yuv=self._render_yuv(self._index), enhanced=self.enhanced)
+        return SourceFrame(image=self._render(self._index), enhanced=self.enhanced)
+
+
+class FileSource(VideoSource):
+    """
+    PyAV 解码的视频文件，结束后从头循环
+
+    passthrough=True 时不解码，直接输出文件中的 H.264 packet；MP4/MKV 中的
+    avcC 格式经 h264_mp4toannexb 转为 Annex B（每个 IDR 前带 SPS/PPS）。
+    """
+
+    name = "file"
+
+    def __init__(self, path: str, loop: bool = True, passthrough: bool = False):
+        if not PYAV_AVAILABLE:
+            raise RuntimeError("PyAV not installed")
+        super().__init__()
+        self.path = path
+        self.loop = loop
+        self.passthrough = passthrough
+        self._container = None
+        self._stream = None
+        self._bsf = None
+        self._frames = None
+        self.loops = 0
+        self._open()
+
+    def _open(self):
+        self._container = av.open(self.path)
+        self._stream = self._container.streams.video[0]
+        codec_ctx = self._stream.codec_context
+        self.width = codec_ctx.width
+        self.height = codec_ctx.height
+        if self.passthrough:
+            if codec_ctx.name != 'h264':
+                raise ValueError(f"Passthrough requires H.264, {self.path} is {codec_ctx.name}")
+            extradata = codec_ctx.extradata
+            if extradata and extradata[0] == 1:
+                from av.bitstream import BitStreamFilterContext
+                self._bsf = BitStreamFilterContext('h264_mp4toannexb', self._stream)
+            self._frames = self._demux()
+        else:
+            self._stream.thread_type = 'AUTO'
+            self._frames = self._decode()
+
+    def _decode(self):
+        for frame in self._container.decode(self._stream):
+            if self.prefer_yuv and frame.format.name == 'yuv420p':
+                # 解码输出本就是 I420，无需转换
+                yield SourceFrame(yuv=frame.to_ndarray())
+            else:
+                yield SourceFrame(image=frame.to_ndarray(format='bgr24'))
+
+    def _demux(self):
+        for packet in self._container.demux(self._stream):
+            if packet.size == 0:
+                continue  # demux 结束时的空 packet
+            for out in (self._bsf.filter(packet) if self._bsf else [packet]):
+                yield SourceFrame(data=bytes(out), keyframe=out.is_keyframe)
+
+    def read(self) -> Optional[SourceFrame]:
+        frame = next(self._frames, None)
+        if frame is None and self.loop:
+            # 重新打开比 seek 更可靠（解码器与 bitstream filter 状态一并重置）
+            self.close()
+            self._open()
+            self.loops += 1
+            frame = next(self._frames, None)
+        return frame
+
+    def close(self):
+        if self._container:
+            self._container.close()
+            self._container = None
+
+
+class ImageSequenceSource(VideoSource):
+    """目录中的图片序列（按文件名排序），结束后从头循环"""
+
+    name = "images"
+    EXTENSIONS = ('.jpg', '.jpeg', '.png', '.bmp')
+
+    def __init__(self, directory: str, loop: bool = True):
+        super().__init__()
+        self.directory = directory
+        self.loop = loop
+        self._files = sorted(path for path in glob.glob(os.path.join(directory, '*'))
+                             if path.lower().endswith(self.EXTENSIONS))
+        if not self._files:
+            raise ValueError(f"No images found in {directory}")
+        first = cv2.imread(self._files[0], cv2.IMREAD_COLOR)
+        if first is None:
+            raise ValueError(f"Cannot read {self._files[0]}")
+        self.height, self.width = first.shape[:2]
+        self._index = 0
+
+    def read(self) -> Optional[SourceFrame]:
+        if self._index >= len(self._files):
+            if not self.loop:
+                return None
+            self._index = 0
+        path = self._files[self._index]
+        self._index += 1
+        image = cv2.imread(path, cv2.IMREAD_COLOR)
+        if image is None:
+            logger.warning(f"Cannot read {path}, skipping")
+            return None
+        return SourceFrame(image=image)
+
+
+class V4L2Source(VideoSource):
+    """
+    V4L2 采集设备
+
+    原始模式经 OpenCV 读取（只保留最新一帧）；passthrough=True 时经 PyAV 以
+    input_format=h264 读取带硬件编码的摄像头，输出 Annex B access unit。
+    """
+
+    name = "v4l2"
+    live = True
+
+    def __init__(self, device: str = "/dev/video0", width: int = 1280, height: int = 720,
+                 fps: int = 30, passthrough: bool = False):
+        super().__init__()
+        self.device = device
+        self.passthrough = passthrough
+        self._cap = None
+        self._container = None
+        self._packets = None
+        if passthrough:
+            if not PYAV_AVAILABLE:
+                raise RuntimeError("PyAV not installed")
+            self._container = av.open(device, format='v4l2', options={
+                'video_size': f'{width}x{height}',
+                'framerate': str(fps),
+                'input_format': 'h264',
+            })
+            stream = self._container.streams.video[0]
+            self.width = stream.codec_context.width or width
+            self.height = stream.codec_context.height or height
+            self._packets = self._container.demux(stream)
+        else:
+            self._cap = cv2.VideoCapture(device, cv2.CAP_V4L2)
+            if not self._cap.isOpened():
+                raise RuntimeError(f"Cannot open {device}")
+            self._cap.set(cv2.CAP_PROP_FRAME_WIDTH, width)
+            self._cap.set(cv2.CAP_PROP_FRAME_HEIGHT, height)
+            self._cap.set(cv2.CAP_PROP_FPS, fps)
+            # 驱动缓冲只保留 1 帧，避免读到排队的旧画面
+            self._cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)
+            self.width = int(self._cap.get(cv2.CAP_PROP_FRAME_WIDTH))
+            self.height = int(self._cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+
+    def read(self) -> Optional[SourceFrame]:
+        if self.passthrough:
+            packet = next(self._packets, None)
+            if packet is None or packet.size == 0:
+                return None
+            return SourceFrame(data=bytes(packet), keyframe=packet.is_keyframe)
+        ok, image = self._cap.read()
+        return SourceFrame(image=image) if ok else None
+
+    def close(self):
+        if self._cap is not None:
+            self._cap.release()
+            self._cap = None
+        if self._container is not None:
+            self._container.close()
+            self._container = None
+
+
+def create_video_source(spec: str, width: int, height: int, fps: int,
+                        render_fn: Optional[Callable[[int], np.ndarray]] = None,
+                        passthrough: bool = False,
+                        render_yuv_fn: Optional[Callable[[int], np.ndarray]] = None,
+                        enhanced: bool = False) -> VideoSource:
+    """
+    按描述创建视频源
+
+    spec: "test" | "file:<path>" | "images:<dir>" | "v4l2[:<device>]"
+    """
+    kind, _, arg = spec.partition(':')
+    if kind == 'test':
+        if render_fn is None:
+            raise ValueError("Test pattern source needs a render function")
+        return TestPatternSource(render_fn, width, height, render_yuv_fn, enhanced)
+    if kind == 'file':
+        return FileSource(arg, passthrough=passthrough)
+    if kind == 'images':
+        return ImageSequenceSource(arg)
+    if kind == 'v4l2':
+        return V4L2Source(arg or "/dev/video0", width, height, fps, passthrough=passthrough)
+    raise ValueError(f"Unknown video source: {spec}")
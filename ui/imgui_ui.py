@@ -1189,6 +1189,11 @@ class ImGuiUI:
         if changed and on_change:
             on_change("contrast", new_val)
 
+        gamma = params.get("gamma", 100)
+        changed, new_val = self._slider_int_with_hint("Gamma##enh", gamma, 30, 300)
+        if changed and on_change:
+            on_change("gamma", new_val)
+
         sharpness = params.get("sharpness", 0)
         changed, new_val = self._slider_int_with_hint("Sharpness##enh", sharpness, 0, 100)
         if changed and on_change:
@@ -1441,6 +1446,30 @@ class ImGuiUI:
         self._draw_kv_row("Min RTT", f"{latency_min:.2f} ms")
         self._draw_kv_row("Avg RTT", f"{latency_avg:.2f} ms", accent=True)
         self._draw_kv_row("Max RTT", f"{latency_max:.2f} ms")
+        if "rtt_p50_ms" in stats:
+            self._draw_kv_row("P50 / P95 RTT",
+                              f"{stats.get('rtt_p50_ms', 0.0):.2f} / {stats.get('rtt_p95_ms', 0.0):.2f} ms")
+            self._draw_kv_row("P99 / P99.9 RTT",
+                              f"{stats.get('rtt_p99_ms', 0.0):.2f} / {stats.get('rtt_p999_ms', 0.0):.2f} ms")
+        if stats.get("air_processing_ms"):
+            source = "kernel" if stats.get("kernel_rx_timestamps") else "user"
+            self._draw_kv_row("Air Processing", f"{stats['air_processing_ms']:.3f} ms ({source} rx ts)")
+        if "tx_jitter_p50_us" in stats:
+            self._draw_kv_row(f"TX Jitter @ {stats.get('tx_rate_hz', 0):g} Hz",
+                              f"{stats['tx_jitter_p50_us']:.0f} / {stats.get('tx_jitter_p99_us', 0.0):.0f} / "
+                              f"{stats.get('tx_jitter_max_us', 0.0):.0f} us")
+            jitter_hist = stats.get("tx_jitter_hist")
+            if jitter_hist and any(jitter_hist):
+                # 区间上界 10/20/50/100/200/500/1000/2000/5000 us，末列为更大值
+                imgui.push_style_color(imgui.COLOR_PLOT_HISTOGRAM, 0.0, 0.85, 1.0, 1.0)
+                imgui.plot_histogram(
+                    "##tx_jitter_hist",
+                    array('f', jitter_hist),
+                    graph_size=(0, 40),
+                    scale_min=0.0,
+                    overlay_text=f"missed ticks {stats.get('tx_missed_ticks', 0)}",
+                )
+                imgui.pop_style_color()
 
         # RTT 趋势图
         if history.get("rtt"):
@@ -1459,6 +1488,24 @@ class ImGuiUI:
 
         imgui.spacing()
 
+        # --- Glass-to-glass breakdown ---
+        if stats.get("frames_traced", 0):
+            pushed = self._push_font(self.font_body)
+            self._draw_subsection("LATENCY BREAKDOWN (P50 / P99)")
+            self._pop_font(pushed)
+
+            for stage, label in (("encode", "Encode"), ("packetize", "Packetize"),
+                                 ("network", "Network"), ("decode", "Decode"),
+                                 ("publish", "Publish"), ("upload", "Texture Upload"),
+                                 ("present", "Present"), ("glass_to_glass", "Glass-to-Glass")):
+                p50 = stats.get(f"stage_{stage}_p50_ms")
+                if p50 is None:
+                    continue
+                p99 = stats.get(f"stage_{stage}_p99_ms", 0.0)
+                self._draw_kv_row(label, f"{p50:.1f} / {p99:.1f} ms", accent=(stage == "glass_to_glass"))
+
+            imgui.spacing()
+
         # --- Codec statistics ---
         pushed = self._push_font(self.font_body)
         self._draw_subsection("CODEC STATISTICS")
@@ -1483,10 +1530,12 @@ class ImGuiUI:
 
         crc_errors = stats.get("crc_errors", 0)
         timeout_errors = stats.get("timeout_errors", 0)
+        unacked_redundant = stats.get("unacked_redundant", 0)
         decode_errors = stats.get("decode_errors", 0)
 
         self._draw_kv_row("CRC Errors", f"{crc_errors}")
         self._draw_kv_row("Timeout Errors", f"{timeout_errors}")
+        self._draw_kv_row("Unacked (Redundant)", f"{unacked_redundant}")
         self._draw_kv_row("Decode Errors", f"{decode_errors}")
 
         imgui.spacing()